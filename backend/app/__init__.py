@@ -87,6 +87,8 @@ def create_app():
     from app.api.feeta_operator import feeta_bp
     from app.api.analytics import analytics_bp
     from app.api.ask_feeta import ask_feeta_bp
+    from app.api.llm_routing import llm_routing_bp
+    from app.api.events import events_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(dashboard_bp, url_prefix='/api')
@@ -102,6 +104,8 @@ def create_app():
     app.register_blueprint(feeta_bp)
     app.register_blueprint(analytics_bp, url_prefix='/api')
     app.register_blueprint(ask_feeta_bp)
+    app.register_blueprint(llm_routing_bp, url_prefix='/api')
+    app.register_blueprint(events_bp)
     
     logger.info("✅ API routes registered")
     
@@ -128,7 +132,14 @@ def create_app():
     @app.route('/health')
     def health_check():
         return {'status': 'healthy', 'service': 'feeta-backend'}, 200
-    
+
+    # In-process latency histograms (per worker)
+    @app.route('/metrics')
+    def metrics():
+        from app.utils.metrics import snapshot
+        from app.services.llm_resilience import breaker_states
+        return {'histograms': snapshot(), 'llm_circuits': breaker_states()}, 200
+
     logger.info("="*80)
     logger.info("✨ Feeta Backend Ready!")
     logger.info(f"🌐 Running on: {Config.BACKEND_URL}")
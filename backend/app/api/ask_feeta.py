@@ -4,15 +4,15 @@ Uses Vertex AI SDK approach for AI-powered insights
 """
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.admission import admit
 import logging
-import os
-import json
 
 logger = logging.getLogger(__name__)
 ask_feeta_bp = Blueprint('ask_feeta', __name__)
 
 @ask_feeta_bp.route('/api/ask-feeta', methods=['POST'])
 @jwt_required()
+@admit('ask_feeta')
 def ask_feeta():
     """Ask Feeta AI - Agentic workflow with GitHub code reading, task analysis, bottleneck detection"""
     try:
@@ -41,11 +41,14 @@ def ask_feeta():
         # AGENTIC WORKFLOW: Gather comprehensive context
         from app.database.mongodb import get_user_projects, get_project_tasks
         from app.services.ai_service import create_deep_project_context
+        from app.services.context_builder import ContextBuilder, log_prompt
+        from app.services.context_cache import shared_repo_context
         
         projects = get_user_projects(user_id)
         
         # 1. PROJECT & REPO ANALYSIS
-        project_context = ""
+        repo_builder = ContextBuilder('ask_feeta', question)
+        repo_contexts = []
         repo_files = {}
         if projects and github_token:
             logger.info(f"📦 Analyzing {len(projects)} projects...")
@@ -63,7 +66,7 @@ def ask_feeta():
                         owner, repo_name = full_name.split('/', 1)
                         logger.info(f"🔍 Analyzing {owner}/{repo_name}...")
                         context = create_deep_project_context(owner, repo_name, github_token)
-                        project_context += f"\n\n=== Repository: {full_name} ===\n{context}\n"
+                        repo_contexts.append((full_name, context))
                         
                         # Store repo info for code reading
                         repo_files[full_name] = {'owner': owner, 'repo': repo_name}
@@ -150,9 +153,20 @@ Overloaded Team Members:
         code_context = ""
         if github_token and any(keyword in question.lower() for keyword in ['file', 'code', 'function', 'class', '.py', '.js', '.java']):
             logger.info("🔍 Question mentions code - enabling code reading capability")
-            code_context = "\n\n=== CODE READING CAPABILITY ENABLED ===\nI can read specific files from your repositories. Available repos:\n"
+            from app.services.symbol_index import find_symbols, ensure_symbol_index
+            code_context = "\n\n=== CODE READING CAPABILITY ENABLED ===\nRelevant code from your repositories (symbol index):\n"
             for repo_name, repo_info in repo_files.items():
                 code_context += f"- {repo_name}\n"
+                ensure_symbol_index(repo_info['owner'], repo_info['repo'], github_token)
+                for symbol in find_symbols(repo_info['owner'], repo_info['repo'], question, limit=10):
+                    code_context += f"  - {symbol['file']}: {symbol['name']} ({symbol['kind']}, {symbol['label']})\n"
+        
+        # Repo context is the shared (cached) prefix; task, bottleneck and code sections are fitted into the budget
+        shared = shared_repo_context(repo_contexts)
+        repo_builder.add('tasks', tasks_context, priority=2)
+        repo_builder.add('bottlenecks', bottleneck_context, priority=2)
+        repo_builder.add('code', code_context, priority=3)
+        context_text = repo_builder.build()
         
         # Build AI prompt with agentic capabilities
         full_context = f"""You are Feeta AI, an agentic AI assistant with advanced capabilities:
@@ -164,16 +178,8 @@ Overloaded Team Members:
 4. 💡 Provide actionable recommendations
 5. 📖 Read and analyze code files (when needed)
 
-**PROJECT CONTEXT:**
-{project_context}
-
-**TASK & TEAM ANALYSIS:**
-{tasks_context}
-
-**BOTTLENECKS & ISSUES:**
-{bottleneck_context}
-
-{code_context}
+**TASK & TEAM ANALYSIS, BOTTLENECKS & ISSUES:**{" (repositories: see PROJECT CONTEXT above)" if shared else ""}
+{context_text}
 
 **USER QUESTION:**
 {question}
@@ -190,33 +196,12 @@ Be specific, reference actual data, and format your response with **bold heading
         
         # Call AI service using Vertex AI SDK with agentic context
         logger.info("🚀 Calling Vertex AI Gemini with AGENTIC WORKFLOW...")
-        logger.info("🔧 API Method: VERTEX AI SDK (GenerativeModel)")
-        logger.info(f"📊 Context size: {len(full_context)} characters")
+        log_prompt('ask_feeta', full_context, context=shared)
         
         try:
-            import vertexai
-            from vertexai.generative_models import GenerativeModel
-            from google.oauth2 import service_account
-            
-            # Initialize Vertex AI (same as ai_service.py)
-            GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID', 'your-project-id')
-            GCP_LOCATION = os.getenv('GCP_LOCATION', 'us-central1')
-            GCP_CREDENTIALS_JSON = os.getenv('GCP_CREDENTIALS_JSON')
-            
-            credentials = None
-            if GCP_CREDENTIALS_JSON:
-                creds_dict = json.loads(GCP_CREDENTIALS_JSON)
-                credentials = service_account.Credentials.from_service_account_info(creds_dict)
-            
-            vertexai.init(project=GCP_PROJECT_ID, location=GCP_LOCATION, credentials=credentials)
-            
-            model = GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content(
-                full_context,
-                generation_config={'temperature': 0.7, 'max_output_tokens': 2048}
-            )
-            
-            solution = response.text
+            # Vertex AI is initialized when ai_service is imported (create_deep_project_context above)
+            from app.services.llm import generate_text
+            solution = generate_text('ask_feeta', full_context, context=shared, temperature=0.7)
             logger.info("✅ Vertex AI response received successfully")
             logger.info(f"📄 Solution length: {len(solution)} characters")
             
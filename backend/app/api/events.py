@@ -0,0 +1,73 @@
+"""
+Events API
+Server-Sent Events stream of a user's task updates, Slack mentions and background job progress
+"""
+import os
+import json
+import time
+import queue
+import logging
+import jwt
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.services.event_bus import subscribe, unsubscribe
+
+logger = logging.getLogger(__name__)
+
+events_bp = Blueprint('events', __name__)
+JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
+
+# Comment lines keep proxies from closing an idle stream
+KEEPALIVE_SECONDS = 15
+# Browsers reconnect after this long if the stream drops
+RETRY_MILLISECONDS = 3000
+# Streams are ended after this long and the browser reconnects, so a stream never holds a worker for good
+STREAM_MAX_SECONDS = int(os.getenv('EVENT_STREAM_MAX_SECONDS', '300'))
+
+
+@events_bp.route("/api/events/stream", methods=["GET"])
+def event_stream():
+    """
+    Stream the authenticated user's events
+
+    EventSource cannot send headers, so the JWT comes as ?token= (an Authorization header also works).
+    Event types: task_updated, mention, job_progress. The stream ends after STREAM_MAX_SECONDS and
+    the browser reconnects; run the app with threaded workers (see README) so open streams do not
+    starve other requests.
+    """
+    auth_header = request.headers.get('Authorization')
+    token = request.args.get('token') or (auth_header.replace('Bearer ', '') if auth_header else None)
+    if not token:
+        return jsonify({"error": "No authorization provided"}), 401
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        user_id = payload['user_id']
+    except jwt.ExpiredSignatureError:
+        return jsonify({"error": "Token expired"}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({"error": "Invalid token"}), 401
+
+    events = subscribe(user_id)
+    logger.info(f"🔌 Event stream opened for user {user_id}")
+
+    def generate():
+        closes_at = time.monotonic() + STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+            while time.monotonic() < closes_at:
+                try:
+                    event = events.get(timeout=min(KEEPALIVE_SECONDS, max(0, closes_at - time.monotonic())))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            unsubscribe(user_id, events)
+            logger.info(f"🔌 Event stream closed for user {user_id}")
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -9,7 +9,8 @@ import threading
 import time
 import jwt
 import os
-import requests
+from app.services.slack_outbound import post_message
+from app.services.slack_membership import ensure_joined
 
 logger = logging.getLogger(__name__)
 
@@ -36,31 +37,28 @@ def get_token_for_user(user_id):
         return None
 
 def send_message_to_slack(slack_token, channel_id, message):
-    """Send message to Slack channel"""
+    """Queue a message to a Slack channel; returns a Future of the post (None if it could not be queued)"""
     try:
-        # Join channel first
-        join_url = "https://slack.com/api/conversations.join"
-        join_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-        join_payload = {"channel": channel_id}
-        requests.post(join_url, headers=join_headers, json=join_payload, timeout=5)
+        # Join channel first (skipped when the bot is known to be in it)
+        ensure_joined(slack_token, channel_id)
         
-        # Send message
-        url = "https://slack.com/api/chat.postMessage"
-        headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-        payload = {"channel": channel_id, "text": message}
+        # Queue the message; ticks that pile up while Slack is throttling us collapse into one post
+        def _log_result(sent):
+            try:
+                data = sent.result()
+                if data.get("ok"):
+                    logger.info(f"✅ Message sent to Slack: {message}")
+                else:
+                    logger.error(f"❌ Failed to send message: {data.get('error')}")
+            except Exception as e:
+                logger.error(f"❌ Error sending to Slack: {str(e)}")
         
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        data = response.json()
-        
-        if data.get("ok"):
-            logger.info(f"✅ Message sent to Slack: {message}")
-            return True
-        else:
-            logger.error(f"❌ Failed to send message: {data.get('error')}")
-            return False
+        future = post_message(slack_token, channel_id, message, coalesce_key="followup_test")
+        future.add_done_callback(_log_result)
+        return future
     except Exception as e:
         logger.error(f"❌ Error sending to Slack: {str(e)}")
-        return False
+        return None
 
 def send_followup_message():
     """Send follow-up test message every 10 seconds"""
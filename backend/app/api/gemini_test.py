@@ -15,9 +15,6 @@ gemini_test_bp = Blueprint('gemini_test', __name__)
 JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
-# Store chat sessions per user
-chat_sessions = {}
-
 @gemini_test_bp.route('/ping', methods=['GET'])
 def ping():
     """Simple ping endpoint to test deployment"""
@@ -53,7 +50,7 @@ def test_gemini():
         
         try:
             import vertexai
-            from vertexai.generative_models import GenerativeModel
+            from app.services.llm import generate_text
             from google.oauth2 import service_account
             import json
             
@@ -69,13 +66,7 @@ def test_gemini():
             
             vertexai.init(project=GCP_PROJECT_ID, location=GCP_LOCATION, credentials=credentials)
             
-            model = GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content(
-                prompt,
-                generation_config={'temperature': 0.7, 'max_output_tokens': 2048}
-            )
-            
-            text = response.text
+            text = generate_text('playground', prompt, temperature=0.7)
             
             return jsonify({
                 'success': True,
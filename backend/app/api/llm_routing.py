@@ -0,0 +1,73 @@
+"""
+LLM Routing API
+View and update the model tier routing table at runtime
+"""
+import os
+import logging
+import jwt
+from flask import Blueprint, request, jsonify
+from app.services.model_routing import get_routing_table, update_routing
+
+logger = logging.getLogger(__name__)
+
+llm_routing_bp = Blueprint('llm_routing', __name__)
+JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
+# Comma-separated user ids allowed to change routing
+LLM_ADMIN_USER_IDS = {u.strip() for u in os.getenv('LLM_ADMIN_USER_IDS', '').split(',') if u.strip()}
+
+ROUTE_FIELDS = {'tier', 'model', 'fallback', 'max_output_tokens', 'latency_budget'}
+
+
+def _user_id():
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None
+    token = auth_header.replace('Bearer ', '')
+    payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    return payload['user_id']
+
+
+def _invalid(section):
+    """Error message for a malformed tiers/routes section, or None"""
+    if not isinstance(section, dict):
+        return "must be an object"
+    for name, settings in section.items():
+        if not isinstance(settings, dict):
+            return f"'{name}' must be an object"
+        unknown = set(settings) - ROUTE_FIELDS
+        if unknown:
+            return f"'{name}' has unknown fields: {sorted(unknown)}"
+    return None
+
+
+@llm_routing_bp.route('/llm/routing', methods=['GET', 'PUT'])
+def llm_routing():
+    """GET the effective routing table; PUT {"tiers": {...}, "routes": {...}} to override entries"""
+    try:
+        user_id = _user_id()
+        if not user_id:
+            return jsonify({'error': 'No authorization provided'}), 401
+
+        if request.method == 'GET':
+            return jsonify(get_routing_table()), 200
+
+        if user_id not in LLM_ADMIN_USER_IDS:
+            return jsonify({'error': 'Not allowed to change LLM routing'}), 403
+
+        body = request.get_json() or {}
+        for key in ('tiers', 'routes'):
+            error = _invalid(body.get(key, {}))
+            if error:
+                return jsonify({'error': f"{key}: {error}"}), 400
+
+        table = update_routing(body.get('tiers'), body.get('routes'))
+        logger.info(f"🔀 LLM routing changed by {user_id}")
+        return jsonify(table), 200
+
+    except jwt.ExpiredSignatureError:
+        return jsonify({'error': 'Token expired'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Invalid token'}), 401
+    except Exception as e:
+        logger.error(f"❌ LLM routing error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -6,7 +6,6 @@ from flask import Blueprint, request, jsonify
 import logging
 import jwt
 import os
-import requests
 from app.database.mongodb import (
     create_project, get_user_projects, update_project, delete_project,
     save_message, get_project_messages, get_database_stats,
@@ -16,9 +15,16 @@ from app.database.mongodb import (
 )
 from datetime import datetime
 from app.services.ai_service import create_deep_project_context
+from app.services.context_builder import ContextBuilder, log_prompt
+from app.services.context_cache import shared_repo_context
+from app.services.slack_directory import get_slack_directory
+from app.services.prewarm import enqueue_project_warmup
+from app.services.event_bus import publish
+from app.services.slack_outbound import post_message, send_dm, RESULT_TIMEOUT_SECONDS
+from app.services.slack_membership import ensure_joined
+from app.utils.admission import admit
 from app.api.slack import get_token_for_user
 from bson import ObjectId
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
@@ -82,6 +88,8 @@ def create_new_project():
         project = create_project(user_id, name, repo_data)
         
         if project:
+            # Build repo context, symbols and the Slack directory before the first question arrives
+            project['warm_state'] = enqueue_project_warmup(project['id'])
             return jsonify({
                 "ok": True,
                 "project": project
@@ -113,13 +121,16 @@ def update_project_route(project_id):
         data = request.get_json()
         
         # Remove fields that shouldn't be updated directly
-        updates = {k: v for k, v in data.items() if k not in ['_id', 'id', 'user_id', 'created_at']}
+        updates = {k: v for k, v in data.items() if k not in ['_id', 'id', 'user_id', 'created_at', 'warm_state']}
         
         logger.info(f"✏️ Updating project {project_id}")
         
         success = update_project(project_id, updates)
         
         if success:
+            if 'repos' in updates or 'repo' in updates:
+                # Newly linked repositories get warmed up like a new project
+                enqueue_project_warmup(project_id)
             return jsonify({"ok": True})
         else:
             return jsonify({"error": "Failed to update project"}), 500
@@ -459,6 +470,14 @@ def update_task_route(task_id):
         success = update_task(task_id, updates)
         
         if success:
+            publish(user_id, 'task_updated', {
+                "task_id": task_id,
+                "project_id": current_task.get('project_id') if current_task else None,
+                "status": new_status or old_status,
+                "fields": sorted(updates),
+                "source": 'app'
+            })
+            
             # Handle workload updates when task status changes
             if old_status and new_status and old_status != new_status:
                 # Task completed/done - increase idle percentage
@@ -716,6 +735,18 @@ def get_pending_approval_tasks(project_id):
         return jsonify({"error": f"Failed to load pending tasks: {str(e)}"}), 500
 
 
+def _log_dm_result(sent, member_name):
+    """Done-callback of a queued task DM"""
+    try:
+        data = sent.result()
+        if data.get("ok"):
+            logger.info(f"✅ DM sent to {member_name}")
+        else:
+            logger.warning(f"⚠️ Failed to send DM: {data.get('error')}")
+    except Exception as dm_error:
+        logger.warning(f"⚠️ Error sending DM: {dm_error}")
+
+
 @project_bp.route("/projects/<project_id>/tasks/approve", methods=["POST"])
 def approve_and_send_tasks(project_id):
     """Approve tasks and send them to Slack"""
@@ -746,6 +777,7 @@ def approve_and_send_tasks(project_id):
         
         approved_count = 0
         failed_tasks = []
+        channel_posts = []  # (task_id, slack_user_id, Future of the channel message)
         
         # Check if Slack is connected
         from app.api.slack import get_token_for_user
@@ -783,15 +815,9 @@ def approve_and_send_tasks(project_id):
         def find_slack_user_by_email(email):
             """Find Slack user ID by email"""
             try:
-                users_url = "https://slack.com/api/users.list"
-                headers = {"Authorization": f"Bearer {slack_token}"}
-                response = requests.get(users_url, headers=headers)
-                if response.ok:
-                    users_data = response.json()
-                    if users_data.get('ok'):
-                        for user in users_data.get('members', []):
-                            if user.get('profile', {}).get('email') == email:
-                                return user.get('id')
+                for user in get_slack_directory(slack_token, slack_token_info.get('team_id')) or []:
+                    if user.get('profile', {}).get('email') == email:
+                        return user.get('id')
             except Exception as e:
                 logger.error(f"Error finding Slack user: {e}")
             return None
@@ -836,13 +862,9 @@ def approve_and_send_tasks(project_id):
             slack_user_id = None
             if assigned_member_name and assigned_member_name != 'Unassigned':
                 try:
-                    users_url = "https://slack.com/api/users.list"
-                    headers_list = {"Authorization": f"Bearer {slack_token}"}
-                    users_response = requests.get(users_url, headers=headers_list, timeout=10)
-                    users_data = users_response.json()
+                    slack_users = get_slack_directory(slack_token, slack_token_info.get('team_id'))
                     
-                    if users_data.get('ok'):
-                        slack_users = users_data.get('members', [])
+                    if slack_users is not None:
                         assigned_lower = assigned_member_name.lower().strip()
                         
                         # Try exact match first
@@ -878,7 +900,7 @@ def approve_and_send_tasks(project_id):
                         if not slack_user_id:
                             logger.warning(f"⚠️ No Slack user found matching '{assigned_member_name}'")
                     else:
-                        logger.error(f"❌ Slack users.list API failed: {users_data.get('error')}")
+                        logger.error("❌ Slack users.list API failed")
                 except Exception as e:
                     logger.error(f"❌ Error finding Slack user: {str(e)}")
             
@@ -914,53 +936,24 @@ Please confirm receipt and provide updates as you progress. Good luck! 🚀"""
 ⏱️ *Estimated Time:* {estimated_hours} {f"({timeline})" if timeline else ""}"""
                 logger.warning(f"⚠️ No Slack user found for '{assigned_member_name}' - showing name only")
             
-            headers = {
-                "Authorization": f"Bearer {slack_token}",
-                "Content-Type": "application/json"
-            }
+            # Join channel first (skipped when the bot is known to be in it)
+            ensure_joined(slack_token, channel_id, slack_token_info.get('team_id'))
             
-            # Join channel first
-            try:
-                join_url = "https://slack.com/api/conversations.join"
-                join_response = requests.post(join_url, headers=headers, json={"channel": channel_id}, timeout=5)
-                if not join_response.json().get('ok'):
-                    logger.warning(f"⚠️ Could not join channel {channel_id}")
-            except Exception as join_error:
-                logger.warning(f"⚠️ Error joining channel: {join_error}")
+            # 1. DM the assigned person if we found them (queued - not waited on)
+            if slack_user_id:
+                send_dm(slack_token, slack_user_id, dm_message, slack_token_info.get('team_id'), mrkdwn=True).add_done_callback(
+                    lambda sent, name=assigned_member_name: _log_dm_result(sent, name))
             
+            # 2. Queue the channel message for team visibility; every task's post is collected below
+            logger.info(f"📤 Sending task to channel: {channel_id}")
+            channel_posts.append((task_id, slack_user_id, post_message(
+                slack_token, channel_id, channel_message, slack_token_info.get('team_id'), mrkdwn=True)))
+        
+        for task_id, slack_user_id, channel_post in channel_posts:
+            approved_count += 1
             try:
-                # 1. Send DM to assigned person if we found them
-                if slack_user_id:
-                    try:
-                        # Open DM channel
-                        im_url = "https://slack.com/api/conversations.open"
-                        im_response = requests.post(im_url, headers=headers, json={"users": slack_user_id}, timeout=5)
-                        im_data = im_response.json()
-                        
-                        if im_data.get("ok"):
-                            dm_channel_id = im_data.get("channel", {}).get("id")
-                            if dm_channel_id:
-                                # Send DM
-                                dm_url = "https://slack.com/api/chat.postMessage"
-                                dm_payload = {"channel": dm_channel_id, "text": dm_message, "mrkdwn": True}
-                                dm_result = requests.post(dm_url, headers=headers, json=dm_payload, timeout=10)
-                                if dm_result.json().get("ok"):
-                                    logger.info(f"✅ DM sent to {assigned_member_name}")
-                                else:
-                                    logger.warning(f"⚠️ Failed to send DM: {dm_result.json().get('error')}")
-                    except Exception as dm_error:
-                        logger.warning(f"⚠️ Error sending DM: {dm_error}")
-                
-                # 2. Send message to channel for team visibility
-                logger.info(f"📤 Sending task to channel: {channel_id}")
-                channel_url = "https://slack.com/api/chat.postMessage"
-                channel_payload = {"channel": channel_id, "text": channel_message, "mrkdwn": True}
-                
-                response = requests.post(channel_url, headers=headers, json=channel_payload, timeout=10)
-                slack_response = response.json()
-                
+                slack_response = channel_post.result(timeout=RESULT_TIMEOUT_SECONDS)
                 if slack_response.get("ok"):
-                    approved_count += 1
                     # Store Slack metadata for follow-ups
                     update_task(task_id, {
                         "status": "sent_to_slack",
@@ -973,11 +966,9 @@ Please confirm receipt and provide updates as you progress. Good luck! 🚀"""
                 else:
                     error_msg = slack_response.get('error', 'Unknown error')
                     logger.error(f"❌ Failed to send to channel: {error_msg}")
-                    approved_count += 1
                     update_task(task_id, {"status": "approved"})
             except Exception as send_error:
                 logger.error(f"❌ Error sending to Slack: {send_error}")
-                approved_count += 1
                 update_task(task_id, {"status": "approved"})
         
         return jsonify({
@@ -1030,6 +1021,7 @@ def get_weekly_deadlines_route():
 
 
 @project_bp.route("/projects/<project_id>/resolve-issue", methods=["POST"])
+@admit('resolve_issue')
 def resolve_issue(project_id):
     """Analyze issue question with project context and send solution to Slack"""
     auth_header = request.headers.get('Authorization')
@@ -1076,7 +1068,8 @@ def resolve_issue(project_id):
         slack_token = slack_token_info.get("bot_token") or slack_token_info.get("access_token")
         
         # Build project context from repos
-        project_context = ""
+        builder = ContextBuilder('resolve_issue', question)
+        repo_contexts = []
         repos = project.get('repos', [])
         
         if repos:
@@ -1088,7 +1081,7 @@ def resolve_issue(project_id):
                         owner, repo_name = full_name.split('/', 1)
                         logger.info(f"🔍 Analyzing {owner}/{repo_name}...")
                         context = create_deep_project_context(owner, repo_name, github_token)
-                        project_context += f"\n\n=== Repository: {full_name} ===\n{context}\n"
+                        repo_contexts.append((full_name, context))
                     else:
                         logger.warning(f"⚠️ Invalid repo format: {full_name}")
                 except Exception as e:
@@ -1097,17 +1090,16 @@ def resolve_issue(project_id):
         
         # Get project tasks for additional context
         tasks = get_project_tasks(project_id)
-        tasks_context = ""
         if tasks:
             tasks_context = "\n\n=== Project Tasks ===\n"
             for task in tasks[:10]:  # Limit to 10 tasks
                 tasks_context += f"- {task.get('title', 'Untitled')}: {task.get('description', '')[:100]}\n"
+            builder.add('tasks', tasks_context)
         
         # Build AI prompt
-        full_context = f"""PROJECT CONTEXT:
-{project_context}
-
-{tasks_context}
+        shared = shared_repo_context(repo_contexts)
+        full_context = f"""{"(Repositories: see PROJECT CONTEXT above)" if shared else "PROJECT CONTEXT:"}
+{builder.build()}
 
 USER QUESTION:
 {question}
@@ -1123,34 +1115,15 @@ Be specific and reference actual files/code from the repositories when relevant.
 
         # Call AI service
         logger.info("🤖 Calling AI service for issue resolution...")
-        import requests
-        import os
-        
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            return jsonify({"error": "AI service not configured"}), 500
-        
-        api_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent'
-        headers = {'Content-Type': 'application/json'}
-        payload = {
-            "contents": [{
-                "parts": [{"text": full_context}]
-            }]
-        }
-        params = {'key': api_key}
-        
-        response = requests.post(api_url, headers=headers, json=payload, params=params, timeout=60)
-        
-        if response.status_code != 200:
-            logger.error(f"❌ AI API error: {response.status_code} - {response.text}")
+        log_prompt('resolve_issue', full_context, context=shared)
+        from app.services.llm import generate_text
+        try:
+            solution = generate_text('resolve_issue', full_context, context=shared)
+        except Exception as e:
+            logger.error(f"❌ AI API error: {str(e)}")
             return jsonify({"error": "AI service error"}), 500
         
-        ai_response = response.json()
-        solution = ""
-        
-        if 'candidates' in ai_response and len(ai_response['candidates']) > 0:
-            solution = ai_response['candidates'][0]['content']['parts'][0]['text']
-        else:
+        if not solution:
             return jsonify({"error": "No response from AI"}), 500
         
         # Format message for Slack
@@ -1168,29 +1141,11 @@ _Generated by Feeta AI based on your project context_"""
         # Send to Slack
         logger.info(f"📤 Sending solution to Slack channel: {channel}")
         
-        # Join channel first
-        try:
-            join_url = "https://slack.com/api/conversations.join"
-            join_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-            join_payload = {"channel": channel}
-            requests.post(join_url, headers=join_headers, json=join_payload, timeout=5)
-        except Exception as e:
-            logger.warning(f"⚠️ Could not join channel: {str(e)}")
+        # Join channel first (skipped when the bot is known to be in it)
+        ensure_joined(slack_token, channel, slack_token_info.get("team_id"))
         
         # Send message
-        url = "https://slack.com/api/chat.postMessage"
-        headers = {
-            "Authorization": f"Bearer {slack_token}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "channel": channel,
-            "text": slack_message,
-            "parse": "full"
-        }
-        
-        slack_response = requests.post(url, headers=headers, json=payload, timeout=10)
-        slack_data = slack_response.json()
+        slack_data = post_message(slack_token, channel, slack_message, slack_token_info.get("team_id"), parse="full").result(timeout=RESULT_TIMEOUT_SECONDS)
         
         if slack_data.get("ok"):
             logger.info("✅ Solution sent to Slack successfully")
@@ -1263,32 +1218,15 @@ How's it going? Any blockers or questions? Let me know if you need help! 🚀"""
 
 Please share a quick status update when you can. Thanks! 👍"""
         
-        headers = {
-            "Authorization": f"Bearer {slack_token}",
-            "Content-Type": "application/json"
-        }
+        team_id = slack_token_info.get('team_id')
         
-        # Send DM
-        try:
-            im_url = "https://slack.com/api/conversations.open"
-            im_response = requests.post(im_url, headers=headers, json={"users": slack_user_id}, timeout=5)
-            im_data = im_response.json()
-            
-            if im_data.get("ok"):
-                dm_channel_id = im_data.get("channel", {}).get("id")
-                if dm_channel_id:
-                    dm_url = "https://slack.com/api/chat.postMessage"
-                    dm_payload = {"channel": dm_channel_id, "text": dm_followup, "mrkdwn": True}
-                    requests.post(dm_url, headers=headers, json=dm_payload, timeout=10)
-        except Exception as dm_error:
-            logger.warning(f"⚠️ Error sending follow-up DM: {dm_error}")
-        
-        # Send channel message
-        channel_url = "https://slack.com/api/chat.postMessage"
-        channel_payload = {"channel": slack_channel_id, "text": channel_followup, "mrkdwn": True}
-        response = requests.post(channel_url, headers=headers, json=channel_payload, timeout=10)
-        
-        if response.json().get("ok"):
+        # Queue the DM without waiting on it; a burst of follow-ups for the same task collapses into one
+        send_dm(slack_token, slack_user_id, dm_followup, team_id, mrkdwn=True).add_done_callback(
+            lambda sent: _log_dm_result(sent, slack_user_id))
+        response = post_message(slack_token, slack_channel_id, channel_followup, team_id,
+                                coalesce_key=f"followup:{task_id}", mrkdwn=True).result(timeout=RESULT_TIMEOUT_SECONDS)
+        
+        if response.get("ok"):
             # Update task with last follow-up time
             update_task(task_id, {"last_followup_at": datetime.utcnow()})
             return jsonify({"ok": True, "message": "Follow-up sent"})
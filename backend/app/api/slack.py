@@ -12,11 +12,30 @@ from datetime import datetime
 from app.config import Config
 import jwt
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from app.utils.slack_safety import check_rate_limit, check_question_length, get_safe_llm_config
+from app.utils.admission import admit
+from app.services.slack_directory import get_slack_directory, user_names
+from app.services.slack_messages import read_messages, latest_ts, ingest_event
+from app.services.mention_state import get_watermark, advance_watermark, mark_seen
+from app.services.event_bus import publish
+from app.services.slack_outbound import post_message, send_dm, RESULT_TIMEOUT_SECONDS
+from app.services.slack_membership import bot_user_id as get_bot_user_id, ensure_joined, apply_membership_event
+from app.utils.metrics import observe
 
 logger = logging.getLogger(__name__)
 slack_bp = Blueprint('slack', __name__)
 JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
+# Sent instead of an answer when the model is timing out or its circuit is open
+DEGRADED_MENTION_REPLY = "I'm having trouble reaching the AI model right now - please try asking again in a few minutes."
+# Mentions answered at once across all polls; each one is an LLM call plus a Slack post
+_mention_executor = ThreadPoolExecutor(max_workers=int(os.getenv('MENTION_WORKERS', '4')), thread_name_prefix='mention')
+# How long a poll waits for its mentions before returning; the rest finish in the background
+MENTION_DEADLINE_SECONDS = float(os.getenv('MENTION_DEADLINE_SECONDS', '20'))
+# Messages an auto-fetch poll scans after its watermark, read in pages of MENTION_SCAN_PAGE_SIZE
+MENTION_SCAN_PAGE_SIZE = 100
+MENTION_SCAN_MAX_MESSAGES = int(os.getenv('MENTION_SCAN_MAX_MESSAGES', '1000'))
 
 tokens_collection = None
 
@@ -310,44 +329,22 @@ def get_channel_history():
         if not channel_id:
             return jsonify({"error": "Channel ID required"}), 400
 
-        # Get messages from Slack API
-        url = "https://slack.com/api/conversations.history"
-        headers = {"Authorization": f"Bearer {slack_access_token}"}
-        params = {"channel": channel_id, "limit": limit}
+        # Served from the local message store, which only fetches what is new from Slack
+        messages = read_messages(slack_access_token, channel_id, slack_token_doc.get("team_id"), limit=limit)
         
-        response = requests.get(url, headers=headers, params=params)
-        data = response.json()
+        # Author names come from the cached workspace directory
+        user_cache = user_names(slack_access_token, [msg.get("user") for msg in messages], slack_token_doc.get("team_id"))
+        enriched_messages = []
         
-        if data.get("ok"):
-            messages = data.get("messages", [])
-            
-            # Get user info for each message
-            user_cache = {}
-            enriched_messages = []
-            
-            for msg in messages:
-                user_id_msg = msg.get("user")
-                if user_id_msg and user_id_msg not in user_cache:
-                    # Fetch user info
-                    user_url = "https://slack.com/api/users.info"
-                    user_response = requests.get(user_url, headers=headers, params={"user": user_id_msg})
-                    user_data = user_response.json()
-                    if user_data.get("ok"):
-                        user_cache[user_id_msg] = user_data.get("user", {}).get("real_name", "Unknown")
-                    else:
-                        user_cache[user_id_msg] = "Unknown"
-                
-                enriched_messages.append({
-                    "text": msg.get("text", ""),
-                    "user": user_cache.get(msg.get("user"), "Bot"),
-                    "timestamp": msg.get("ts", ""),
-                    "type": msg.get("type", "message")
-                })
-            
-            return jsonify({"ok": True, "messages": enriched_messages})
-        else:
-            logger.error(f"❌ Slack API error: {data.get('error')}")
-            return jsonify({"error": data.get("error", "Unknown Slack API error")}), 500
+        for msg in messages:
+            enriched_messages.append({
+                "text": msg.get("text", ""),
+                "user": user_cache.get(msg.get("user"), "Bot"),
+                "timestamp": msg.get("ts", ""),
+                "type": "message"
+            })
+        
+        return jsonify({"ok": True, "messages": enriched_messages})
             
     except jwt.ExpiredSignatureError:
         return jsonify({"error": "Token expired"}), 401
@@ -367,10 +364,30 @@ def summarize_channel():
     try:
         # Get user's JWT token
         token = auth_header.replace('Bearer ', '')
-        jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
         
         body = request.get_json()
         messages = body.get("messages", [])
+        channel_id = body.get("channel")
+        
+        if channel_id and not messages:
+            # Incremental: only messages since the channel's last summary are fetched and folded in
+            slack_token_doc = get_token_for_user(payload['user_id'])
+            if not slack_token_doc or not slack_token_doc.get('access_token'):
+                return jsonify({"error": "Slack not connected for this user"}), 400
+            
+            from app.services.slack_summary import refresh_channel_summary
+            result = refresh_channel_summary(slack_token_doc['access_token'], channel_id, slack_token_doc.get('team_id'))
+            summary = result['summary'] or {
+                "key_updates": [], "active_users": [], "blockers": [], "progress_indicators": [],
+                "overall_status": "No recent messages in this channel", "sentiment": "neutral", "action_items": []
+            }
+            return jsonify({
+                "ok": True,
+                "summary": summary,
+                "last_ts": result['last_ts'],
+                "new_messages": result['new_messages']
+            })
         
         if not messages:
             return jsonify({"error": "No messages provided"}), 400
@@ -425,13 +442,9 @@ def send_message():
         # Auto-match team member with Slack user if assigned_to is provided
         if assigned_to and not mention_user_id:
             try:
-                users_url = "https://slack.com/api/users.list"
-                headers_list = {"Authorization": f"Bearer {slack_token}"}
-                users_response = requests.get(users_url, headers=headers_list, timeout=10)
-                users_data = users_response.json()
+                slack_users = get_slack_directory(slack_token, token_info.get("team_id"))
                 
-                if users_data.get("ok"):
-                    slack_users = users_data.get("members", [])
+                if slack_users is not None:
                     assigned_lower = assigned_to.lower().strip()
                     
                     # Try exact match first
@@ -470,14 +483,8 @@ def send_message():
             except Exception as e:
                 logger.warning(f"⚠️ Could not auto-match team member: {str(e)}")
         
-        # Join channel first
-        try:
-            join_url = "https://slack.com/api/conversations.join"
-            join_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-            join_payload = {"channel": channel}
-            requests.post(join_url, headers=join_headers, json=join_payload)
-        except Exception as e:
-            logger.warning(f"⚠️ Could not join channel: {str(e)}")
+        # Join channel first (skipped when the bot is known to be in it)
+        ensure_joined(slack_token, channel, token_info.get("team_id"))
         
         # Format message with proper user mention or fallback to name
         if mention_user_id:
@@ -491,17 +498,8 @@ def send_message():
         else:
             final_text = text
         
-        url = "https://slack.com/api/chat.postMessage"
-        headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-        payload = {
-            "channel": channel, 
-            "text": final_text,
-            "link_names": True,
-            "parse": "full"
-        }
-        
-        response = requests.post(url, headers=headers, json=payload)
-        data = response.json()
+        data = post_message(slack_token, channel, final_text, token_info.get("team_id"),
+                            link_names=True, parse="full").result(timeout=RESULT_TIMEOUT_SECONDS)
         
         logger.info(f"Slack response: {json.dumps(data, indent=2)}")
         
@@ -531,11 +529,18 @@ def slack_events():
             event = data.get("event", {})
             event_type = event.get("type")
             
+            # Keep the bot's channel membership cache current
+            if event_type in ("member_joined_channel", "member_left_channel", "channel_left"):
+                apply_membership_event(data.get("team_id"), event)
+                return jsonify({"ok": True})
+            
             # Handle regular messages (for task tracking)
             if event_type == "message":
                 logger.info("💬 Regular message received in Slack")
                 
                 team_id = data.get("team_id")
+                # Every message (bots, edits, deletions included) keeps the local store current
+                ingest_event(team_id, event)
                 if not team_id:
                     return jsonify({"ok": True})
                 
@@ -598,6 +603,14 @@ def slack_events():
                             
                             if success:
                                 logger.info(f"🎉 Task '{task_title}' auto-updated to completed!")
+                                publish(user_id_in_db, 'task_updated', {
+                                    "task_id": task_id,
+                                    "project_id": matching_task.get('project_id'),
+                                    "title": task_title,
+                                    "status": 'completed',
+                                    "updated_by": slack_user_name,
+                                    "source": 'slack'
+                                })
                                 
                                 confirmation_msg = f"✅ Great! I've marked the task *\"{task_title}\"* as completed. Nice work, <@{slack_user_id}>!"
                                 send_message_to_channel(slack_token, channel, confirmation_msg, event.get("ts"))
@@ -638,11 +651,7 @@ def slack_events():
                 logger.info(f"💬 Message text: {text[:100]}...")
                 
                 # Get bot user ID to filter out bot's own messages
-                bot_info_url = "https://slack.com/api/auth.test"
-                bot_info_headers = {"Authorization": f"Bearer {slack_token}"}
-                bot_info_resp = requests.get(bot_info_url, headers=bot_info_headers, timeout=5)
-                bot_info = bot_info_resp.json()
-                bot_user_id = bot_info.get("user_id") if bot_info.get("ok") else None
+                bot_user_id = get_bot_user_id(slack_token)
                 
                 # Skip if the message is from the bot itself
                 if slack_user_id == bot_user_id:
@@ -743,61 +752,31 @@ def send_message_to_channel(slack_token, channel_id, message, thread_ts=None):
         logger.info(f"📝 Message length: {len(message)} characters")
         logger.info("="*80)
         
-        # Join channel first (required for public channels)
-        try:
-            join_url = "https://slack.com/api/conversations.join"
-            join_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-            join_payload = {"channel": channel_id}
-            join_response = requests.post(join_url, headers=join_headers, json=join_payload, timeout=5)
-            join_data = join_response.json()
-            if join_data.get("ok"):
-                logger.info(f"✅ Successfully joined channel: {channel_id}")
-            else:
-                logger.warning(f"⚠️ Could not join channel (may already be in channel): {join_data.get('error')}")
-        except Exception as e:
-            logger.warning(f"⚠️ Error joining channel: {str(e)}")
+        # Join channel first (required for public channels; skipped when the bot is known to be in it)
+        ensure_joined(slack_token, channel_id)
         
         # Send message
-        url = "https://slack.com/api/chat.postMessage"
-        headers = {
-            "Authorization": f"Bearer {slack_token}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "channel": channel_id,
-            "text": message,
-            "parse": "full"
-        }
+        fields = {"parse": "full"}
         
         # Add thread_ts if provided (to reply in thread)
         if thread_ts:
-            payload["thread_ts"] = thread_ts
+            fields["thread_ts"] = thread_ts
             logger.info(f"💬 Sending as thread reply to message: {thread_ts}")
         else:
             logger.info(f"💬 Sending as new message (not a thread reply)")
         
         logger.info(f"📨 Sending message to Slack API...")
-        logger.info(f"🌐 API URL: {url}")
         logger.info(f"📋 Payload: channel={channel_id}, thread_ts={thread_ts}, message_length={len(message)}")
-        logger.info(f"🔑 Authorization header present: {bool(headers.get('Authorization'))}")
         logger.info(f"📝 Message preview (first 200 chars): {message[:200]}...")
         
-        # Make the actual HTTP request
-        logger.info("="*60)
-        logger.info("🚀 MAKING HTTP POST REQUEST TO SLACK API")
-        logger.info("="*60)
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        
-        logger.info(f"📥 HTTP Response Status Code: {response.status_code}")
-        logger.info(f"📥 HTTP Response Headers: {dict(response.headers)}")
+        # Queued behind Slack's per-channel rate limit; waits for the send to complete
+        data = post_message(slack_token, channel_id, message, **fields).result(timeout=RESULT_TIMEOUT_SECONDS)
         
-        data = response.json()
         logger.info(f"📥 Slack API Response JSON: {data}")
         
         # Log the actual API call details
         logger.info("="*60)
         logger.info("📡 SLACK API CALL COMPLETED")
-        logger.info(f"   Status: {response.status_code}")
         logger.info(f"   Success: {data.get('ok', False)}")
         if data.get('ts'):
             logger.info(f"   Message TS: {data.get('ts')}")
@@ -815,18 +794,12 @@ def send_message_to_channel(slack_token, channel_id, message, thread_ts=None):
                 logger.error(f"❌ Channel {channel_id} not found. Make sure the bot is in the channel.")
             elif error_msg == "not_in_channel":
                 logger.error(f"❌ Bot is not in channel {channel_id}. Trying to join...")
-                # Try joining again
+                # Try joining again (the outbound queue already dropped the stale membership)
                 try:
-                    retry_join_url = "https://slack.com/api/conversations.join"
-                    retry_join_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-                    retry_join_payload = {"channel": channel_id}
-                    join_response = requests.post(retry_join_url, headers=retry_join_headers, json=retry_join_payload, timeout=5)
-                    join_data = join_response.json()
-                    if join_data.get("ok"):
+                    if ensure_joined(slack_token, channel_id):
                         logger.info("✅ Successfully joined channel, retrying message send...")
                         # Retry sending
-                        retry_response = requests.post(url, headers=headers, json=payload, timeout=10)
-                        retry_data = retry_response.json()
+                        retry_data = post_message(slack_token, channel_id, message, **fields).result(timeout=RESULT_TIMEOUT_SECONDS)
                         if retry_data.get("ok"):
                             logger.info(f"✅ Message sent successfully after joining! Channel: {channel_id}, TS: {retry_data.get('ts')}")
                             return True
@@ -846,6 +819,56 @@ def send_message_to_channel(slack_token, channel_id, message, thread_ts=None):
         return False
 
 
+def publish_mention(user_id, channel, ts, user_name, question, status):
+    """Tell the app installer's open dashboards about a mention and how its processing went"""
+    publish(user_id, 'mention', {
+        "mention_id": f"{channel}_{ts}",
+        "channel": channel,
+        "ts": ts,
+        "user_name": user_name,
+        "question": question,
+        "status": status
+    })
+
+def _process_mention(user_id, slack_token, channel, project_id, mention):
+    """Answer one mention in its thread; True when the reply was posted (or nothing was needed)"""
+    slack_user_id = mention["user"]
+    question = mention["question"]
+    slack_user_name = mention.get("user_name", "Unknown User")
+    logger.info(f"🔍 Processing mention from {slack_user_name} (Slack ID: {slack_user_id}) in {channel}: {question[:200]}")
+    try:
+        if project_id:
+            return handle_mention_with_project_context(user_id, slack_token, channel, slack_user_id, question, slack_user_name, project_id, mention.get("ts"))
+        return handle_mention_with_context(user_id, slack_token, channel, slack_user_id, question, slack_user_name, mention.get("ts"))
+    except Exception as e:
+        logger.error(f"❌ Error processing mention: {str(e)}")
+        return False
+
+
+def dispatch_mentions(user_id, slack_token, channel, project_id, mentions):
+    """
+    Process mentions on the shared mention pool and wait for them up to MENTION_DEADLINE_SECONDS
+
+    Mentions still running at the deadline keep going in the background; their outcome is pushed
+    to the installer's dashboards as 'mention' events and recorded in processed_mentions.
+
+    Returns:
+        dict: ts -> 'processed', 'failed' or 'pending'
+    """
+    started = time.time()
+    futures = {
+        _mention_executor.submit(_process_mention, user_id, slack_token, channel, project_id, mention): mention["ts"]
+        for mention in mentions
+    }
+    done, not_done = wait(futures, timeout=MENTION_DEADLINE_SECONDS)
+    statuses = {futures[f]: ("processed" if f.result() else "failed") for f in done}
+    statuses.update({futures[f]: "pending" for f in not_done})
+    observe('mention_batch_seconds', time.time() - started, {'deadline_hit': str(bool(not_done)).lower()})
+    if not_done:
+        logger.info(f"⏳ {len(not_done)} mention(s) in {channel} still running after {MENTION_DEADLINE_SECONDS}s - finishing in the background")
+    return statuses
+
+
 def handle_mention_with_context(user_id, slack_token, channel, slack_user_id, question, user_name, thread_ts=None):
     """Handle mention by responding directly to the question"""
     try:
@@ -860,14 +883,15 @@ def handle_mention_with_context(user_id, slack_token, channel, slack_user_id, qu
         
 
         # SAFETY CHECKS
-        if check_rate_limit(processed_mentions, slack_user_id, user_name):
-            return True
         if check_question_length(question):
             return True
+        if check_rate_limit(slack_user_id, user_name):
+            return True
         
         logger.info("="*60)
         logger.info("🚀 FEETA MENTION PROCESSING STARTED")
         logger.info("="*60)
+        publish_mention(user_id, channel, thread_ts, user_name, question, 'processing')
         logger.info(f"👤 User: {user_name} (ID: {user_id})")
         logger.info(f"❓ Question: {question}")
         logger.info(f"📢 Channel ID: {channel} (will send reply here)")
@@ -903,14 +927,8 @@ Format your response in a friendly, helpful tone suitable for Slack."""
         logger.info("🔄 Calling Vertex AI Gemini...")
         
         try:
-            from vertexai.generative_models import GenerativeModel
-            model = GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content(
-                full_context,
-                generation_config={'temperature': 0.7, 'max_output_tokens': 2048}
-            )
-            
-            solution = response.text
+            from app.services.llm import generate_text
+            solution = generate_text('slack_mention', full_context, degraded=DEGRADED_MENTION_REPLY, temperature=0.7)
             logger.info("✅ LLM response received successfully")
             logger.info(f"📄 Solution length: {len(solution)} characters")
             logger.info("="*60)
@@ -961,14 +979,17 @@ _Generated by Feeta AI_"""
         else:
             logger.error("❌❌❌ FAILED TO SEND SOLUTION TO SLACK ❌❌❌")
             logger.error("="*60)
+        publish_mention(user_id, channel, thread_ts, user_name, question, 'answered' if result else 'failed')
         return result
         
     except Exception as e:
         logger.error(f"❌ Error handling mention: {str(e)}")
+        publish_mention(user_id, channel, thread_ts, user_name, question, 'failed')
         return False
 
 
 @slack_bp.route("/api/resolve-issue", methods=["POST"])
+@admit('resolve_issue')
 def resolve_issue_general():
     """Resolve issue without requiring a specific project - uses all user projects"""
     auth_header = request.headers.get('Authorization')
@@ -1015,10 +1036,13 @@ def resolve_issue_general():
         # Build context from all user projects
         from app.database.mongodb import get_user_projects, get_project_tasks
         from app.services.ai_service import create_deep_project_context
+        from app.services.context_builder import ContextBuilder, log_prompt
+        from app.services.context_cache import shared_repo_context
         
         projects = get_user_projects(user_id)
         
-        project_context = ""
+        builder = ContextBuilder('resolve_issue', question)
+        repo_contexts = []
         if projects:
             logger.info(f"📦 Analyzing {len(projects)} projects...")
             all_repos = []
@@ -1035,13 +1059,12 @@ def resolve_issue_general():
                         owner, repo_name = full_name.split('/', 1)
                         logger.info(f"🔍 Analyzing {owner}/{repo_name}...")
                         context = create_deep_project_context(owner, repo_name, github_token)
-                        project_context += f"\n\n=== Repository: {full_name} ===\n{context}\n"
+                        repo_contexts.append((full_name, context))
                 except Exception as e:
                     logger.error(f"❌ Error analyzing repo {repo.get('name')}: {str(e)}")
                     continue
         
         # Get tasks from all projects
-        tasks_context = ""
         all_tasks = []
         for project in projects:
             project_id = str(project.get('_id', ''))
@@ -1054,11 +1077,12 @@ def resolve_issue_general():
                 status = task.get('status', 'unknown')
                 if status in ['in_progress', 'approved', 'pending_approval', 'pending']:
                     tasks_context += f"- {task.get('title', 'Untitled')}: {task.get('description', '')[:100]}\n"
+            builder.add('tasks', tasks_context)
         
         # Build AI prompt
-        full_context = f"""PROJECT CONTEXT:
-{project_context}
-{tasks_context}
+        shared = shared_repo_context(repo_contexts)
+        full_context = f"""{"(Repositories: see PROJECT CONTEXT above)" if shared else "PROJECT CONTEXT:"}
+{builder.build()}
 
 USER QUESTION:
 {question}
@@ -1070,33 +1094,17 @@ Analyze the question in the context of the project repositories and tasks above.
 4. Code examples (if relevant)
 5. Prevention tips (if applicable)
 Be specific and reference actual files/code from the repositories when relevant."""
+        log_prompt('resolve_issue', full_context, context=shared)
         
         # Call AI service
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            return jsonify({"error": "AI service not configured"}), 500
-        
-        api_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent'
-        headers = {'Content-Type': 'application/json'}
-        payload = {
-            "contents": [{
-                "parts": [{"text": full_context}]
-            }]
-        }
-        params = {'key': api_key}
-        
-        response = requests.post(api_url, headers=headers, json=payload, params=params, timeout=60)
-        
-        if response.status_code != 200:
-            logger.error(f"❌ AI API error: {response.status_code} - {response.text}")
+        from app.services.llm import generate_text
+        try:
+            solution = generate_text('resolve_issue', full_context, context=shared)
+        except Exception as e:
+            logger.error(f"❌ AI API error: {str(e)}")
             return jsonify({"error": "AI service error"}), 500
         
-        ai_response = response.json()
-        solution = ""
-        
-        if 'candidates' in ai_response and len(ai_response['candidates']) > 0:
-            solution = ai_response['candidates'][0]['content']['parts'][0]['text']
-        else:
+        if not solution:
             return jsonify({"error": "No response from AI"}), 500
         
         # Format and send message to channel
@@ -1108,15 +1116,7 @@ Be specific and reference actual files/code from the repositories when relevant.
 ---
 _Generated by Feeta AI based on your project context_"""
         
-        # Join channel and send message
-        try:
-            join_url = "https://slack.com/api/conversations.join"
-            join_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-            join_payload = {"channel": channel}
-            requests.post(join_url, headers=join_headers, json=join_payload, timeout=5)
-        except:
-            pass
-        
+        # Send message (joins the channel first if needed)
         result = send_message_to_channel(slack_token, channel, message, None)
         
         if result:
@@ -1137,48 +1137,22 @@ _Generated by Feeta AI based on your project context_"""
 
 
 def send_dm_to_user(slack_token, slack_user_id, message):
-    """Send a direct message to a Slack user"""
-    try:
-        # Open DM channel
-        im_url = "https://slack.com/api/conversations.open"
-        im_headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-        im_payload = {"users": slack_user_id}
-        
-        im_response = requests.post(im_url, headers=im_headers, json=im_payload, timeout=5)
-        im_data = im_response.json()
-        
-        if not im_data.get("ok"):
-            logger.error(f"Failed to open DM: {im_data.get('error')}")
-            return
-        
-        channel_id = im_data.get("channel", {}).get("id")
-        if not channel_id:
-            logger.error("No channel ID in DM response")
-            return
-        
-        # Send message
-        url = "https://slack.com/api/chat.postMessage"
-        headers = {
-            "Authorization": f"Bearer {slack_token}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "channel": channel_id,
-            "text": message,
-            "parse": "full"
-        }
-        
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        data = response.json()
-        
-        if not data.get("ok"):
-            logger.error(f"Failed to send DM: {data.get('error')}")
-        
-    except Exception as e:
-        logger.error(f"❌ Error sending DM: {str(e)}")
+    """Send a direct message to a Slack user (queued - returns a Future of the chat.postMessage response)"""
+    def _log_failure(sent):
+        try:
+            data = sent.result()
+            if not data.get("ok"):
+                logger.error(f"Failed to send DM: {data.get('error')}")
+        except Exception as e:
+            logger.error(f"❌ Error sending DM: {str(e)}")
+    
+    future = send_dm(slack_token, slack_user_id, message, parse="full")
+    future.add_done_callback(_log_failure)
+    return future
 
 
 @slack_bp.route("/api/check-channel-mentions", methods=["POST"])
+@admit('check_mentions')
 def check_channel_mentions():
     """Check a specific channel for @Feeta mentions and process them"""
     auth_header = request.headers.get('Authorization')
@@ -1195,7 +1169,7 @@ def check_channel_mentions():
         channel_id = body.get('channel')
         project_id = body.get('project_id')
         auto_fetch = body.get('auto_fetch', False)  # Flag for auto-fetch mode
-        processed_mention_ids = body.get('processed_mention_ids', [])  # Already processed mention IDs
+        processed_mention_ids = body.get('processed_mention_ids', [])  # Optional - seen mentions are tracked server-side
         
         if not channel_id:
             return jsonify({"error": "channel is required"}), 400
@@ -1212,35 +1186,46 @@ def check_channel_mentions():
         slack_token = token_info.get("bot_token") or token_info.get("access_token")
         team_id = token_info.get("team_id")
         
-        # Get bot user ID to identify mentions
-        bot_info_url = "https://slack.com/api/auth.test"
-        bot_info_headers = {"Authorization": f"Bearer {slack_token}"}
-        bot_info_resp = requests.get(bot_info_url, headers=bot_info_headers, timeout=5)
-        bot_info = bot_info_resp.json()
+        # Auto-fetch polls only scan messages after this user's watermark for the channel
+        watermark = get_watermark(user_id, channel_id) if auto_fetch else None
+        if auto_fetch:
+            newest_ts = latest_ts(slack_token, channel_id, team_id)
+            if not newest_ts or (watermark and float(newest_ts) <= float(watermark)):
+                return jsonify({
+                    "ok": True,
+                    "processed_count": 0,
+                    "mentions_found": 0,
+                    "message": "No new messages",
+                    "logs": [],
+                    "messages": [],
+                    "mentions": []
+                })
         
-        if not bot_info.get("ok"):
+        # Get bot user ID to identify mentions
+        bot_user_id = get_bot_user_id(slack_token)
+        if not bot_user_id:
             return jsonify({"error": "Failed to get bot info"}), 500
         
-        bot_user_id = bot_info.get("user_id")
         logger.info(f"🤖 Bot user ID: {bot_user_id}")
         
-        # Get channel messages (last 100 messages)
-        messages_url = "https://slack.com/api/conversations.history"
-        messages_headers = {"Authorization": f"Bearer {slack_token}"}
-        messages_params = {
-            "channel": channel_id,
-            "limit": 100
-        }
-        
-        messages_resp = requests.get(messages_url, headers=messages_headers, params=messages_params, timeout=10)
-        messages_data = messages_resp.json()
-        
-        if not messages_data.get("ok"):
-            error_msg = messages_data.get('error', 'Unknown error')
-            logger.error(f"Failed to get messages: {error_msg}")
-            return jsonify({"error": f"Failed to get messages: {error_msg}"}), 500
+        # Get channel messages from the local store: the last 100, or every message after the
+        # watermark (oldest first, page by page) so a long gap between polls skips no mentions
+        try:
+            if watermark:
+                messages = []
+                page_oldest = watermark
+                while len(messages) < MENTION_SCAN_MAX_MESSAGES:
+                    page = read_messages(slack_token, channel_id, team_id, limit=MENTION_SCAN_PAGE_SIZE, oldest=page_oldest)
+                    messages.extend(page)
+                    if len(page) < MENTION_SCAN_PAGE_SIZE:
+                        break
+                    page_oldest = page[-1]["ts"]
+            else:
+                messages = read_messages(slack_token, channel_id, team_id, limit=MENTION_SCAN_PAGE_SIZE)
+        except Exception as e:
+            logger.error(f"Failed to get messages: {str(e)}")
+            return jsonify({"error": f"Failed to get messages: {str(e)}"}), 500
         
-        messages = messages_data.get("messages", [])
         if not auto_fetch:
             logger.info(f"📨 Found {len(messages)} messages in channel")
         
@@ -1343,6 +1328,13 @@ def check_channel_mentions():
             if not auto_fetch:
                 processed_messages.append(message_info)
         
+        if auto_fetch:
+            # Surface each mention once per user, tracked server-side instead of echoed by the client
+            new_mention_ids = mark_seen(user_id, [f"{channel_id}_{m['ts']}" for m in mentions])
+            mentions = [m for m in mentions if f"{channel_id}_{m['ts']}" in new_mention_ids]
+            # Only as far as the messages actually scanned - a capped scan resumes there next poll
+            advance_watermark(user_id, channel_id, max((m["ts"] for m in messages), key=float, default=None))
+        
         if not auto_fetch:
             logs.append({
                 "type": "info",
@@ -1363,120 +1355,57 @@ def check_channel_mentions():
                 "messages": processed_messages[:50] if not auto_fetch else []  # Skip messages in auto-fetch mode
             })
         
-        # Process each mention
-        processed_count = 0
-        from app.database.mongodb import db
-        users_collection = db['users']
+        # Process mentions concurrently; whatever misses the deadline finishes in the background
+        token_owner_user_id = token_info.get("user_id")
+        if not token_owner_user_id:
+            logger.error("❌ No user_id found in token_info")
+            if not auto_fetch:
+                logs.append({
+                    "type": "error",
+                    "message": f"❌ Could not process mention(s) - app not properly configured",
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+            return jsonify({
+                "ok": True,
+                "processed_count": 0,
+                "mentions_found": len(mentions),
+                "message": "Processed 0 mention(s)",
+                "logs": logs if not auto_fetch else [],
+                "messages": processed_messages[:100] if not auto_fetch else [],
+                "mentions": []
+            })
         
-        logger.info(f"🚀 Starting to process {len(mentions)} mention(s)...")
+        # Use the app installer's context (token owner) - no need to match by email
+        logger.info(f"🚀 Dispatching {len(mentions)} mention(s) (deadline {MENTION_DEADLINE_SECONDS}s)...")
+        statuses = dispatch_mentions(token_owner_user_id, slack_token, channel_id, project_id, mentions)
+        processed_count = sum(1 for status in statuses.values() if status == "processed")
+        pending_count = sum(1 for status in statuses.values() if status == "pending")
         
-        for mention in mentions:
-            try:
-                slack_user_id = mention["user"]
-                question = mention["question"]
+        if not auto_fetch:
+            for mention in mentions:
+                status = statuses[mention["ts"]]
                 slack_user_name = mention.get("user_name", "Unknown User")
-                
-                if not auto_fetch:
+                if status == "processed":
                     logs.append({
-                        "type": "info",
-                        "message": f"🔍 Processing mention from {slack_user_name}: {question[:50]}...",
+                        "type": "success",
+                        "message": f"✅ Successfully processed and sent solution to {slack_user_name}",
                         "timestamp": datetime.utcnow().isoformat()
                     })
-                
-                # Update message status (only if not in auto-fetch mode)
-                if not auto_fetch:
-                    for msg in processed_messages:
-                        if msg.get("user") == slack_user_id and msg.get("is_mention"):
-                            msg["status"] = "processing"
-                
-                # Use the app installer's context (token owner) - no need to match by email
-                # Just get the name and use the installer's projects/repos for context
-                token_owner_user_id = token_info.get("user_id")
-                
-                if not token_owner_user_id:
-                    logger.error("❌ No user_id found in token_info")
-                    if not auto_fetch:
-                        logs.append({
-                            "type": "error",
-                            "message": f"❌ Could not process mention - app not properly configured",
-                            "timestamp": datetime.utcnow().isoformat()
-                        })
-                    continue
-                
-                logger.info(f"✅ Using app installer's context (user_id: {token_owner_user_id})")
-                logger.info(f"👤 Question from: {slack_user_name} (Slack ID: {slack_user_id})")
-                
-                db_user_id = token_owner_user_id
-                
-                if not auto_fetch:
+                elif status == "pending":
                     logs.append({
                         "type": "info",
-                        "message": f"📦 Analyzing project context for {slack_user_name}...",
+                        "message": f"⏳ Still working on {slack_user_name}'s question - the reply will be posted in Slack when ready",
                         "timestamp": datetime.utcnow().isoformat()
                     })
-                
-                # Process with project context if project_id provided
-                logger.info("="*60)
-                logger.info("🚀 STARTING MENTION PROCESSING")
-                logger.info("="*60)
-                logger.info(f"📢 Processing mention from channel: {channel_id}")
-                logger.info(f"❓ Question: {question}")
-                logger.info(f"👤 User: {slack_user_name} (Slack ID: {slack_user_id})")
-                logger.info(f"🧵 Thread TS: {mention.get('ts')}")
-                logger.info(f"📁 Project ID: {project_id if project_id else 'None (using all projects)'}")
-                
-                if project_id:
-                    # Use specific project context
-                    logger.info(f"📁 Using project-specific context: {project_id}")
-                    logger.info("🔄 Calling handle_mention_with_project_context...")
-                    result = handle_mention_with_project_context(db_user_id, slack_token, channel_id, slack_user_id, question, slack_user_name, project_id, mention.get("ts"))
-                    logger.info(f"📊 handle_mention_with_project_context returned: {result}")
                 else:
-                    # Use general context (all projects)
-                    logger.info("📁 Using general context (all projects)")
-                    logger.info("🔄 Calling handle_mention_with_context...")
-                    result = handle_mention_with_context(db_user_id, slack_token, channel_id, slack_user_id, question, slack_user_name, mention.get("ts"))
-                    logger.info(f"📊 handle_mention_with_context returned: {result}")
-                
-                logger.info("="*60)
-                logger.info(f"✅ MENTION PROCESSING COMPLETE - Result: {result}")
-                logger.info("="*60)
-                
-                if result:
-                    processed_count += 1
-                    logger.info(f"✅ Processed mention from {slack_user_name}")
-                    if not auto_fetch:
-                        logs.append({
-                            "type": "success",
-                            "message": f"✅ Successfully processed and sent solution to {slack_user_name}",
-                            "timestamp": datetime.utcnow().isoformat()
-                        })
-                        for msg in processed_messages:
-                            if msg.get("user") == slack_user_id and msg.get("is_mention"):
-                                msg["status"] = "processed"
-                else:
-                    if not auto_fetch:
-                        logs.append({
-                            "type": "error",
-                            "message": f"❌ Failed to process mention from {slack_user_name}",
-                            "timestamp": datetime.utcnow().isoformat()
-                        })
-                        for msg in processed_messages:
-                            if msg.get("user") == slack_user_id and msg.get("is_mention"):
-                                msg["status"] = "error"
-                
-            except Exception as e:
-                logger.error(f"❌ Error processing mention: {str(e)}")
-                if not auto_fetch:
                     logs.append({
                         "type": "error",
-                        "message": f"❌ Error: {str(e)}",
+                        "message": f"❌ Failed to process mention from {slack_user_name}",
                         "timestamp": datetime.utcnow().isoformat()
                     })
-                    for msg in processed_messages:
-                        if msg.get("user") == mention.get("user") and msg.get("is_mention"):
-                            msg["status"] = "error"
-                continue
+                for msg in processed_messages:
+                    if msg.get("is_mention") and msg.get("timestamp") == float(mention["ts"]):
+                        msg["status"] = "processing" if status == "pending" else status
         
         # Prepare mentions data for auto-fetch mode
         mentions_data = []
@@ -1487,14 +1416,16 @@ def check_channel_mentions():
                     "user_name": mention.get("user_name", "Unknown User"),
                     "question": mention.get("question", ""),
                     "text": mention.get("text", ""),
-                    "ts": mention.get("ts")
+                    "ts": mention.get("ts"),
+                    "status": statuses[mention["ts"]]
                 })
         
         return jsonify({
             "ok": True,
             "processed_count": processed_count,
+            "pending_count": pending_count,
             "mentions_found": len(mentions),
-            "message": f"Processed {processed_count} mention(s)",
+            "message": f"Processed {processed_count} mention(s)" + (f", {pending_count} still in progress" if pending_count else ""),
             "logs": logs if not auto_fetch else [],
             "messages": processed_messages[:100] if not auto_fetch else [],  # Skip messages in auto-fetch mode
             "mentions": mentions_data if auto_fetch else []  # Return mentions details in auto-fetch mode
@@ -1521,14 +1452,15 @@ def handle_mention_with_project_context(user_id, slack_token, channel, slack_use
             return True
         
         # SAFETY CHECKS
-        if check_rate_limit(processed_mentions, slack_user_id, user_name):
-            return True
         if check_question_length(question):
             return True
+        if check_rate_limit(slack_user_id, user_name):
+            return True
         
         logger.info("="*60)
         logger.info("🚀 FEETA MENTION PROCESSING STARTED")
         logger.info("="*60)
+        publish_mention(user_id, channel, thread_ts, user_name, question, 'processing')
         logger.info(f"👤 User: {user_name} (ID: {user_id})")
         logger.info(f"❓ Question: {question}")
         logger.info(f"📢 Channel ID: {channel} (will send reply here)")
@@ -1564,14 +1496,8 @@ Format your response in a friendly, helpful tone suitable for Slack."""
         logger.info("🔄 Calling Vertex AI Gemini...")
         
         try:
-            from vertexai.generative_models import GenerativeModel
-            model = GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content(
-                full_context,
-                generation_config={'temperature': 0.7, 'max_output_tokens': 2048}
-            )
-            
-            solution = response.text
+            from app.services.llm import generate_text
+            solution = generate_text('slack_mention', full_context, degraded=DEGRADED_MENTION_REPLY, temperature=0.7)
             logger.info("✅ LLM response received successfully")
             logger.info(f"📄 Solution length: {len(solution)} characters")
             logger.info("="*60)
@@ -1622,10 +1548,12 @@ _Generated by Feeta AI_"""
         else:
             logger.error("❌❌❌ FAILED TO SEND SOLUTION TO SLACK ❌❌❌")
             logger.error("="*60)
+        publish_mention(user_id, channel, thread_ts, user_name, question, 'answered' if result else 'failed')
         return result
         
     except Exception as e:
         logger.error(f"❌ Error handling mention with project context: {str(e)}")
+        publish_mention(user_id, channel, thread_ts, user_name, question, 'failed')
         return False
 
 
@@ -1650,15 +1578,10 @@ def list_users():
         
         slack_token = token_info.get("bot_token") or token_info.get("access_token")
         
-        users_url = "https://slack.com/api/users.list"
-        headers = {"Authorization": f"Bearer {slack_token}"}
-        response = requests.get(users_url, headers=headers, timeout=10)
-        data = response.json()
-        
-        if not data.get("ok"):
-            return jsonify({"error": data.get("error", "Failed to fetch users")}), 500
+        members = get_slack_directory(slack_token, token_info.get("team_id"))
+        if members is None:
+            return jsonify({"error": "Failed to fetch users"}), 500
         
-        members = data.get("members", [])
         users = [{
             "id": m["id"],
             "name": m.get("name"),
@@ -1704,15 +1627,10 @@ def match_team_members():
         slack_token = token_info.get("bot_token") or token_info.get("access_token")
         
         # Get all Slack users
-        users_url = "https://slack.com/api/users.list"
-        headers = {"Authorization": f"Bearer {slack_token}"}
-        response = requests.get(users_url, headers=headers, timeout=10)
-        data = response.json()
-        
-        if not data.get("ok"):
+        slack_users = get_slack_directory(slack_token, token_info.get("team_id"))
+        if slack_users is None:
             return jsonify({"error": "Failed to fetch Slack users"}), 500
         
-        slack_users = data.get("members", [])
         matches = []
         
         # Match each team member with Slack users
@@ -1781,16 +1699,13 @@ def check_user_status():
         slack_token = token_info.get("bot_token") or token_info.get("access_token")
         
         # Get all users in workspace
-        users_url = "https://slack.com/api/users.list"
-        headers = {"Authorization": f"Bearer {slack_token}"}
-        response = requests.get(users_url, headers=headers, timeout=10)
-        data = response.json()
-        
-        if not data.get("ok"):
+        members = get_slack_directory(slack_token, token_info.get("team_id"))
+        if members is None:
             return jsonify({"available": False, "reason": "Failed to fetch Slack users"})
         
+        headers = {"Authorization": f"Bearer {slack_token}"}
+        
         # Find user by name match
-        members = data.get("members", [])
         matched_user = None
         
         for member in members:
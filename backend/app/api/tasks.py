@@ -1,11 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import logging
 import uuid
+import json
 import jwt
 import os
-from app.services.ai_service import analyze_task_with_llm, generate_implementation_plan, get_conversation_history
+from app.services.ai_service import analyze_task_with_llm, generate_implementation_plan, stream_implementation_plan, get_conversation_history, SPECULATIVE_ANALYSIS
 from app.services.github_service import get_user_repos, analyze_repo_structure
 from app.database.mongodb import get_user_team_members
+from app.utils.admission import admit
 import requests as req
 
 JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
@@ -16,6 +18,7 @@ logger = logging.getLogger(__name__)
 task_bp = Blueprint('task', __name__)
 
 @task_bp.route("/analyze", methods=["POST", "OPTIONS"])
+@admit('analyze')
 def analyze():
     """Analyze task with repository context"""
     if request.method == "OPTIONS":
@@ -50,8 +53,20 @@ def analyze():
             logger.error("❌ No task provided")
             return jsonify({"error": "task required"}), 400
         
+        # The speculative plan is assigned to the same team /generate_plan would use
+        speculative = body.get('speculative')
+        team_members = body.get('team_members')
+        auth_header = request.headers.get('Authorization')
+        if (SPECULATIVE_ANALYSIS if speculative is None else speculative) and not team_members and auth_header:
+            try:
+                payload = jwt.decode(auth_header.replace('Bearer ', ''), JWT_SECRET, algorithms=["HS256"])
+                team_members = get_user_team_members(payload['user_id'])
+            except jwt.InvalidTokenError:
+                pass
+        
         logger.info("🤖 Starting multi-repository AI analysis...")
-        result = analyze_task_with_llm(task, session_id, repositories, github_token)
+        result = analyze_task_with_llm(task, session_id, repositories, github_token,
+                                       speculative=speculative, team_members=team_members)
         
         logger.info(f"✅ Analysis Complete: {result}")
         
@@ -74,6 +89,7 @@ def analyze():
         return jsonify({"error": str(e)}), 500
 
 @task_bp.route("/generate_plan", methods=["POST", "OPTIONS"])
+@admit('generate_plan')
 def generate_plan():
     """Generate implementation plan with or without answers"""
     if request.method == "OPTIONS":
@@ -134,6 +150,54 @@ def generate_plan():
         logger.exception("Full traceback:")
         return jsonify({"error": str(e)}), 500
 
+@task_bp.route("/generate_plan/stream", methods=["POST", "OPTIONS"])
+@admit('generate_plan')
+def generate_plan_stream():
+    """Generate implementation plan, streaming subtasks as Server-Sent Events"""
+    if request.method == "OPTIONS":
+        return jsonify({"ok": True}), 200
+    
+    logger.info("📥 ENDPOINT: /api/generate_plan/stream")
+    
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return jsonify({"error": "No authorization provided"}), 401
+    
+    try:
+        token = auth_header.replace('Bearer ', '')
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        user_id = payload['user_id']
+    except jwt.ExpiredSignatureError:
+        return jsonify({"error": "Token expired"}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({"error": "Invalid token"}), 401
+    
+    body = request.get_json() or {}
+    task = body.get('task')
+    answers = body.get('answers', {})
+    session_id = body.get('session_id')
+    team_members = body.get('team_members') or get_user_team_members(user_id)
+    
+    if not task or not task.strip():
+        return jsonify({"error": "task required"}), 400
+    
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    def events():
+        try:
+            for event, data in stream_implementation_plan(task, answers, session_id, team_members):
+                yield sse(event, data)
+        except Exception as e:
+            logger.error(f"❌ Error in generate_plan stream: {str(e)}")
+            yield sse('error', {"error": str(e)})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @task_bp.route("/github/repos", methods=["POST", "OPTIONS"])
 def get_repos():
     """Get user's GitHub repositories"""
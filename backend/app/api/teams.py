@@ -4,16 +4,16 @@ import os
 import tempfile
 from bson import ObjectId
 import json
-import re
 import PyPDF2
 from docx import Document
 from datetime import datetime
 import jwt
 import logging
 import vertexai
-from vertexai.generative_models import GenerativeModel
 
 from app.database.mongodb import get_db
+from app.services.llm import generate_json, LLMOutputError
+from app.utils.admission import admit
 
 teams_bp = Blueprint('teams', __name__)
 logger = logging.getLogger(__name__)
@@ -25,6 +25,21 @@ GCP_LOCATION = os.getenv('GCP_LOCATION', 'us-central1')
 if GCP_PROJECT_ID:
     vertexai.init(project=GCP_PROJECT_ID, location=GCP_LOCATION)
 
+RESUME_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string'},
+        'email': {'type': 'string'},
+        'role': {'type': 'string'},
+        'skills': {'type': 'array', 'items': {'type': 'string'}},
+        'experience_years': {'type': 'number'},
+        'expertise': {'type': 'array', 'items': {'type': 'string'}},
+        'description': {'type': 'string'},
+        'selected_roles': {'type': 'array', 'items': {'type': 'string'}}
+    },
+    'required': ['name', 'role', 'skills']
+}
+
 def extract_text_from_pdf(file_path):
     """Extract text from PDF file"""
     try:
@@ -68,44 +83,6 @@ def extract_text_from_docx(file_path):
         logger.exception("Full traceback:")
         return ""
 
-def parse_json_from_text(text, context="resume analysis"):
-    """Extract and parse JSON from text with error recovery"""
-    try:
-        # Try to find JSON in the text (handle markdown code blocks)
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if not json_match:
-            logger.error(f"❌ Could not find JSON in {context}")
-            raise Exception(f"No JSON found in {context}")
-        
-        json_str = json_match.group()
-        logger.info(f"📝 Extracted JSON ({len(json_str)} chars)")
-        
-        # Try to parse the JSON
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ JSON Parse Error at position {e.pos}: {e.msg}")
-            logger.error(f"📄 Problematic JSON snippet: ...{json_str[max(0, e.pos-100):min(len(json_str), e.pos+100)]}...")
-            
-            # Try to fix common JSON errors
-            # Remove trailing commas before } or ]
-            fixed_json = re.sub(r',(\s*[}\]])', r'\1', json_str)
-            # Remove comments if any
-            fixed_json = re.sub(r'//.*?\n', '\n', fixed_json)
-            fixed_json = re.sub(r'/\*.*?\*/', '', fixed_json, flags=re.DOTALL)
-            
-            try:
-                logger.info("🔧 Attempting to fix JSON errors...")
-                return json.loads(fixed_json)
-            except json.JSONDecodeError as e2:
-                logger.error(f"❌ Could not fix JSON automatically")
-                logger.error(f"📄 Full malformed JSON:\n{json_str[:1000]}...")
-                raise Exception(f"Invalid JSON in {context}: {e.msg} at position {e.pos}")
-    except Exception as e:
-        logger.error(f"❌ JSON extraction failed: {str(e)}")
-        raise
-
-
 def analyze_resume_with_ai(resume_text):
     """Analyze resume using Vertex AI Gemini"""
     try:
@@ -132,32 +109,13 @@ def analyze_resume_with_ai(resume_text):
 }}
 
 Resume Text:
-{resume_text[:4000]}
-
-CRITICAL: Return ONLY valid JSON. No markdown, no code blocks, no extra text. Do not use trailing commas. Ensure all strings are properly quoted.
-
-Return valid JSON:"""
+{resume_text[:4000]}"""
         
         logger.info("🚀 Calling Vertex AI Gemini for resume analysis...")
         
-        model = GenerativeModel("gemini-2.0-flash-exp")
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                'temperature': 0.3,
-                'max_output_tokens': 2048
-            }
-        )
-        
+        result = generate_json('resume', prompt, RESUME_SCHEMA, temperature=0.3)
         logger.info("✅ Vertex AI response received")
         
-        text = response.text
-        logger.info(f"✅ Gemini Response received ({len(text)} chars)")
-        logger.info(f"📝 Response preview: {text[:200]}...")
-        
-        # Parse JSON from response (handles markdown code blocks)
-        result = parse_json_from_text(text, "resume analysis")
-        
         # Validate required fields
         if not result.get('name'):
             logger.warning("⚠️ No name found in resume analysis")
@@ -188,10 +146,8 @@ Return valid JSON:"""
         logger.info(f"✅ Resume analysis complete: {result.get('name')}, {len(result.get('skills', []))} skills")
         return result
         
-    except json.JSONDecodeError as e:
+    except LLMOutputError as e:
         logger.error(f"❌ JSON parsing error: {str(e)}")
-        if 'text' in locals():
-            logger.error(f"📄 Response text: {text[:500]}")
         return None
     except Exception as e:
         logger.error(f"❌ AI analysis error: {str(e)}")
@@ -199,6 +155,7 @@ Return valid JSON:"""
         return None
 
 @teams_bp.route('/api/teams/analyze_resume', methods=['POST'])
+@admit('analyze_resume')
 def analyze_resume():
     """Analyze uploaded resume with AI"""
     try:
@@ -381,6 +381,28 @@ def update_repo_context(repo_full_name, context_text):
         return False
 
 
+def save_repo_context_tier(repo_full_name, tier, data, extra_fields=None, unset_tiers=None):
+    """Save one analysis tier (static/summary) of a repo context without touching the others"""
+    try:
+        update = {
+            "$set": {
+                f"tiers.{tier}": data,
+                "updated_at": datetime.utcnow(),
+                **(extra_fields or {})
+            },
+            "$setOnInsert": {"created_at": datetime.utcnow(), "access_count": 0}
+        }
+        if unset_tiers:
+            update["$unset"] = {f"tiers.{t}": "" for t in unset_tiers}
+
+        repo_context_collection.update_one({"repo_full_name": repo_full_name}, update, upsert=True)
+        logger.info(f"✅ Repo context tier '{tier}' saved for {repo_full_name}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error saving repo context tier: {str(e)}")
+        return False
+
+
 # ============== CONVERSATION HISTORY OPERATIONS ==============
 
 def save_conversation_history(session_id, prompt, analysis=None, plan=None):
@@ -4,37 +4,36 @@ import time
 from datetime import datetime, timedelta
 from app.database.mongodb import tasks_collection
 from app.api.slack import get_token_for_user
-import requests
+from app.services.slack_outbound import post_message
 
 logger = logging.getLogger(__name__)
 
-def send_followup_for_task(task, slack_token):
-    try:
-        task_id = str(task.get('_id'))
-        slack_channel_id = task.get('slack_channel_id')
-        slack_user_id = task.get('slack_user_id')
-        task_title = task.get('title', 'Task')
-        deadline = task.get('deadline', 'Not set')
-        
-        if not slack_channel_id or not slack_user_id:
-            return False
-        
-        message = f"<@{slack_user_id}> - Quick check-in on:\n\n*{task_title}*\nDeadline: {deadline}\n\nPlease share a quick status update when you can. Thanks!"
-        
-        headers = {"Authorization": f"Bearer {slack_token}", "Content-Type": "application/json"}
-        url = "https://slack.com/api/chat.postMessage"
-        payload = {"channel": slack_channel_id, "text": message, "mrkdwn": True}
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        
-        if response.json().get("ok"):
-            from bson import ObjectId
-            tasks_collection.update_one({"_id": ObjectId(task_id)}, {"$set": {"last_followup_at": datetime.utcnow()}})
-            logger.info(f"Follow-up sent for task {task_id}")
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"Error sending follow-up: {str(e)}")
-        return False
+def send_followup_for_task(task, slack_token, team_id=None):
+    """Queue the check-in for a task; returns a Future of the post (None when the task is not in Slack)"""
+    task_id = str(task.get('_id'))
+    slack_channel_id = task.get('slack_channel_id')
+    slack_user_id = task.get('slack_user_id')
+    task_title = task.get('title', 'Task')
+    deadline = task.get('deadline', 'Not set')
+    
+    if not slack_channel_id or not slack_user_id:
+        return None
+    
+    message = f"<@{slack_user_id}> - Quick check-in on:\n\n*{task_title}*\nDeadline: {deadline}\n\nPlease share a quick status update when you can. Thanks!"
+    
+    def _record(sent):
+        try:
+            if sent.result().get("ok"):
+                from bson import ObjectId
+                tasks_collection.update_one({"_id": ObjectId(task_id)}, {"$set": {"last_followup_at": datetime.utcnow()}})
+                logger.info(f"Follow-up sent for task {task_id}")
+        except Exception as e:
+            logger.error(f"Error sending follow-up: {str(e)}")
+    
+    # Paced by the outbound queue; a manual follow-up still queued for this task is merged with this one
+    future = post_message(slack_token, slack_channel_id, message, team_id, coalesce_key=f"followup:{task_id}", mrkdwn=True)
+    future.add_done_callback(_record)
+    return future
 
 def check_and_send_followups():
     try:
@@ -70,8 +69,7 @@ def check_and_send_followups():
                     continue
                 slack_token = token_info.get("bot_token") or token_info.get("access_token")
                 for task in project_tasks:
-                    send_followup_for_task(task, slack_token)
-                    time.sleep(1)
+                    send_followup_for_task(task, slack_token, token_info.get("team_id"))
             except Exception as e:
                 logger.error(f"Error processing project {project_id}: {str(e)}")
                 continue
@@ -1,22 +1,39 @@
 import os
+import time
+import hashlib
 import requests
 import logging
 import json
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import vertexai
-from vertexai.generative_models import GenerativeModel
 from google.oauth2 import service_account
+from app.services.code_search import search_codebase_for_keywords
+from app.utils.json_stream import JSONStreamParser
+from app.utils.metrics import observe
+from app.services.repo_intelligence import get_repo_intelligence, get_cached_repo_intelligence, SUMMARY
+from app.services.session_store import task_sessions
+from app.services.context_builder import ContextBuilder, log_prompt
+from app.services.context_cache import shared_repo_context
+from app.services.slack_summary import summarize_messages
+from app.services.llm import generate, generate_json, complete_json
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 from app.database.mongodb import (
-    save_repo_context, get_repo_context, update_repo_context,
     save_conversation_history, get_conversation_history as db_get_conversation_history
 )
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(name)s] - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Speculative analyze pipeline: overlapping stages, and a plan precomputed for confidently clear tasks
+SPECULATIVE_ANALYSIS = os.getenv('SPECULATIVE_ANALYSIS', 'false').lower() == 'true'
+PLAN_SPECULATION_CONFIDENCE = int(os.getenv('PLAN_SPECULATION_CONFIDENCE', '85'))
+_pipeline_executor = ThreadPoolExecutor(max_workers=int(os.getenv('ANALYZE_PIPELINE_WORKERS', '8')), thread_name_prefix='analyze')
+_speculative_plans = {}  # session_id -> (task, team key, Future) of plans being precomputed in this process
+_speculative_lock = threading.Lock()
+
 GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID', 'your-project-id')
 GCP_LOCATION = os.getenv('GCP_LOCATION', 'us-central1')
 
@@ -55,9 +72,6 @@ logger.info(f"🌍 Location: {GCP_LOCATION}")
 logger.info(f"🔑 Credentials: {'✅ Loaded' if credentials else '❌ Not loaded'}")
 logger.info("="*60)
 
-# Store sessions in memory (use Redis in production)
-task_sessions = {}
-
 def add_to_history(session_id, prompt, analysis=None, plan=None):
     """Add a prompt and its results to conversation history (database)"""
     try:
@@ -74,117 +88,95 @@ def get_conversation_history(session_id):
         logger.error(f"❌ Error getting history: {str(e)}")
         return {'conversations': []}
 
-def parse_json_from_text(text, context="response"):
-    """Extract and parse JSON from text with error recovery"""
-    try:
-        # Remove markdown code blocks if present
-        text = re.sub(r'```json\s*', '', text)
-        text = re.sub(r'```\s*$', '', text)
-        
-        # Try to find JSON in the text
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if not json_match:
-            logger.error(f"❌ Could not find JSON in {context}")
-            raise Exception(f"No JSON found in {context}")
-        
-        json_str = json_match.group()
-        logger.info(f"📝 Extracted JSON ({len(json_str)} chars)")
-        
-        # Try to parse the JSON
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ JSON Parse Error at position {e.pos}: {e.msg}")
-            logger.error(f"📄 Problematic JSON snippet: ...{json_str[max(0, e.pos-100):min(len(json_str), e.pos+100)]}...")
-            
-            # Try to fix common JSON errors
-            fixed_json = json_str
-            
-            # Remove trailing commas before } or ]
-            fixed_json = re.sub(r',(\s*[}\]])', r'\1', fixed_json)
-            
-            # Remove comments if any
-            fixed_json = re.sub(r'//.*?\n', '\n', fixed_json)
-            fixed_json = re.sub(r'/\*.*?\*/', '', fixed_json, flags=re.DOTALL)
-            
-            # Fix unescaped quotes in strings (common issue)
-            # This is a simple heuristic - replace " with ' inside string values
-            fixed_json = re.sub(r'"([^"]*?)"([^":,\]\}]*?)"', r'"\1\'\2"', fixed_json)
-            
-            # Try to truncate at last valid closing brace if JSON is incomplete
-            if e.msg == "Expecting ',' delimiter" or "Expecting" in e.msg:
-                # Find the last complete object/array
-                brace_count = 0
-                last_valid_pos = 0
-                for i, char in enumerate(fixed_json):
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            last_valid_pos = i + 1
-                
-                if last_valid_pos > 0 and last_valid_pos < len(fixed_json):
-                    logger.info(f"🔧 Truncating JSON at position {last_valid_pos}")
-                    fixed_json = fixed_json[:last_valid_pos]
-            
-            try:
-                logger.info("🔧 Attempting to fix JSON errors...")
-                return json.loads(fixed_json)
-            except json.JSONDecodeError as e2:
-                logger.error(f"❌ Could not fix JSON automatically")
-                logger.error(f"📄 Full malformed JSON:\n{json_str[:1000]}...")
-                raise Exception(f"Invalid JSON in {context}: {e.msg} at position {e.pos}")
-    except Exception as e:
-        logger.error(f"❌ JSON extraction failed: {str(e)}")
-        raise
+# Response schemas - Gemini is asked for constrained JSON matching these
+TASK_TYPE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'task_type': {'type': 'string', 'enum': ['new', 'update', 'both']},
+        'keywords': {'type': 'array', 'items': {'type': 'string'}},
+        'reasoning': {'type': 'string'}
+    },
+    'required': ['task_type', 'keywords', 'reasoning']
+}
+
+CLARITY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'status': {'type': 'string', 'enum': ['clear', 'ambiguous']},
+        'reasoning': {'type': 'string'},
+        'confidence_score': {'type': 'integer'},
+        'questions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'question': {'type': 'string'},
+                    'explanation': {'type': 'string'},
+                    'impact': {'type': 'string'},
+                    'options': {'type': 'array', 'items': {'type': 'string'}}
+                },
+                'required': ['question']
+            }
+        }
+    },
+    'required': ['status', 'reasoning']
+}
+
+PLAN_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'main_task': {'type': 'string'},
+        'goal': {'type': 'string'},
+        'task_type': {'type': 'string'},
+        'estimated_duration': {'type': 'string'},
+        'complexity': {'type': 'string', 'enum': ['low', 'medium', 'high']},
+        'subtask_count': {'type': 'integer'},
+        'technology_context': {
+            'type': 'object',
+            'properties': {
+                'primary_language': {'type': 'string'},
+                'frameworks_used': {'type': 'array', 'items': {'type': 'string'}},
+                'file_extensions': {'type': 'array', 'items': {'type': 'string'}},
+                'dependency_manager': {'type': 'string'}
+            }
+        },
+        'subtasks': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'title': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'role': {'type': 'string'},
+                    'assigned_to': {'type': 'string'},
+                    'deadline': {'type': 'string'},
+                    'estimated_hours': {'type': 'number'},
+                    'timeline': {'type': 'string'},
+                    'output': {'type': 'string'},
+                    'dependencies': {'type': 'array', 'items': {'type': 'string'}},
+                    'files_to_create': {'type': 'array', 'items': {'type': 'string'}},
+                    'files_to_modify': {'type': 'array', 'items': {'type': 'string'}},
+                    'technical_requirements': {'type': 'array', 'items': {'type': 'string'}},
+                    'clarity_score': {'type': 'integer'}
+                },
+                'required': ['title', 'description']
+            }
+        }
+    },
+    'required': ['main_task', 'subtasks']
+}
 
-def search_codebase_for_keywords(owner, repo, keywords, github_token=None):
-    """Search GitHub repository for specific keywords"""
-    logger.info(f"🔍 Searching codebase for: {keywords}")
-    
-    try:
-        headers = {'Authorization': f'token {github_token}'} if github_token else {}
-        search_results = []
-        
-        for keyword in keywords[:3]:  # Limit to 3 keywords
-            search_url = f"https://api.github.com/search/code?q={keyword}+repo:{owner}/{repo}"
-            resp = requests.get(search_url, headers=headers, timeout=10)
-            
-            if resp.status_code == 200:
-                data = resp.json()
-                items = data.get('items', [])[:5]
-                for item in items:
-                    search_results.append({
-                        'file': item['path'],
-                        'keyword': keyword,
-                        'url': item['html_url']
-                    })
-                logger.info(f"✅ Found {len(items)} files with '{keyword}'")
-            else:
-                logger.warning(f"⚠️ Search failed for '{keyword}': {resp.status_code}")
-        
-        return search_results
-    except Exception as e:
-        logger.error(f"❌ Codebase search error: {str(e)}")
-        return []
+def _analyze_repositories(repositories, github_token, cached_only=False):
+    """
+    Repo intelligence for the task's repositories
 
-def analyze_task_with_llm(task, session_id=None, repositories=None, github_token=None):
-    """Phase 1: Intelligent task analysis with multi-repository context"""
-    logger.info("="*60)
-    logger.info("STEP 1: MULTI-REPOSITORY TASK ANALYSIS")
-    logger.info("="*60)
-    logger.info(f"📝 Input Task: {task}")
-    logger.info(f"🔑 Session ID: {session_id}")
-    logger.info(f"🤖 Gemini API Key: {'✅ Set' if GEMINI_API_KEY else '❌ Missing'}")
-    
-    # Handle multiple repositories (frontend + backend)
+    Returns:
+        tuple: (multi_repo_context {repo_type: {owner, repo, context}}, single repo context or None)
+    """
     multi_repo_context = {}
     if repositories and github_token:
         logger.info(f"🔍 Analyzing {len(repositories)} repositories...")
         
-        from app.services.github_service import analyze_repo_structure
-        
         for repo_info in repositories:
             owner = repo_info.get('owner')
             repo_name = repo_info.get('repo')
@@ -193,7 +185,12 @@ def analyze_task_with_llm(task, session_id=None, repositories=None, github_token
             if owner and repo_name:
                 try:
                     logger.info(f"📦 Analyzing {repo_type} repository: {owner}/{repo_name}")
-                    context = analyze_repo_structure(owner, repo_name, github_token)
+                    if cached_only:
+                        context = get_cached_repo_intelligence(owner, repo_name)
+                        if not context:
+                            continue
+                    else:
+                        context = get_repo_intelligence(owner, repo_name, github_token, tier=SUMMARY)
                     multi_repo_context[repo_type] = {
                         'owner': owner,
                         'repo': repo_name,
@@ -205,81 +202,41 @@ def analyze_task_with_llm(task, session_id=None, repositories=None, github_token
     
     # Fallback to single repo if provided
     repo_context = None
-    if not multi_repo_context and repositories and len(repositories) == 1:
+    if not multi_repo_context and repositories and len(repositories) == 1 and not cached_only:
         repo_info = repositories[0]
         owner = repo_info.get('owner')
         repo_name = repo_info.get('repo')
         if owner and repo_name and github_token:
             logger.info(f"🔍 Fetching single repository analysis for {owner}/{repo_name}...")
             try:
-                from app.services.github_service import analyze_repo_structure
-                repo_context = analyze_repo_structure(owner, repo_name, github_token)
+                repo_context = get_repo_intelligence(owner, repo_name, github_token, tier=SUMMARY)
                 logger.info(f"✅ Analysis complete: {len(repo_context.get('key_modules', []))} modules")
             except Exception as e:
                 logger.warning(f"⚠️ Could not fetch repo analysis: {str(e)}")
                 repo_context = None
+    return multi_repo_context, repo_context
+
+def _shared_repo_block(multi_repo_context, repo_context, single_ref=None):
+    """
+    Repository context as a shared prefix (cached by the provider across calls and call sites)
     
-    # Build enhanced context text with multi-repository understanding
-    context_text = ""
-    
+    Returns:
+        tuple: (SharedContext or None, short in-prompt note naming each repository's role)
+    """
     if multi_repo_context:
-        context_text = "\n**Multi-Repository Project Context:**\n"
-        
-        for repo_type, repo_data in multi_repo_context.items():
-            context = repo_data['context']
-            owner = repo_data['owner']
-            repo_name = repo_data['repo']
-            
-            context_text += f"\n--- {repo_type.upper()} REPOSITORY ({owner}/{repo_name}) ---\n"
-            context_text += f"- Summary: {context.get('project_summary', 'N/A')}\n"
-            context_text += f"- Architecture: {context.get('architecture_overview', 'N/A')}\n"
-            
-            tech_stack = context.get('tech_stack', {})
-            if isinstance(tech_stack, dict):
-                if 'primary_language' in tech_stack:
-                    context_text += f"- Primary Language: {tech_stack.get('primary_language', 'N/A')}\n"
-                    context_text += f"- Backend Framework: {tech_stack.get('backend_framework', 'N/A')}\n"
-                    context_text += f"- Frontend Framework: {tech_stack.get('frontend_framework', 'N/A')}\n"
-                else:
-                    context_text += f"- Languages: {', '.join(tech_stack.get('languages', ['N/A']))}\n"
-                    context_text += f"- Frameworks: {', '.join(tech_stack.get('frameworks', ['N/A']))}\n"
-            
-            context_text += f"- Total Files: {context.get('raw_data', {}).get('total_files', 0)}\n"
-            
-            # Add key modules
-            modules = context.get('key_modules', [])
-            if modules:
-                context_text += f"- Key Modules: {', '.join([m.get('module_name', 'Unknown') for m in modules[:3]])}\n"
-            
-            # Add API info
-            api_structure = context.get('api_structure', {})
-            if api_structure.get('endpoints'):
-                context_text += f"- API Endpoints: {len(api_structure.get('endpoints', []))} found\n"
-    
-    elif repo_context:
-        # Single repository context (fallback)
-        modules_text = ""
-        if repo_context.get('key_modules'):
-            modules_text = "\n\nKey Modules:\n" + "\n".join(
-                [f"- {m.get('module_name', 'Unknown')}: {m.get('description', 'No description')}" for m in repo_context['key_modules'][:5]]
-            )
-        
-        api_info = ""
-        if repo_context.get('api_structure'):
-            api_info = f"\n\nAPI Structure:\n- Endpoints: {', '.join(repo_context['api_structure'].get('endpoints', [])[:5])}\n- Authentication: {repo_context['api_structure'].get('authentication', 'Unknown')}"
-        
-        context_text = f"""
-**Single Repository Project Context:**
-- Summary: {repo_context.get('project_summary', 'N/A')}
-- Architecture: {repo_context.get('architecture_overview', 'N/A')}
-- Tech Stack: {repo_context.get('tech_stack', {}).get('language', 'N/A')}, {repo_context.get('tech_stack', {}).get('framework_backend', 'N/A')}, {repo_context.get('tech_stack', {}).get('framework_frontend', 'N/A')}
-- Database: {repo_context.get('tech_stack', {}).get('database', 'N/A')}
-- Total Files: {repo_context.get('raw_data', {}).get('total_files', 0)}
-- Code Patterns: {len(repo_context.get('raw_data', {}).get('code_patterns', {}).get('api_endpoints', []))} API endpoints, {len(repo_context.get('raw_data', {}).get('code_patterns', {}).get('components', []))} components
-{modules_text}{api_info}
-"""
+        shared = shared_repo_context(
+            [(f"{d['owner']}/{d['repo']}", d['context']) for d in multi_repo_context.values()])
+        roles = ", ".join(f"{repo_type} = {d['owner']}/{d['repo']}" for repo_type, d in multi_repo_context.items())
+        return shared, f"\nRepositories (see PROJECT CONTEXT above): {roles}\n"
+    if repo_context and single_ref:
+        shared = shared_repo_context([(f"{single_ref.get('owner')}/{single_ref.get('repo')}", repo_context)])
+        return shared, "\n(Repository analysis: see PROJECT CONTEXT above)\n"
+    return None, ""
+
+def _detect_task_type(task, multi_repo_context, repo_context, single_ref=None):
+    """Step 1A: classify the task as new/update/both and extract codebase keywords"""
+    shared, context_text = _shared_repo_block(multi_repo_context, repo_context, single_ref)
     
-    # Step 1: Detect task type with project context
     logger.info("🔍 Step 1A: Detecting task type with project context...")
     
     type_detection_prompt = f"""Analyze this task with full project context.
@@ -288,8 +245,6 @@ def analyze_task_with_llm(task, session_id=None, repositories=None, github_token
 
 Task: "{task}"
 
-Task: "{task}"
-
 Determine:
 1. Is this adding a NEW feature that doesn't exist?
 2. Is this UPDATING/MODIFYING an existing feature?
@@ -297,144 +252,50 @@ Determine:
 
 Extract keywords that might exist in the codebase (e.g., "dashboard", "payment", "login").
 
-CRITICAL: Return ONLY valid JSON. No markdown, no code blocks, no extra text.
-Do not use trailing commas. Ensure all strings are properly quoted.
-
-Respond with valid JSON:
+Respond with JSON:
 {{
   "task_type": "new" | "update" | "both",
   "keywords": ["keyword1", "keyword2"],
   "reasoning": "Brief explanation"
 }}"""
     
-    try:
-        # Detect task type
-        logger.info("🚀 Calling Gemini for task type detection...")
-        logger.info("🔧 API Method: VERTEX AI SDK (GenerativeModel)")
-        model = GenerativeModel('gemini-2.0-flash-exp')
-        response = model.generate_content(
-            type_detection_prompt,
-            generation_config={'temperature': 0.3, 'max_output_tokens': 512}
-        )
-        
-        text = response.text
-        logger.info(f"📝 Task Type Response: {text[:500]}...")
-        
-        task_type_info = parse_json_from_text(text, "task type detection")
-        
-        logger.info(f"✅ Task Type: {task_type_info['task_type']}")
-        logger.info(f"🔑 Keywords: {task_type_info['keywords']}")
-        logger.info(f"💡 Reasoning: {task_type_info['reasoning']}")
-        
-        # Step 2: Search codebase if updating existing features
-        # Extract owner and repo from repositories for codebase search
-        owner = None
-        repo = None
-        
-        if repositories and len(repositories) > 0:
-            # Use first repository for codebase search
-            first_repo = repositories[0]
-            owner = first_repo.get('owner')
-            repo = first_repo.get('repo')
-        elif multi_repo_context:
-            # Extract from multi_repo_context
-            first_repo_type = list(multi_repo_context.keys())[0]
-            first_repo_data = multi_repo_context[first_repo_type]
-            owner = first_repo_data.get('owner')
-            repo = first_repo_data.get('repo')
-        
-        codebase_findings = []
-        if task_type_info['task_type'] in ['update', 'both'] and owner and repo and github_token:
-            logger.info("🔍 Step 1B: Searching codebase for existing features...")
-            codebase_findings = search_codebase_for_keywords(
-                owner, repo, task_type_info['keywords'], github_token
-            )
-            
-            if not codebase_findings:
-                logger.warning("⚠️ No existing code found for keywords!")
-                logger.info("💡 This might be a NEW feature, not an update")
-        
-        # Step 3: Intelligent clarification analysis using comprehensive context
-        logger.info("🔍 Step 1C: Intelligent clarification analysis...")
-        
-        # Build comprehensive context summary
-        context_summary = ""
-        if multi_repo_context:
-            # Multi-repository context
-            context_summary = f"""
-COMPREHENSIVE MULTI-REPOSITORY PROJECT CONTEXT:
-
-Repositories Analyzed: {len(multi_repo_context.get('repositories', []))}
-{chr(10).join([f"- {repo.get('name', 'Unknown')} ({repo.get('type', 'unknown')}): {repo.get('tech_stack', {}).get('language', 'Unknown')}" for repo in multi_repo_context.get('repositories', [])])}
-
-Project Summary: {multi_repo_context.get('project_summary', 'Unknown')}
-Architecture: {multi_repo_context.get('architecture_overview', 'Unknown')}
-
-Combined Tech Stack:
-- Languages: {', '.join(set([repo.get('tech_stack', {}).get('language', 'Unknown') for repo in multi_repo_context.get('repositories', [])]))}
-- Frontend: {', '.join(set([repo.get('tech_stack', {}).get('framework_frontend', 'None') for repo in multi_repo_context.get('repositories', []) if repo.get('tech_stack', {}).get('framework_frontend', 'None') != 'None']))}
-- Backend: {', '.join(set([repo.get('tech_stack', {}).get('framework_backend', 'None') for repo in multi_repo_context.get('repositories', []) if repo.get('tech_stack', {}).get('framework_backend', 'None') != 'None']))}
-- Databases: {', '.join(set([db for repo in multi_repo_context.get('repositories', []) for db in repo.get('integration_points', {}).get('databases', [])]))}
-
-Total Files: {sum([repo.get('raw_data', {}).get('total_files', 0) for repo in multi_repo_context.get('repositories', [])])}
-Total Dependencies: {sum([len(repo.get('raw_data', {}).get('dependencies', {})) for repo in multi_repo_context.get('repositories', [])])}
-
-Integration Points:
-- External APIs: {', '.join(set([api for repo in multi_repo_context.get('repositories', []) for api in repo.get('integration_points', {}).get('external_apis', [])]))}
-- Third Party: {', '.join(set([tp for repo in multi_repo_context.get('repositories', []) for tp in repo.get('integration_points', {}).get('third_party', [])]))}
-"""
-        elif repo_context:
-            # Single repository context (fallback)
-            context_summary = f"""
-COMPREHENSIVE PROJECT CONTEXT:
-
-Project Summary: {repo_context.get('project_summary', 'Unknown')}
-Architecture: {repo_context.get('architecture_overview', 'Unknown')}
-
-Tech Stack:
-- Language: {repo_context.get('tech_stack', {}).get('language', 'Unknown')}
-- Frontend: {repo_context.get('tech_stack', {}).get('framework_frontend', 'None')}
-- Backend: {repo_context.get('tech_stack', {}).get('framework_backend', 'None')}
-- Database: {repo_context.get('tech_stack', {}).get('database', 'Unknown')}
-- Testing: {repo_context.get('tech_stack', {}).get('testing', 'Unknown')}
-
-Key Modules ({len(repo_context.get('key_modules', []))}):
-{chr(10).join([f"- {m.get('module_name', 'Unknown')}: {m.get('description', 'No description')}" for m in repo_context.get('key_modules', [])[:5]])}
-
-API Structure:
-- Endpoints: {', '.join(repo_context.get('api_structure', {}).get('endpoints', [])[:5])}
-- Auth: {repo_context.get('api_structure', {}).get('authentication', 'Unknown')}
-- Data Flow: {repo_context.get('api_structure', {}).get('data_flow', 'Unknown')}
-
-Development Patterns:
-- Code Organization: {repo_context.get('development_patterns', {}).get('code_organization', 'Unknown')}
-- Naming Conventions: {repo_context.get('development_patterns', {}).get('naming_conventions', 'Unknown')}
-
-Integrations:
-- External APIs: {', '.join(repo_context.get('integration_points', {}).get('external_apis', [])[:3])}
-- Databases: {', '.join(repo_context.get('integration_points', {}).get('databases', []))}
-- Third Party: {', '.join(repo_context.get('integration_points', {}).get('third_party', [])[:3])}
-
-Deployment:
-- Build Process: {repo_context.get('deployment_info', {}).get('build_process', 'Unknown')}
-- Environment: {repo_context.get('deployment_info', {}).get('environment_setup', 'Unknown')}
+    logger.info("🚀 Calling Gemini for task type detection...")
+    log_prompt('task_type', type_detection_prompt, context=shared)
+    task_type_info = generate_json('task_type', type_detection_prompt, TASK_TYPE_SCHEMA, context=shared, temperature=0.3)
+    
+    logger.info(f"✅ Task Type: {task_type_info['task_type']}")
+    logger.info(f"🔑 Keywords: {task_type_info['keywords']}")
+    logger.info(f"💡 Reasoning: {task_type_info['reasoning']}")
+    return task_type_info
+
+def _search_target(repositories, multi_repo_context):
+    """Repository (owner, repo) searched for existing code - the first one given"""
+    if repositories and len(repositories) > 0:
+        first_repo = repositories[0]
+        return first_repo.get('owner'), first_repo.get('repo')
+    if multi_repo_context:
+        first_repo_data = multi_repo_context[list(multi_repo_context.keys())[0]]
+        return first_repo_data.get('owner'), first_repo_data.get('repo')
+    return None, None
 
-Raw Data:
-- Total Files: {repo_context.get('raw_data', {}).get('total_files', 0)}
-- Folder Structure: {len(repo_context.get('raw_data', {}).get('folder_structure', {}))}
-- Dependencies: {len(repo_context.get('raw_data', {}).get('dependencies', {}))}
-- Code Patterns: API endpoints ({len(repo_context.get('raw_data', {}).get('code_patterns', {}).get('api_endpoints', []))}), Models ({len(repo_context.get('raw_data', {}).get('code_patterns', {}).get('database_models', []))}), Components ({len(repo_context.get('raw_data', {}).get('code_patterns', {}).get('components', []))})
-"""
-        
-        findings_text = ""
-        if codebase_findings:
-            findings_text = "\n\nEXISTING CODE FOUND:\n" + "\n".join(
-                [f"- {f['file']} (contains '{f['keyword']}')" for f in codebase_findings[:5]]
-            )
-        elif task_type_info['task_type'] in ['update', 'both']:
-            findings_text = "\n\n⚠️ WARNING: Task mentions updating existing features, but NO related code was found!"
-        
-        clarity_prompt = f"""You are a senior technical architect with deep understanding of software development. Analyze if this task needs clarification given the comprehensive project context.
+def _search_existing_code(task_type_info, owner, repo, github_token):
+    """Step 1B: search the codebase for the keywords if the task updates existing features"""
+    if task_type_info['task_type'] not in ['update', 'both'] or not (owner and repo and github_token):
+        return []
+    logger.info("🔍 Step 1B: Searching codebase for existing features...")
+    codebase_findings = search_codebase_for_keywords(owner, repo, task_type_info['keywords'], github_token)
+    if not codebase_findings:
+        logger.warning("⚠️ No existing code found for keywords!")
+        logger.info("💡 This might be a NEW feature, not an update")
+    return codebase_findings
+
+def _analyze_clarity(task, task_type_info, multi_repo_context, repo_context, codebase_findings, single_ref=None):
+    """Step 1C: decide whether the task needs clarifying questions"""
+    logger.info("🔍 Step 1C: Intelligent clarification analysis...")
+    
+    shared, context_summary = _shared_repo_block(multi_repo_context, repo_context, single_ref)
+    
+    clarity_prompt = f"""You are a senior technical architect with deep understanding of software development. Analyze if this task needs clarification given the comprehensive project context.
 
 TASK: "{task}"
 TASK TYPE: {task_type_info['task_type']}
@@ -487,37 +348,77 @@ Return JSON:
     }}
   ]
 }}"""
-        
-        # Call Gemini for clarity analysis
-        logger.info("🚀 Calling Gemini for clarity analysis...")
-        logger.info("🔧 API Method: VERTEX AI SDK (GenerativeModel)")
-        model = GenerativeModel('gemini-2.0-flash-exp')
-        response = model.generate_content(
-            clarity_prompt,
-            generation_config={'temperature': 0.2, 'max_output_tokens': 512}
-        )
-        
-        text = response.text
-        logger.info(f"📝 Clarity Analysis Response: {text[:500]}...")
-        
-        # Parse strict JSON (will raise if model doesn't follow rules)
-        clarity_result = parse_json_from_text(text, "clarity analysis")
-        
-        # Merge task_type and earlier info so caller has full context
-        clarity_result['task_type'] = task_type_info['task_type']
-        clarity_result['keywords'] = task_type_info['keywords']
-        clarity_result['codebase_findings'] = codebase_findings
-        
-        # Store comprehensive context in session for plan generation
+    
+    logger.info("🚀 Calling Gemini for clarity analysis...")
+    log_prompt('clarity', clarity_prompt, context=shared)
+    clarity_result = generate_json('clarity', clarity_prompt, CLARITY_SCHEMA, context=shared, temperature=0.2)
+    
+    # Merge task_type and earlier info so caller has full context
+    clarity_result['task_type'] = task_type_info['task_type']
+    clarity_result['keywords'] = task_type_info['keywords']
+    clarity_result['codebase_findings'] = codebase_findings
+    return clarity_result
+
+def _run_speculative_stages(task, repositories, github_token):
+    """
+    Overlap the analyze stages: type detection runs alongside repo analysis (with whatever
+    repo context is already cached), and code search starts as soon as the keywords arrive
+    """
+    repos_future = _pipeline_executor.submit(_analyze_repositories, repositories, github_token)
+    cached_multi, cached_single = _analyze_repositories(repositories, github_token, cached_only=True)
+    task_type_info = _detect_task_type(task, cached_multi, cached_single, (repositories or [None])[0])
+    
+    owner, repo = _search_target(repositories, cached_multi)
+    search_future = _pipeline_executor.submit(_search_existing_code, task_type_info, owner, repo, github_token)
+    multi_repo_context, repo_context = repos_future.result()
+    codebase_findings = search_future.result()
+    return task_type_info, multi_repo_context, repo_context, codebase_findings
+
+def analyze_task_with_llm(task, session_id=None, repositories=None, github_token=None, speculative=None, team_members=None):
+    """
+    Phase 1: Intelligent task analysis with multi-repository context
+    
+    Args:
+        speculative: Overlap the pipeline stages and precompute the plan for confidently
+                     clear tasks (defaults to SPECULATIVE_ANALYSIS)
+        team_members: Team the speculative plan is assigned to (as /generate_plan would pass)
+    """
+    logger.info("="*60)
+    logger.info("STEP 1: MULTI-REPOSITORY TASK ANALYSIS")
+    logger.info("="*60)
+    logger.info(f"📝 Input Task: {task}")
+    logger.info(f"🔑 Session ID: {session_id}")
+    logger.info(f"🤖 Gemini API Key: {'✅ Set' if GEMINI_API_KEY else '❌ Missing'}")
+    speculative = SPECULATIVE_ANALYSIS if speculative is None else speculative
+    started = time.time()
+    
+    try:
+        if speculative:
+            task_type_info, multi_repo_context, repo_context, codebase_findings = _run_speculative_stages(
+                task, repositories, github_token)
+        else:
+            multi_repo_context, repo_context = _analyze_repositories(repositories, github_token)
+            task_type_info = _detect_task_type(task, multi_repo_context, repo_context, (repositories or [None])[0])
+            owner, repo = _search_target(repositories, multi_repo_context)
+            codebase_findings = _search_existing_code(task_type_info, owner, repo, github_token)
+        
+        clarity_result = _analyze_clarity(task, task_type_info, multi_repo_context, repo_context, codebase_findings,
+                                          (repositories or [None])[0])
+        observe('analysis_seconds', time.time() - started, {'mode': 'speculative' if speculative else 'sequential'})
+        
+        # Store the session for plan generation - repo contexts by reference, resolved from their cache later
         if session_id:
-            task_sessions[session_id] = {
+            task_sessions.save(session_id, {
                 'task': task,
                 'analysis': clarity_result,
-                'repo_context': repo_context,  # Single repo context (fallback)
-                'multi_repo_context': multi_repo_context,  # Multi-repo context
+                'repo_refs': {
+                    repo_type: {'owner': repo_data['owner'], 'repo': repo_data['repo']}
+                    for repo_type, repo_data in multi_repo_context.items()
+                },
+                'single_repo': {'owner': repositories[0].get('owner'), 'repo': repositories[0].get('repo')} if repo_context else None,
                 'repositories': repositories,  # Store original repositories array
                 'created_at': datetime.utcnow()
-            }
+            })
             add_to_history(session_id, task, analysis=clarity_result)
         
         # If model asks questions, return them immediately
@@ -528,6 +429,8 @@ Return JSON:
         # Otherwise status == 'clear' -> ready for plan generation
         logger.info(f"✅ Task is clear (confidence: {clarity_result.get('confidence_score', 'N/A')}%)")
         logger.info(f"💡 Reasoning: {clarity_result.get('reasoning', 'No reasoning provided')}")
+        if speculative and session_id and (clarity_result.get('confidence_score') or 0) >= PLAN_SPECULATION_CONFIDENCE:
+            _start_plan_speculation(task, session_id, team_members)
         return clarity_result
             
     except Exception as e:
@@ -540,121 +443,13 @@ def create_deep_project_context(owner, repo, github_token=None):
     logger.info("="*60)
     logger.info("🧠 DEEP PROJECT CONTEXT ANALYSIS")
     logger.info("="*60)
-    
-    repo_full_name = f"{owner}/{repo}"
-    logger.info(f"📦 Repository: {repo_full_name}")
-    
-    # ✨ CHECK DATABASE CACHE FIRST
-    cached_context = get_repo_context(repo_full_name)
-    if cached_context:
-        logger.info(f"⚡ Using cached repo context (accessed {cached_context.get('access_count', 0)} times)")
-        logger.info(f"📅 Cache age: {cached_context.get('updated_at', 'unknown')}")
-        return cached_context['context_text']
-    
-    logger.info("🔄 Cache miss - performing fresh analysis...")
+    logger.info(f"📦 Repository: {owner}/{repo}")
     
     try:
-        headers = {'Authorization': f'token {github_token}'} if github_token else {}
-        
-        # Fetch complete file tree
-        logger.info("🔍 Fetching complete file tree...")
-        tree_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/main?recursive=1"
-        tree_resp = requests.get(tree_url, headers=headers, timeout=60)
-        
-        if tree_resp.status_code != 200:
-            tree_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/master?recursive=1"
-            tree_resp = requests.get(tree_url, headers=headers, timeout=15)
-        
-        tree_data = tree_resp.json()
-        all_files = [f['path'] for f in tree_data.get('tree', []) if f['type'] == 'blob']
-        logger.info(f"📂 Found {len(all_files)} files")
-        
-        # Fetch README
-        logger.info("📄 Fetching README...")
-        readme_url = f"https://api.github.com/repos/{owner}/{repo}/readme"
-        readme_resp = requests.get(readme_url, headers=headers, timeout=10)
-        readme_content = ""
-        if readme_resp.status_code == 200:
-            import base64
-            readme_content = base64.b64decode(readme_resp.json()['content']).decode('utf-8')[:3000]
-            logger.info("✅ README fetched")
-        
-        # Deep analysis prompt
-        file_list_str = ", ".join(all_files[:100])  # First 100 files
-        
-        prompt = f"""You are a 10x Senior Solutions Architect. Perform a deep analysis of this GitHub repository to create a comprehensive "Project Context" summary.
-
-**Repository Information:**
----
-**File Tree:**
-{file_list_str}
-
-**README.md:**
-{readme_content}
----
-
-Analyze and generate a JSON object with:
-
-1. `project_summary`: One-paragraph description of the project's purpose
-2. `tech_stack`: Object with keys: `language`, `framework_backend`, `framework_frontend`, `database`, `key_libraries`
-3. `architecture_overview`: Brief architecture description (e.g., "Monolithic MVC", "Microservices")
-4. `key_modules`: Array of core features/modules. For each:
-   - `module_name`: Name of the module
-   - `description`: What this module does
-   - `relevant_files`: Top 3-5 most important file paths for this module
-
-Do not guess. Prioritize accuracy.
-
-Respond ONLY with valid JSON:
-{{
-  "project_summary": "...",
-  "tech_stack": {{
-    "language": "...",
-    "framework_backend": "...",
-    "framework_frontend": "...",
-    "database": "...",
-    "key_libraries": ["..."]
-  }},
-  "architecture_overview": "...",
-  "key_modules": [
-    {{
-      "module_name": "...",
-      "description": "...",
-      "relevant_files": ["..."]
-    }}
-  ]
-}}"""
-        
-        logger.info("🚀 Calling Gemini for deep analysis...")
-        logger.info("🔧 API Method: VERTEX AI SDK (GenerativeModel)")
-        model = GenerativeModel('gemini-2.0-flash-exp')
-        response = model.generate_content(
-            prompt,
-            generation_config={'temperature': 0.1, 'max_output_tokens': 4096}
-        )
-        
-        text = response.text
-        logger.info(f"📝 Deep Analysis Response: {text[:500]}...")
-        
-        project_context = parse_json_from_text(text, "deep analysis")
-        logger.info("✅ Deep analysis complete!")
-        logger.info(f"📊 Found {len(project_context.get('key_modules', []))} key modules")
-        
-        # ✨ SAVE TO DATABASE CACHE
-        try:
-            language = project_context.get('tech_stack', {}).get('language', 'Unknown')
-            metadata = {
-                'file_count': len(all_files),
-                'has_readme': bool(readme_content),
-                'tech_stack': project_context.get('tech_stack', {})
-            }
-            save_repo_context(repo_full_name, project_context, language, metadata)
-            logger.info(f"💾 Repo context saved to database for future use")
-        except Exception as save_error:
-            logger.error(f"⚠️ Failed to save repo context (non-critical): {str(save_error)}")
-        
-        return project_context
-        
+        context = get_repo_intelligence(owner, repo, github_token, tier=SUMMARY)
+        logger.info(f"📊 {len(context.get('key_modules', []))} key modules")
+        # Callers embed this in prompts - the summary tier only, not the raw static scan
+        return {k: v for k, v in context.items() if k != 'raw_data'}
     except Exception as e:
         logger.error(f"❌ Deep Analysis Error: {str(e)}")
         logger.exception("Full traceback:")
@@ -666,21 +461,34 @@ def analyze_github_repo(repo_url, github_token=None):
     owner, repo = parts[-2], parts[-1]
     return create_deep_project_context(owner, repo, github_token)
 
-def generate_implementation_plan(task, answers=None, session_id=None, team_members=None):
-    """Phase 2: Generate detailed implementation plan based on task type and codebase findings"""
-    logger.info("="*60)
-    logger.info("STEP 2: IMPLEMENTATION PLAN GENERATION")
-    logger.info("="*60)
-    logger.info(f"📝 Task: {task}")
-    logger.info(f"💬 Answers: {answers}")
-    logger.info(f"🔑 Session ID: {session_id}")
-    logger.info(f"👥 Team Members: {len(team_members) if team_members else 0}")
+def _resolve_session_repos(session):
+    """Load the repo contexts a session refers to from the repo intelligence cache"""
+    multi_repo_context = {}
+    for repo_type, ref in (session.get('repo_refs') or {}).items():
+        context = get_cached_repo_intelligence(ref['owner'], ref['repo'])
+        if context:
+            multi_repo_context[repo_type] = {**ref, 'context': context}
+        else:
+            logger.warning(f"⚠️ No cached context for {ref['owner']}/{ref['repo']} - planning without it")
     
+    repo_context = None
+    ref = session.get('single_repo')
+    if ref and not multi_repo_context:
+        repo_context = get_cached_repo_intelligence(ref['owner'], ref['repo'])
+    return multi_repo_context, repo_context
+
+def _build_plan_prompt(task, answers=None, session_id=None, team_members=None):
+    """
+    Build the implementation plan prompt from the task session, answers and team
+    
+    Returns:
+        tuple: (prompt, SharedContext with the repository context or None)
+    """
     # Get task analysis from session
     task_type = "new"
     codebase_findings = []
-    if session_id and session_id in task_sessions:
-        session = task_sessions[session_id]
+    session = task_sessions.get(session_id)
+    if session:
         analysis = session.get('analysis', {})
         task_type = analysis.get('task_type', 'new')
         codebase_findings = analysis.get('codebase_findings', [])
@@ -698,68 +506,14 @@ def generate_implementation_plan(task, answers=None, session_id=None, team_membe
             [f"- {f['file']}" for f in codebase_findings[:5]]
         )
     
-    # Get comprehensive repository context for better planning
-    repo_context_summary = ""
-    if session_id and session_id in task_sessions:
-        session = task_sessions[session_id]
-        multi_repo_context = session.get('multi_repo_context', {})
-        repo_context = session.get('repo_context')
-        
-        if multi_repo_context:
-            repo_context_summary = "\n\nMULTI-REPOSITORY PROJECT CONTEXT FOR PLANNING:\n"
-            
-            for repo_type, repo_data in multi_repo_context.items():
-                context = repo_data['context']
-                owner = repo_data['owner']
-                repo_name = repo_data['repo']
-                
-                repo_context_summary += f"\n--- {repo_type.upper()} ({owner}/{repo_name}) ---\n"
-                repo_context_summary += f"Project: {context.get('project_summary', 'Unknown')}\n"
-                repo_context_summary += f"Architecture: {context.get('architecture_overview', 'Unknown')}\n"
-                
-                tech_stack = context.get('tech_stack', {})
-                if 'primary_language' in tech_stack:
-                    repo_context_summary += f"Language: {tech_stack.get('primary_language', 'Unknown')}\n"
-                    repo_context_summary += f"Backend: {tech_stack.get('backend_framework', 'None')}\n"
-                    repo_context_summary += f"Frontend: {tech_stack.get('frontend_framework', 'None')}\n"
-                else:
-                    repo_context_summary += f"Languages: {', '.join(tech_stack.get('languages', ['Unknown']))}\n"
-                    repo_context_summary += f"Frameworks: {', '.join(tech_stack.get('frameworks', ['None']))}\n"
-                
-                modules = context.get('key_modules', [])
-                if modules:
-                    repo_context_summary += f"Key Modules: {', '.join([m.get('module_name', 'Unknown') for m in modules[:3]])}\n"
-                
-                api_structure = context.get('api_structure', {})
-                if api_structure.get('endpoints'):
-                    repo_context_summary += f"API Endpoints: {len(api_structure.get('endpoints', []))} found\n"
-        
-        elif repo_context:
-            repo_context_summary = f"""
-
-SINGLE REPOSITORY PROJECT CONTEXT FOR PLANNING:
-
-Project: {repo_context.get('project_summary', 'Unknown')}
-Architecture: {repo_context.get('architecture_overview', 'Unknown')}
-Tech Stack: {repo_context.get('tech_stack', {}).get('language', 'Unknown')} + {repo_context.get('tech_stack', {}).get('framework_backend', 'None')} + {repo_context.get('tech_stack', {}).get('framework_frontend', 'None')}
-Database: {repo_context.get('tech_stack', {}).get('database', 'Unknown')}
-
-Existing Modules:
-{chr(10).join([f"- {m.get('module_name', 'Unknown')}: {m.get('description', 'No description')}" for m in repo_context.get('key_modules', [])[:5]])}
-
-API Patterns:
-- Endpoints: {', '.join(repo_context.get('api_structure', {}).get('endpoints', [])[:5])}
-- Auth Method: {repo_context.get('api_structure', {}).get('authentication', 'Unknown')}
-
-Code Organization: {repo_context.get('development_patterns', {}).get('code_organization', 'Unknown')}
-Naming Conventions: {repo_context.get('development_patterns', {}).get('naming_conventions', 'Unknown')}
-
-Integrations: {', '.join(repo_context.get('integration_points', {}).get('external_apis', [])[:3])}
-Build Process: {repo_context.get('deployment_info', {}).get('build_process', 'Unknown')}
-"""
+    # Repository context is the shared (cached) prefix - the same block /analyze used
+    shared, repo_note = None, ""
+    if session:
+        multi_repo_context, repo_context = _resolve_session_repos(session)
+        shared, repo_note = _shared_repo_block(multi_repo_context, repo_context, session.get('single_repo'))
     
     # Build team members context for AI assignment
-    team_context = ""
+    builder = ContextBuilder('plan', f"{task} {answers_text}")
     if team_members:
         team_context = "\n\nAVAILABLE TEAM MEMBERS:\n"
         for member in team_members:
@@ -767,22 +521,16 @@ Build Process: {repo_context.get('deployment_info', {}).get('build_process', 'Un
             skills = member.get('skills', [])
             role = member.get('role', 'Developer')
             team_context += f"- {name} ({role}): {', '.join(skills)}\n"
+        builder.add('team', team_context, priority=3)
         logger.info(f"👥 Team context built for {len(team_members)} members")
+    planning_context = repo_note + builder.build()
     
     # Get current date for deadline calculation
     from datetime import datetime, timedelta
     today = datetime.utcnow()
     current_date_str = today.strftime("%Y-%m-%d")
     
-    prompt = f"""You are a senior software architect with expertise in ALL programming languages and frameworks. Create a precise implementation plan based on the ACTUAL project analysis.
-
-CRITICAL JSON FORMATTING RULES:
-- Return ONLY valid JSON - no markdown, no code blocks, no extra text
-- Escape all quotes inside string values using backslash (\")
-- Do NOT use trailing commas before closing braces or brackets
-- Keep descriptions concise (under 200 characters) to avoid formatting issues
-- If a description contains quotes, use single quotes (') instead
-- Ensure all arrays and objects are properly closed
+    prompt = f"""You are a senior software architect with expertise in ALL programming languages and frameworks. Create a precise implementation plan based on the ACTUAL project analysis. Keep descriptions concise (under 200 characters).
 
 CURRENT DATE: {current_date_str} (Use this as the starting point for all deadline calculations)
 
@@ -790,8 +538,7 @@ TASK: "{task}"
 TASK TYPE: {task_type.upper()}
 {f"\nCLARIFICATIONS PROVIDED:\n{answers_text}" if answers_text else ""}
 {findings_text}
-{repo_context_summary}
-{team_context}
+{planning_context}
 
 UNIVERSAL IMPLEMENTATION RULES:
 1. Use ONLY the technologies, frameworks, and patterns actually detected in the project
@@ -852,7 +599,7 @@ EXAMPLES:
 - Complex task "Build user authentication" → 6 subtasks (database, API, frontend, tests, etc.)
 - Medium task "Create API endpoint" → 3-4 subtasks (endpoint, validation, database, tests)
 
-Return ONLY valid JSON:
+Return JSON:
 {{
   "main_task": "Task title using actual project terminology",
   "goal": "Specific objective achievable with detected tech stack",
@@ -884,20 +631,96 @@ Return ONLY valid JSON:
     }}
   ]
 }}"""
+    return prompt, shared
+
+def _team_key(team_members):
+    return hashlib.sha1(json.dumps(team_members or [], sort_keys=True, default=str).encode()).hexdigest()
+
+def _speculate_plan(task, session_id, team_members):
+    started = time.time()
+    prompt, shared = _build_plan_prompt(task, None, session_id, team_members)
+    log_prompt('plan', prompt, context=shared)
+    result = generate_json('plan', prompt, PLAN_SCHEMA, context=shared, temperature=0.6)
+    # Persisted with the session so /generate_plan can use it on any worker
+    task_sessions.update(session_id, speculative_plan={'task': task, 'team_key': _team_key(team_members), 'plan': result})
+    logger.info(f"🔮 Speculative plan ready for {session_id} in {time.time() - started:.2f}s")
+    return result
+
+def _start_plan_speculation(task, session_id, team_members):
+    """Precompute the plan in the background - /generate_plan without answers picks it up"""
+    def run():
+        try:
+            return _speculate_plan(task, session_id, team_members)
+        finally:
+            with _speculative_lock:
+                _speculative_plans.pop(session_id, None)
+    
+    with _speculative_lock:
+        if session_id in _speculative_plans:
+            return
+        _speculative_plans[session_id] = (task, _team_key(team_members), _pipeline_executor.submit(run))
+    logger.info(f"🔮 Speculatively generating plan for {session_id}")
+
+def _take_speculative_plan(task, answers, session_id, team_members):
+    """The precomputed plan for this request, or None (answers, a changed task or a different team invalidate it)"""
+    if not session_id or answers:
+        return None
+    team_key = _team_key(team_members)
+    with _speculative_lock:
+        pending = _speculative_plans.get(session_id)
+        if pending and pending[0] == task and pending[1] == team_key:
+            # A precomputed plan is used once - asking again (e.g. to regenerate) gets a fresh one
+            _speculative_plans.pop(session_id)
+    if pending and pending[0] == task and pending[1] == team_key:
+        try:
+            # Already running - waiting is never slower than starting over
+            result = pending[2].result()
+        except Exception as e:
+            logger.warning(f"⚠️ Speculative plan for {session_id} failed: {str(e)}")
+            return None
+        task_sessions.update(session_id, speculative_plan=None)
+        observe('plan_speculation', 1, {'outcome': 'hit'})
+        return result
+    
+    session = task_sessions.get(session_id) or {}
+    speculative = session.get('speculative_plan')
+    if speculative and speculative.get('task') == task and speculative.get('team_key') == team_key:
+        task_sessions.update(session_id, speculative_plan=None)
+        observe('plan_speculation', 1, {'outcome': 'hit'})
+        return speculative['plan']
+    if speculative or pending:
+        observe('plan_speculation', 1, {'outcome': 'miss'})
+    return None
 
+def generate_implementation_plan(task, answers=None, session_id=None, team_members=None):
+    """Phase 2: Generate detailed implementation plan based on task type and codebase findings"""
+    logger.info("="*60)
+    logger.info("STEP 2: IMPLEMENTATION PLAN GENERATION")
+    logger.info("="*60)
+    logger.info(f"📝 Task: {task}")
+    logger.info(f"💬 Answers: {answers}")
+    logger.info(f"🔑 Session ID: {session_id}")
+    logger.info(f"👥 Team Members: {len(team_members) if team_members else 0}")
+    
+    started = time.time()
+    result = _take_speculative_plan(task, answers, session_id, team_members)
+    if result is not None:
+        observe('plan_generation_seconds', time.time() - started, {'mode': 'speculative'})
+        logger.info(f"🔮 Using speculative plan: {len(result.get('subtasks', []))} subtasks")
+        if session_id:
+            try:
+                save_conversation_history(session_id, task, analysis=None, plan=result)
+            except Exception as e:
+                logger.error(f"❌ Error saving plan to history: {str(e)}")
+        return result
+    
+    prompt, shared = _build_plan_prompt(task, answers, session_id, team_members)
+    
     try:
         logger.info("🚀 Calling Gemini API for implementation plan...")
-        logger.info("🔧 API Method: VERTEX AI SDK (GenerativeModel)")
-        model = GenerativeModel('gemini-2.0-flash-exp')
-        response = model.generate_content(
-            prompt,
-            generation_config={'temperature': 0.6, 'max_output_tokens': 2048}
-        )
-        
-        text = response.text
-        logger.info(f"📝 Plan Response Preview: {text[:200]}...")
-        
-        result = parse_json_from_text(text, "plan generation")
+        log_prompt('plan', prompt, context=shared)
+        result = generate_json('plan', prompt, PLAN_SCHEMA, context=shared, temperature=0.6)
+        observe('plan_generation_seconds', time.time() - started, {'mode': 'blocking'})
         logger.info(f"✨ Plan Generated: {len(result.get('subtasks', []))} subtasks")
         logger.info("="*60)
         logger.info(f"✅ PLAN COMPLETE")
@@ -918,6 +741,71 @@ Return ONLY valid JSON:
         logger.error(f"❌ Plan Generation Error: {str(e)}")
         raise Exception(f"Gemini API failed: {str(e)}")
 
+def stream_implementation_plan(task, answers=None, session_id=None, team_members=None):
+    """
+    Streaming variant of generate_implementation_plan
+    
+    Yields:
+        tuple: ('subtask', dict) as each subtask object closes in the model output,
+               then ('plan', dict) with the complete plan once the stream ends
+    """
+    logger.info("="*60)
+    logger.info("STEP 2: IMPLEMENTATION PLAN GENERATION (STREAMING)")
+    logger.info("="*60)
+    logger.info(f"📝 Task: {task}")
+    logger.info(f"🔑 Session ID: {session_id}")
+    
+    started = time.time()
+    result = _take_speculative_plan(task, answers, session_id, team_members)
+    if result is not None:
+        observe('plan_generation_seconds', time.time() - started, {'mode': 'speculative'})
+        for subtask in result.get('subtasks', []):
+            yield 'subtask', subtask
+        if session_id:
+            try:
+                save_conversation_history(session_id, task, analysis=None, plan=result)
+            except Exception as e:
+                logger.error(f"❌ Error saving plan to history: {str(e)}")
+        yield 'plan', result
+        return
+    
+    prompt, shared = _build_plan_prompt(task, answers, session_id, team_members)
+    first_subtask_at = None
+    parser = JSONStreamParser(array_keys=('subtasks',))
+    
+    try:
+        logger.info("🚀 Streaming Gemini implementation plan...")
+        log_prompt('plan', prompt, context=shared)
+        responses = generate('plan', prompt, schema=PLAN_SCHEMA, stream=True, context=shared, temperature=0.6)
+        
+        for response in responses:
+            for _, subtask in parser.feed(response.text):
+                if first_subtask_at is None:
+                    first_subtask_at = time.time() - started
+                    observe('plan_time_to_first_subtask_seconds', first_subtask_at)
+                    logger.info(f"⚡ First subtask after {first_subtask_at:.2f}s")
+                yield 'subtask', subtask
+        
+        try:
+            result = parser.finish()
+        except ValueError as e:
+            raise Exception(f"Invalid JSON in plan generation: {str(e)}")
+        result = complete_json(result, prompt, PLAN_SCHEMA, 'plan', {'temperature': 0.6, 'context': shared})
+        observe('plan_generation_seconds', time.time() - started, {'mode': 'stream'})
+        logger.info(f"✨ Plan Streamed: {len(result.get('subtasks', []))} subtasks in {time.time() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"❌ Plan Streaming Error: {str(e)}")
+        raise Exception(f"Gemini API failed: {str(e)}")
+    
+    if session_id:
+        try:
+            save_conversation_history(session_id, task, analysis=None, plan=result)
+            logger.info(f"💾 Added plan to database history")
+        except Exception as e:
+            logger.error(f"❌ Error saving plan to history: {str(e)}")
+    
+    yield 'plan', result
+
 
 def summarize_slack_messages(messages):
     """
@@ -935,51 +823,7 @@ def summarize_slack_messages(messages):
     logger.info(f"📊 Analyzing {len(messages)} messages")
     
     try:
-        # Prepare messages for AI
-        conversation_text = ""
-        for msg in messages:
-            user = msg.get('user', 'Unknown')
-            text = msg.get('text', '')
-            conversation_text += f"{user}: {text}\n"
-        
-        prompt = f"""Analyze the following Slack channel conversation and provide a concise summary.
-
-SLACK MESSAGES:
-{conversation_text}
-
-Generate a JSON response with this structure:
-{{
-  "key_updates": [
-    {{"user": "User Name", "update": "Brief description of what they said/did"}},
-    ...
-  ],
-  "active_users": ["List of users who participated"],
-  "blockers": ["Any blockers or issues mentioned"],
-  "progress_indicators": ["Any progress updates or completed tasks"],
-  "overall_status": "A one-sentence summary of the channel activity",
-  "sentiment": "positive/neutral/negative",
-  "action_items": ["Any action items or next steps mentioned"]
-}}
-
-Keep updates brief (max 15 words each). Return ONLY valid JSON, no markdown, no code blocks."""
-        
-        logger.info("🚀 Calling Gemini API for summary...")
-        logger.info("🔧 API Method: VERTEX AI SDK (GenerativeModel)")
-        model = GenerativeModel('gemini-2.0-flash-exp')
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                'temperature': 0.3,
-                'top_k': 40,
-                'top_p': 0.95,
-                'max_output_tokens': 2048
-            }
-        )
-        
-        text = response.text
-        logger.info(f"📝 Summary Response Preview: {text[:200]}...")
-        
-        result = parse_json_from_text(text, "slack summary")
+        result = summarize_messages(messages)
         logger.info(f"✨ Summary Generated Successfully")
         logger.info("="*60)
         
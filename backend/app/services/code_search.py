@@ -0,0 +1,184 @@
+"""
+Codebase Keyword Search
+Answers keyword lookups from the symbol index / repo snapshot first, then concurrent cached GitHub code search
+"""
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.services.github_rate_limiter import github_get, with_current_priority, GitHubRateLimited
+from app.services.repo_intelligence import get_repo_snapshot, get_cached_tree_sha
+from app.services.symbol_index import find_files, is_index_complete, ensure_symbol_index
+
+logger = logging.getLogger(__name__)
+
+MAX_KEYWORDS = 3
+RESULTS_PER_KEYWORD = 5
+LOCAL_CACHE_SIZE = 1024
+# Results for an unknown tree sha can go stale; known-sha results never do
+UNVERSIONED_TTL_SECONDS = 3600
+CACHE_EXPIRE_SECONDS = 7 * 24 * 3600
+
+_local_cache = OrderedDict()  # (repo_full_name, keyword, tree_sha) -> (cached_at, results)
+_local_cache_lock = threading.Lock()
+_cache_collection = None
+
+
+def _get_cache_collection():
+    """Get code search cache collection (lazy initialization)"""
+    global _cache_collection
+    if _cache_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _cache_collection = db['code_search_cache']
+        _cache_collection.create_index([("repo_full_name", 1), ("keyword", 1), ("tree_sha", 1)], unique=True)
+        _cache_collection.create_index("created_at", expireAfterSeconds=CACHE_EXPIRE_SECONDS)
+    return _cache_collection
+
+
+def _fresh(cached_at, tree_sha):
+    return tree_sha != 'unknown' or time.time() - cached_at < UNVERSIONED_TTL_SECONDS
+
+
+def _cached_results(key):
+    with _local_cache_lock:
+        entry = _local_cache.get(key)
+        if entry and _fresh(entry[0], key[2]):
+            _local_cache.move_to_end(key)
+            return entry[1]
+
+    try:
+        collection = _get_cache_collection()
+        doc = collection.find_one({"repo_full_name": key[0], "keyword": key[1], "tree_sha": key[2]}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read code search cache: {str(e)[:100]}")
+        doc = None
+    # created_at is stored as naive UTC; a bare .timestamp() would read it as local time
+    cached_at = doc['created_at'].replace(tzinfo=timezone.utc).timestamp() if doc else None
+    if doc and _fresh(cached_at, key[2]):
+        _remember(key, doc['results'], cached_at)
+        return doc['results']
+    return None
+
+
+def _remember(key, results, cached_at=None):
+    with _local_cache_lock:
+        _local_cache[key] = (cached_at or time.time(), results)
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def _store_results(key, results):
+    _remember(key, results)
+    try:
+        collection = _get_cache_collection()
+        if collection is not None:
+            collection.update_one(
+                {"repo_full_name": key[0], "keyword": key[1], "tree_sha": key[2]},
+                {"$set": {"results": results, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not write code search cache: {str(e)[:100]}")
+
+
+def _search_snapshot(tree, owner, repo, keyword):
+    """Match the keyword against file paths of a local snapshot"""
+    needle = keyword.lower()
+    results = []
+    for path in tree:
+        if needle in path.lower():
+            results.append({
+                'file': path,
+                'keyword': keyword,
+                'url': f"https://github.com/{owner}/{repo}/blob/{tree.branch or 'HEAD'}/{path}"
+            })
+            if len(results) >= RESULTS_PER_KEYWORD:
+                break
+    return results
+
+
+def _search_symbols(tree, owner, repo, keyword):
+    branch = (tree.branch if tree else None) or 'HEAD'
+    return [
+        {'file': path, 'keyword': keyword, 'url': f"https://github.com/{owner}/{repo}/blob/{branch}/{path}"}
+        for path in find_files(owner, repo, keyword, limit=RESULTS_PER_KEYWORD)
+    ]
+
+
+def _search_github(owner, repo, keyword, headers):
+    search_url = f"https://api.github.com/search/code?q={keyword}+repo:{owner}/{repo}"
+    resp = github_get(search_url, headers=headers, timeout=10)
+    if resp.status_code != 200:
+        logger.warning(f"⚠️ Search failed for '{keyword}': {resp.status_code}")
+        return None
+    items = resp.json().get('items', [])[:RESULTS_PER_KEYWORD]
+    return [{'file': item['path'], 'keyword': keyword, 'url': item['html_url']} for item in items]
+
+
+def search_codebase_for_keywords(owner, repo, keywords, github_token=None):
+    """Search GitHub repository for specific keywords"""
+    logger.info(f"🔍 Searching codebase for: {keywords}")
+
+    try:
+        repo_full_name = f"{owner}/{repo}"
+        keywords = list(dict.fromkeys(k.strip() for k in keywords or [] if k and k.strip()))[:MAX_KEYWORDS]
+        snapshot = get_repo_snapshot(owner, repo)
+        tree_sha = (snapshot.tree_sha if snapshot else get_cached_tree_sha(owner, repo)) or 'unknown'
+        # A complete index covers the symbols of every code file, so its answer (even an empty one) is final
+        indexed = tree_sha != 'unknown' and is_index_complete(owner, repo, tree_sha)
+        if not indexed and tree_sha != 'unknown':
+            ensure_symbol_index(owner, repo, github_token)
+
+        found = {}
+        remote = []
+        for keyword in keywords:
+            if indexed:
+                found[keyword] = _search_symbols(snapshot, owner, repo, keyword) or (
+                    _search_snapshot(snapshot, owner, repo, keyword) if snapshot is not None else []
+                )
+                logger.info(f"⚡ '{keyword}' answered from symbol index ({len(found[keyword])} files)")
+                continue
+            if snapshot is not None:
+                local = _search_snapshot(snapshot, owner, repo, keyword)
+                if local:
+                    found[keyword] = local
+                    logger.info(f"⚡ '{keyword}' answered from local snapshot ({len(local)} files)")
+                    continue
+            cached = _cached_results((repo_full_name, keyword.lower(), tree_sha))
+            if cached is not None:
+                found[keyword] = cached
+                logger.info(f"⚡ '{keyword}' answered from search cache ({len(cached)} files)")
+                continue
+            remote.append(keyword)
+
+        if remote:
+            headers = {'Authorization': f'token {github_token}'} if github_token else {}
+            with ThreadPoolExecutor(max_workers=len(remote)) as pool:
+                futures = {
+                    keyword: pool.submit(with_current_priority(_search_github, owner, repo, keyword, headers))
+                    for keyword in remote
+                }
+                for keyword, future in futures.items():
+                    try:
+                        results = future.result()
+                    except GitHubRateLimited as e:
+                        logger.warning(f"⚠️ {str(e)} - skipping '{keyword}'")
+                        continue
+                    except Exception as e:
+                        logger.warning(f"⚠️ Search failed for '{keyword}': {str(e)}")
+                        continue
+                    if results is None:
+                        continue
+                    found[keyword] = results
+                    _store_results((repo_full_name, keyword.lower(), tree_sha), results)
+                    logger.info(f"✅ Found {len(results)} files with '{keyword}'")
+
+        return [result for keyword in keywords for result in found.get(keyword, [])]
+    except Exception as e:
+        logger.error(f"❌ Codebase search error: {str(e)}")
+        return []
@@ -0,0 +1,122 @@
+"""
+Prompt Context Builder
+Fits ranked prompt sections into a per-call-site token budget and logs prompt size and estimated cost
+"""
+import os
+import re
+import logging
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# Rough estimate for English text and code; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# USD per million tokens, for the cost estimate in logs
+INPUT_COST_PER_MTOKEN = float(os.getenv('LLM_INPUT_COST_PER_MTOKEN', '0.10'))
+OUTPUT_COST_PER_MTOKEN = float(os.getenv('LLM_OUTPUT_COST_PER_MTOKEN', '0.40'))
+
+# Token budget for the context sections of each call site (the fixed prompt template is extra)
+CONTEXT_BUDGETS = {
+    'task_type': 1500,
+    'clarity': 4000,
+    'plan': 5000,
+    'resolve_issue': 6000,
+    'ask_feeta': 8000,
+}
+DEFAULT_BUDGET = 4000
+# Below this a truncated section is more noise than signal - drop it instead
+MIN_SECTION_TOKENS = 60
+TRUNCATION_MARKER = "... (truncated)"
+
+_STOPWORDS = {
+    'the', 'and', 'for', 'how', 'what', 'where', 'why', 'does', 'this', 'that', 'with', 'from',
+    'are', 'was', 'can', 'you', 'our', 'should', 'would', 'could', 'into', 'about', 'have', 'has'
+}
+
+
+def estimate_tokens(text):
+    return (len(text or '') + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _terms(text):
+    return {t for t in re.findall(r'[a-z0-9]+', (text or '').lower()) if len(t) > 2 and t not in _STOPWORDS}
+
+
+def _truncate(text, tokens):
+    """Cut text to about `tokens` tokens at a line boundary (deterministic)"""
+    limit = tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER) - 1
+    cut = text.rfind('\n', 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut].rstrip() + "\n" + TRUNCATION_MARKER + "\n"
+
+
+class ContextBuilder:
+    """
+    Collects prompt sections and renders the subset that fits the call site's budget
+
+    Sections are ranked by priority times relevance to the query (term overlap);
+    the best ones are kept whole, the first that does not fit is truncated and the
+    rest are dropped. Kept sections are rendered in the order they were added.
+    """
+
+    def __init__(self, call_site, query='', budget=None):
+        self.call_site = call_site
+        self.budget = budget or CONTEXT_BUDGETS.get(call_site, DEFAULT_BUDGET)
+        self.query_terms = _terms(query)
+        self.sections = []
+
+    def add(self, name, text, priority=1.0):
+        """Add a section; priority > 1 favours it, < 1 makes it the first to go"""
+        if text and text.strip():
+            self.sections.append({'name': name, 'text': text, 'priority': priority, 'index': len(self.sections)})
+        return self
+
+    def _score(self, section):
+        if not self.query_terms:
+            return section['priority']
+        overlap = len(self.query_terms & _terms(section['text'])) / len(self.query_terms)
+        return section['priority'] * (1 + overlap)
+
+    def build(self):
+        """Render the kept sections (joined in insertion order)"""
+        ranked = sorted(self.sections, key=lambda s: (-self._score(s), s['index']))
+        remaining = self.budget
+        kept = {}
+        dropped = []
+        for section in ranked:
+            tokens = estimate_tokens(section['text'])
+            if tokens <= remaining:
+                kept[section['index']] = section['text']
+                remaining -= tokens
+            elif remaining >= MIN_SECTION_TOKENS:
+                kept[section['index']] = _truncate(section['text'], remaining)
+                remaining = 0
+                dropped.append(f"{section['name']} (truncated)")
+            else:
+                dropped.append(section['name'])
+
+        if dropped:
+            logger.info(f"✂️ {self.call_site} context over budget ({self.budget} tokens): {', '.join(dropped)}")
+        return ''.join(kept[i] for i in sorted(kept))
+
+
+def log_prompt(call_site, prompt, max_output_tokens=None, context=None):
+    """
+    Log the final prompt size and the estimated cost of the call; returns the token estimate
+
+    A shared context (SharedContext) is counted as sent inline for the call site, and
+    its tokens are also reported on their own.
+    """
+    if max_output_tokens is None:
+        from app.services.model_routing import get_route
+        max_output_tokens = get_route(call_site)['max_output_tokens']
+    context_tokens = estimate_tokens(context.inline_text(call_site)) if context is not None else 0
+    tokens = estimate_tokens(prompt) + context_tokens
+    cost = (tokens * INPUT_COST_PER_MTOKEN + max_output_tokens * OUTPUT_COST_PER_MTOKEN) / 1_000_000
+    observe('prompt_tokens', tokens, {'call_site': call_site})
+    if context is not None:
+        observe('prompt_context_tokens', context_tokens, {'call_site': call_site})
+    shared_note = f", ~{context_tokens} of them shared context" if context is not None else ""
+    logger.info(f"📏 {call_site} prompt: ~{tokens} tokens ({len(prompt)} chars{shared_note}), est. cost <= ${cost:.5f}")
+    return tokens
@@ -0,0 +1,220 @@
+"""
+Context Cache
+Registers stable repository context once per (repo, tree_sha) with Gemini context caching and references it by handle
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from app.services.context_builder import ContextBuilder, estimate_tokens, CONTEXT_BUDGETS, DEFAULT_BUDGET
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# "vertex" (Gemini CachedContent), "local" (in-process stand-in for offline runs) or "off"
+CONTEXT_CACHE_BACKEND = os.getenv(
+    'CONTEXT_CACHE_BACKEND', 'local' if os.getenv('LLM_BACKEND', 'vertex').lower() == 'fake' else 'vertex'
+).lower()
+CACHE_TTL_SECONDS = int(os.getenv('CONTEXT_CACHE_TTL_SECONDS', '3600'))
+# The provider rejects caches below a minimum size - smaller contexts are simply sent inline
+MIN_CACHE_TOKENS = int(os.getenv('CONTEXT_CACHE_MIN_TOKENS', '4096'))
+# The shared block is not ranked against the question - it must be identical for every call. It holds
+# each repo's summary plus its file listing, README and manifests, which lifts it past MIN_CACHE_TOKENS.
+# Sent inline (no cache), it is rebuilt to the call site's CONTEXT_BUDGETS entry instead
+SHARED_CONTEXT_BUDGET = int(os.getenv('SHARED_CONTEXT_BUDGET', '16000'))
+# A handle this close to expiry is replaced rather than used
+EXPIRY_MARGIN_SECONDS = 120
+# After a failed create (e.g. a model without caching support) the context goes inline this long
+CREATE_FAILURE_BACKOFF_SECONDS = int(os.getenv('CONTEXT_CACHE_FAILURE_BACKOFF_SECONDS', '900'))
+MAX_HANDLES = 256
+SHARED_CONTEXT_HEADER = "PROJECT CONTEXT:\n"
+
+_handles = OrderedDict()  # (model, key) -> {'name', 'expires_at', 'cached'}
+_lock = threading.Lock()
+_creating = {}  # (model, key) -> Lock, so concurrent requests create one cache
+_failed = {}  # (model, key) -> time before which creating is not retried
+_local_contents = {}  # local backend: name -> text
+_caches_collection = None
+
+
+class SharedContext:
+    """A stable prompt prefix (e.g. repository context) identified by its content"""
+
+    def __init__(self, key, text, sections):
+        self.key = key
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.sections = sections  # [(name, text, priority)] the text was built from
+        self._inline = {}  # budget -> text rebuilt for it
+
+    def inline_text(self, call_site):
+        """The context as sent inline for call_site - rebuilt to the call site's context budget"""
+        budget = CONTEXT_BUDGETS.get(call_site, DEFAULT_BUDGET)
+        if self.tokens <= budget:
+            return self.text
+        text = self._inline.get(budget)
+        if text is None:
+            builder = ContextBuilder(call_site, budget=budget - estimate_tokens(SHARED_CONTEXT_HEADER))
+            for name, section, priority in self.sections:
+                builder.add(name, section, priority)
+            text = self._inline[budget] = SHARED_CONTEXT_HEADER + builder.build()
+        return text
+
+    def inline(self, prompt, call_site):
+        """Prompt with the context sent inline (no cache handle)"""
+        return f"{self.inline_text(call_site)}\n\n{prompt}"
+
+
+def shared_repo_context(repos):
+    """
+    Shared context block for a set of repositories
+
+    Args:
+        repos: [(full_name, repo intelligence dict)] - order does not matter
+
+    Returns:
+        SharedContext, or None when there is no repository context
+    """
+    from app.services.repo_intelligence import format_repo_context, format_repo_reference
+    repos = sorted(((name, context) for name, context in repos if context), key=lambda r: r[0])
+    if not repos:
+        return None
+    sections = []
+    for full_name, context in repos:
+        # Summaries are kept first; the reference material is what gets truncated
+        sections.append((full_name, f"\n=== Repository: {full_name} ===\n{format_repo_context(context)}\n", 2.0))
+        sections.append((f"{full_name} reference",
+                         f"\n=== Repository reference: {full_name} ===\n{format_repo_reference(context)}", 0.5))
+    builder = ContextBuilder('shared_repo_context', budget=SHARED_CONTEXT_BUDGET)
+    for name, section, priority in sections:
+        builder.add(name, section, priority)
+    text = SHARED_CONTEXT_HEADER + builder.build()
+    shas = ','.join(f"{name}@{(context.get('tree_sha') or '')[:12]}" for name, context in repos)
+    return SharedContext(f"{shas}#{hashlib.sha1(text.encode()).hexdigest()[:12]}", text, sections)
+
+
+def _get_caches_collection():
+    """Get context caches collection (lazy initialization)"""
+    global _caches_collection
+    if _caches_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _caches_collection = db['context_caches']
+        _caches_collection.create_index("expires_at", expireAfterSeconds=0)
+    return _caches_collection
+
+
+def _load_shared_handle(model_name, key):
+    """A cache created by another worker, if it is still valid"""
+    try:
+        collection = _get_caches_collection()
+        doc = collection.find_one({'_id': f"{model_name}|{key}"}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read context cache registry: {str(e)}")
+        return None
+    if not doc or doc['expires_at'] <= datetime.utcnow() + timedelta(seconds=EXPIRY_MARGIN_SECONDS):
+        return None
+    from vertexai.preview import caching
+    return {
+        'name': doc['name'],
+        'expires_at': time.time() + (doc['expires_at'] - datetime.utcnow()).total_seconds(),
+        'cached': caching.CachedContent(cached_content_name=doc['name'])
+    }
+
+
+def _create_handle(shared, model_name):
+    if CONTEXT_CACHE_BACKEND == 'local':
+        name = f"local/{hashlib.sha1(f'{model_name}|{shared.key}'.encode()).hexdigest()[:16]}"
+        _local_contents[name] = shared.text
+        return {'name': name, 'expires_at': time.time() + CACHE_TTL_SECONDS, 'cached': None}
+
+    handle = _load_shared_handle(model_name, shared.key)
+    if handle:
+        return handle
+
+    from vertexai.preview import caching
+    from vertexai.generative_models import Content, Part
+    cached = caching.CachedContent.create(
+        model_name=model_name,
+        contents=[Content(role='user', parts=[Part.from_text(shared.text)])],
+        ttl=timedelta(seconds=CACHE_TTL_SECONDS),
+        display_name=shared.key[:120]
+    )
+    try:
+        collection = _get_caches_collection()
+        if collection is not None:
+            collection.update_one(
+                {'_id': f"{model_name}|{shared.key}"},
+                {'$set': {'name': cached.name, 'expires_at': datetime.utcnow() + timedelta(seconds=CACHE_TTL_SECONDS)}},
+                upsert=True
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not register context cache {cached.name}: {str(e)}")
+    return {'name': cached.name, 'expires_at': time.time() + CACHE_TTL_SECONDS, 'cached': cached}
+
+
+def get_handle(shared, model_name):
+    """
+    Cache handle for a shared context on model_name, registering it on first use
+
+    Returns:
+        dict with 'name' and 'cached' (the provider's CachedContent), or None to send the context inline
+    """
+    if shared is None or CONTEXT_CACHE_BACKEND == 'off' or shared.tokens < MIN_CACHE_TOKENS:
+        return None
+
+    cache_key = (model_name, shared.key)
+    with _lock:
+        handle = _handles.get(cache_key)
+        if handle and handle['expires_at'] - time.time() > EXPIRY_MARGIN_SECONDS:
+            _handles.move_to_end(cache_key)
+            observe('context_cache', 1, {'result': 'hit', 'model': model_name})
+            observe('context_cache_tokens_saved', shared.tokens, {'model': model_name})
+            return handle
+        if _failed.get(cache_key, 0) > time.time():
+            observe('context_cache', 1, {'result': 'backoff', 'model': model_name})
+            return None
+        creating = _creating.setdefault(cache_key, threading.Lock())
+
+    with creating:
+        with _lock:
+            handle = _handles.get(cache_key)
+            failed = _failed.get(cache_key, 0) > time.time()
+        if handle and handle['expires_at'] - time.time() > EXPIRY_MARGIN_SECONDS:
+            return handle
+        if failed:
+            # The request this one queued behind just failed to create it
+            return None
+        try:
+            started = time.time()
+            handle = _create_handle(shared, model_name)
+            # Published before the creating lock is released, so requests queued on it find the handle
+            with _lock:
+                _handles[cache_key] = handle
+                while len(_handles) > MAX_HANDLES:
+                    _handles.popitem(last=False)
+        except Exception as e:
+            with _lock:
+                _failed[cache_key] = time.time() + CREATE_FAILURE_BACKOFF_SECONDS
+                while len(_failed) > MAX_HANDLES:
+                    _failed.pop(next(iter(_failed)))
+            observe('context_cache', 1, {'result': 'error', 'model': model_name})
+            logger.warning(f"⚠️ Context cache unavailable for {model_name}, sending context inline: {str(e)[:200]}")
+            return None
+        finally:
+            with _lock:
+                _creating.pop(cache_key, None)
+
+    observe('context_cache', 1, {'result': 'miss', 'model': model_name})
+    logger.info(f"💾 Registered {shared.tokens}-token context {shared.key[:60]} on {model_name} "
+                f"as {handle['name']} ({time.time() - started:.2f}s)")
+    return handle
+
+
+def local_content(name):
+    """Text registered under a local stand-in handle"""
+    return _local_contents.get(name)
@@ -0,0 +1,132 @@
+"""
+Event Bus
+In-process pub/sub of per-user events, fanned out to the other workers through a capped Mongo collection
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from app.services.single_flight import OWNER_ID
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# Events a slow subscriber may fall behind by before it is dropped (it reconnects and resyncs)
+SUBSCRIBER_QUEUE_SIZE = 100
+# Capped collection size - only needs to cover the time it takes other workers to tail it
+FANOUT_COLLECTION_BYTES = int(os.getenv('EVENT_FANOUT_BYTES', str(16 * 1024 * 1024)))
+TAIL_RETRY_SECONDS = 2
+
+_subscribers = {}  # user_id -> set of queues
+_lock = threading.Lock()
+_events_collection = None
+_tailer = None
+
+
+def _get_events_collection():
+    """Get the capped user events collection (lazy initialization)"""
+    global _events_collection
+    if _events_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        if 'user_events' not in db.list_collection_names():
+            try:
+                db.create_collection('user_events', capped=True, size=FANOUT_COLLECTION_BYTES)
+            except Exception as e:
+                # Another worker created it first
+                logger.info(f"user_events collection: {str(e)}")
+        _events_collection = db['user_events']
+    return _events_collection
+
+
+def _deliver(user_id, event):
+    with _lock:
+        queues = list(_subscribers.get(user_id, ()))
+    for q in queues:
+        try:
+            q.put_nowait(event)
+        except queue.Full:
+            # Disconnect the laggard; its stream closes and the browser reconnects
+            observe('event_bus_dropped', 1)
+            unsubscribe(user_id, q)
+            try:
+                q.get_nowait()
+                q.put_nowait(None)
+            except (queue.Empty, queue.Full):
+                pass
+
+
+def publish(user_id, event_type, data):
+    """
+    Push an event to every open stream of a user, on this worker and the others
+
+    Args:
+        event_type: e.g. 'task_updated', 'mention', 'job_progress'
+        data: JSON-serializable payload
+    """
+    if not user_id:
+        return
+    user_id = str(user_id)
+    event = {'type': event_type, 'data': data, 'at': time.time()}
+    _deliver(user_id, event)
+    observe('event_bus_published', 1, {'type': event_type})
+    try:
+        collection = _get_events_collection()
+        if collection is not None:
+            collection.insert_one({**event, 'user_id': user_id, 'origin': OWNER_ID, 'created_at': datetime.utcnow()})
+    except Exception as e:
+        logger.warning(f"⚠️ Could not fan out {event_type} event: {str(e)}")
+
+
+def _tail():
+    """Deliver events published by other workers (tailable cursor on the capped collection)"""
+    from pymongo import CursorType
+    last_id = None
+    while True:
+        try:
+            collection = _get_events_collection()
+            if collection is None:
+                return
+            if last_id is None:
+                # Only events from now on - a (re)connecting browser refetches current state itself
+                newest = collection.find_one({}, sort=[('$natural', -1)])
+                last_id = newest['_id'] if newest else None
+            query = {'_id': {'$gt': last_id}} if last_id else {}
+            cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                for doc in cursor:
+                    last_id = doc['_id']
+                    if doc.get('origin') != OWNER_ID:
+                        _deliver(doc['user_id'], {'type': doc['type'], 'data': doc['data'], 'at': doc['at']})
+        except Exception as e:
+            logger.warning(f"⚠️ Event fan-out tail interrupted: {str(e)}")
+        time.sleep(TAIL_RETRY_SECONDS)
+
+
+def _start_tailer():
+    global _tailer
+    with _lock:
+        if _tailer is None:
+            _tailer = threading.Thread(target=_tail, daemon=True, name='event-bus-tail')
+            _tailer.start()
+
+
+def subscribe(user_id):
+    """Queue receiving the user's events; None in the queue means the stream should close"""
+    _start_tailer()
+    q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _lock:
+        _subscribers.setdefault(str(user_id), set()).add(q)
+    return q
+
+
+def unsubscribe(user_id, q):
+    with _lock:
+        queues = _subscribers.get(str(user_id))
+        if queues is not None:
+            queues.discard(q)
+            if not queues:
+                del _subscribers[str(user_id)]
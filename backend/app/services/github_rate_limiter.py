@@ -0,0 +1,350 @@
+"""
+GitHub Rate Limit Scheduler
+Tracks X-RateLimit budgets per token and resource, and schedules GitHub calls around them
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+import contextlib
+from collections import OrderedDict
+from datetime import datetime
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Fraction of each budget held back for interactive requests (background work stops here)
+BACKGROUND_RESERVE_FRACTION = float(os.getenv('GITHUB_BACKGROUND_RESERVE', '0.2'))
+# Longest an interactive request will wait for a budget reset before degrading
+INTERACTIVE_MAX_WAIT = float(os.getenv('GITHUB_INTERACTIVE_MAX_WAIT', '15'))
+# Background refreshes can afford to wait for a full search window
+BACKGROUND_MAX_WAIT = float(os.getenv('GITHUB_BACKGROUND_MAX_WAIT', '90'))
+# How often the shared (Mongo) budget view is re-read / written per key
+SHARED_SYNC_SECONDS = 5
+# Conditional-request cache (304s do not count against the GitHub quota)
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+
+class GitHubRateLimited(Exception):
+    """Raised when the GitHub budget is exhausted and no cached response is available"""
+
+    def __init__(self, resource, reset_at):
+        self.resource = resource
+        self.reset_at = reset_at
+        wait = max(0, int(reset_at - time.time())) if reset_at else 0
+        super().__init__(f"GitHub {resource} rate limit exhausted (resets in {wait}s)")
+
+
+# (token_key, resource) -> {'remaining', 'limit', 'reset', 'synced_at'}
+_budgets = {}
+_condition = threading.Condition()
+_waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+_context = threading.local()
+
+# (token_key, url) -> (etag, requests.Response)
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+_shared_collection = None
+
+
+def _get_shared_collection():
+    """Get rate limit collection (lazy initialization)"""
+    global _shared_collection
+    if _shared_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _shared_collection = db['github_rate_limits']
+        _shared_collection.create_index([("token_key", 1), ("resource", 1)], unique=True)
+    return _shared_collection
+
+
+def token_key(token):
+    """Stable, non-reversible identifier for a GitHub token"""
+    if not token:
+        return 'anonymous'
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+
+def _token_from_headers(headers):
+    auth = (headers or {}).get('Authorization', '')
+    return auth.split(' ', 1)[1] if ' ' in auth else None
+
+
+def resource_for_url(url):
+    """Map a GitHub API URL to its rate limit resource"""
+    if '/search/code' in url:
+        return 'code_search'
+    if '/search/' in url:
+        return 'search'
+    if '/graphql' in url:
+        return 'graphql'
+    return 'core'
+
+
+@contextlib.contextmanager
+def github_priority(priority):
+    """Run the enclosed GitHub calls with the given priority (interactive or background)"""
+    previous = getattr(_context, 'priority', None)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority():
+    return getattr(_context, 'priority', None) or INTERACTIVE
+
+
+def with_current_priority(fn, *args):
+    """Wrap fn so a worker thread runs it with the caller's GitHub priority"""
+    priority = current_priority()
+
+    def run():
+        with github_priority(priority):
+            return fn(*args)
+    return run
+
+
+def _shared_sync_due(state, now):
+    return not state or now - state.get('synced_at', 0) >= SHARED_SYNC_SECONDS
+
+
+def _read_shared(key, resource):
+    """The shared view written by other workers (a Mongo round-trip - never call it holding _condition)"""
+    try:
+        collection = _get_shared_collection()
+        return collection.find_one({"token_key": key, "resource": resource}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read shared GitHub budget: {str(e)[:100]}")
+        return None
+
+
+def _merge_shared(key, resource, doc):
+    """Fold the shared view into the local budget (caller holds _condition)"""
+    state = _budgets.get((key, resource))
+    # Newer window, or the same window with fewer requests left, wins
+    if doc and (
+        not state
+        or doc.get('reset', 0) > state.get('reset', 0)
+        or (doc.get('reset') == state.get('reset') and doc.get('remaining', 0) < state.get('remaining', 0))
+    ):
+        state = {
+            'remaining': doc.get('remaining', 0),
+            'limit': doc.get('limit', 0),
+            'reset': doc.get('reset', 0),
+        }
+    if state:
+        state['synced_at'] = time.time()
+        _budgets[(key, resource)] = state
+    return state
+
+
+def _synced_budget(key, resource):
+    """Local budget, refreshed from the shared view when due; the read happens outside the lock"""
+    with _condition:
+        due = _shared_sync_due(_budgets.get((key, resource)), time.time())
+    doc = _read_shared(key, resource) if due else None
+    with _condition:
+        return _merge_shared(key, resource, doc) if due else _budgets.get((key, resource))
+
+
+def _persist_shared(key, resource, state):
+    try:
+        collection = _get_shared_collection()
+        if collection is None:
+            return
+        collection.update_one(
+            {"token_key": key, "resource": resource},
+            {"$set": {
+                "remaining": state['remaining'],
+                "limit": state['limit'],
+                "reset": state['reset'],
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not persist shared GitHub budget: {str(e)[:100]}")
+
+
+def _acquire(key, resource, priority):
+    """Block until a request may be sent, or raise GitHubRateLimited"""
+    max_wait = INTERACTIVE_MAX_WAIT if priority == INTERACTIVE else BACKGROUND_MAX_WAIT
+    deadline = time.time() + max_wait
+
+    with _condition:
+        _waiting[priority] += 1
+    try:
+        while True:
+            with _condition:
+                due = _shared_sync_due(_budgets.get((key, resource)), time.time())
+            doc = _read_shared(key, resource) if due else None
+
+            with _condition:
+                now = time.time()
+                state = _merge_shared(key, resource, doc) if due else _budgets.get((key, resource))
+
+                if not state or state.get('reset', 0) <= now:
+                    return  # Unknown or already-reset budget: let the response headers tell us
+
+                floor = 0
+                if priority == BACKGROUND:
+                    floor = max(1, int(state.get('limit', 0) * BACKGROUND_RESERVE_FRACTION))
+                    if _waiting[INTERACTIVE]:
+                        floor = max(floor, state['remaining'])  # Interactive calls go first
+
+                if state['remaining'] > floor:
+                    state['remaining'] -= 1
+                    return
+
+                if state['reset'] > deadline:
+                    raise GitHubRateLimited(resource, state['reset'])
+
+                logger.info(f"⏳ GitHub {resource} budget low ({state['remaining']} left), {priority} request waiting for reset")
+                _condition.wait(timeout=min(max(state['reset'] - now, 0.05), 1.0))
+    finally:
+        with _condition:
+            _waiting[priority] -= 1
+
+
+def _record(key, resource, response):
+    """Update the budget from GitHub's rate limit headers"""
+    headers = response.headers
+    remaining = headers.get('X-RateLimit-Remaining')
+    reset = headers.get('X-RateLimit-Reset')
+    resource = headers.get('X-RateLimit-Resource', resource)
+
+    state = None
+    if remaining is not None and reset is not None:
+        try:
+            state = {
+                'remaining': int(remaining),
+                'limit': int(headers.get('X-RateLimit-Limit', 0)),
+                'reset': int(reset),
+            }
+        except ValueError:
+            state = None
+
+    # Secondary limits come back as 403/429 with Retry-After and no budget headers
+    retry_after = headers.get('Retry-After')
+    if response.status_code in (403, 429) and retry_after:
+        try:
+            state = state or {'limit': 0}
+            state['remaining'] = 0
+            state['reset'] = int(time.time() + int(retry_after))
+        except ValueError:
+            pass
+
+    if not state:
+        return
+
+    with _condition:
+        previous = _budgets.get((key, resource))
+        state['synced_at'] = previous.get('synced_at', 0) if previous else 0
+        _budgets[(key, resource)] = state
+        should_persist = (
+            not previous
+            or previous.get('reset') != state['reset']
+            or time.time() - state['synced_at'] >= SHARED_SYNC_SECONDS
+            or state['remaining'] <= max(1, int(state['limit'] * BACKGROUND_RESERVE_FRACTION))
+        )
+        if should_persist:
+            state['synced_at'] = time.time()
+        _condition.notify_all()
+
+    if should_persist:
+        _persist_shared(key, resource, state)
+
+
+def _is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        response.headers.get('X-RateLimit-Remaining') == '0' or response.headers.get('Retry-After')
+    )
+
+
+def _cached_response(key, url):
+    with _response_cache_lock:
+        entry = _response_cache.get((key, url))
+        if entry:
+            _response_cache.move_to_end((key, url))
+        return entry
+
+
+def _store_response(key, url, response):
+    etag = response.headers.get('ETag')
+    if not etag or len(response.content or b'') > RESPONSE_CACHE_MAX_BYTES:
+        return
+    with _response_cache_lock:
+        _response_cache[(key, url)] = (etag, response)
+        _response_cache.move_to_end((key, url))
+        while len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+def github_get(url, headers=None, timeout=10, priority=None, **kwargs):
+    """
+    Rate-limit-aware replacement for requests.get against the GitHub API
+
+    Args:
+        url: GitHub API URL
+        headers: Request headers (the Authorization token selects the budget)
+        timeout: Request timeout in seconds
+        priority: 'interactive' or 'background' (defaults to the github_priority context)
+
+    Returns:
+        requests.Response (a cached response when GitHub answers 304 or the budget is exhausted)
+
+    Raises:
+        GitHubRateLimited: budget exhausted and no cached response for this URL
+    """
+    headers = dict(headers or {})
+    key = token_key(_token_from_headers(headers))
+    resource = resource_for_url(url)
+    priority = priority or current_priority()
+    cached = _cached_response(key, url)
+
+    try:
+        _acquire(key, resource, priority)
+    except GitHubRateLimited:
+        if cached:
+            logger.warning(f"⚠️ GitHub {resource} budget exhausted - serving cached response for {url}")
+            return cached[1]
+        raise
+
+    if cached:
+        headers['If-None-Match'] = cached[0]
+
+    response = requests.get(url, headers=headers, timeout=timeout, **kwargs)
+    _record(key, resource, response)
+
+    if response.status_code == 304 and cached:
+        return cached[1]
+
+    if _is_rate_limited(response):
+        if cached:
+            logger.warning(f"⚠️ GitHub rate limited ({response.status_code}) - serving cached response for {url}")
+            return cached[1]
+        budget = _budgets.get((key, resource), {})
+        raise GitHubRateLimited(resource, budget.get('reset', time.time() + 60))
+
+    if response.status_code == 200:
+        _store_response(key, url, response)
+    return response
+
+
+def get_budget(github_token, resource='core'):
+    """Current known budget for a token/resource (None if never observed)"""
+    key = token_key(github_token)
+    state = _synced_budget(key, resource)
+    with _condition:
+        return dict(state) if state else None
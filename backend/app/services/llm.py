@@ -0,0 +1,302 @@
+"""
+LLM Calls
+Routed Gemini calls (model tier per call site) and JSON-mode output validated against response schemas
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from vertexai.generative_models import GenerativeModel, GenerationConfig
+from app.services.model_routing import get_route
+from app.services.llm_resilience import call_with_resilience, CircuitOpen, LLMTimeout
+from app.services.context_cache import get_handle
+from app.utils.json_stream import parse_json
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# "vertex" (default) or "fake" - local stand-in with injectable latency and faults (see llm_fake)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'vertex').lower()
+# Share of the latency budget the primary model may use when a fallback exists
+PRIMARY_BUDGET_SHARE = 0.7
+# Last good answers, served when every model for a call site is failing
+RECENT_RESPONSES_SIZE = 256
+_recent_responses = OrderedDict()
+_recent_lock = threading.Lock()
+
+FRAGMENT_RETRIES = 1
+# Valid fields sent back as context when a fragment is retried
+FRAGMENT_CONTEXT_CHARS = 4000
+
+_TYPES = {
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+    'array': list,
+    'object': dict,
+}
+
+
+class LLMOutputError(Exception):
+    """Model output could not be brought in line with its response schema"""
+
+
+def json_config(schema, **config):
+    """Generation config requesting schema-constrained JSON output"""
+    return GenerationConfig(response_mime_type='application/json', response_schema=schema, **config)
+
+
+def _request(call_site, model_name, prompt, schema, config, generation_config, stream, context=None):
+    """Zero-argument callable making one request to model_name on the configured backend"""
+    handle = get_handle(context, model_name) if context is not None else None
+    if handle is None and context is not None:
+        prompt = context.inline(prompt, call_site)
+
+    if LLM_BACKEND == 'fake':
+        from app.services.llm_fake import FakeModel
+        cached_content = handle['name'] if handle else None
+        return lambda: FakeModel(model_name, cached_content).generate_content(prompt, schema=schema, stream=stream, **generation_config)
+    if handle is not None and handle['cached'] is not None:
+        return lambda: GenerativeModel.from_cached_content(cached_content=handle['cached']).generate_content(
+            prompt, generation_config=config, stream=stream)
+    if handle is not None:
+        # Local stand-in handle with the real backend - nothing to reference, send it inline
+        prompt = context.inline(prompt, call_site)
+    return lambda: GenerativeModel(model_name).generate_content(prompt, generation_config=config, stream=stream)
+
+
+def _cache_key(call_site, prompt, schema, context=None):
+    digest = hashlib.sha1(
+        f"{context.key if context else ''}|{prompt}|{json.dumps(schema, sort_keys=True) if schema else ''}".encode()
+    ).hexdigest()
+    return (call_site, digest)
+
+
+def _remember(key, text):
+    with _recent_lock:
+        _recent_responses[key] = text
+        _recent_responses.move_to_end(key)
+        while len(_recent_responses) > RECENT_RESPONSES_SIZE:
+            _recent_responses.popitem(last=False)
+
+
+def generate(call_site, prompt, schema=None, stream=False, context=None, **generation_config):
+    """
+    Call the model routed for call_site, falling back to the tier's fallback model on error
+
+    The whole call (retries, hedged requests and fallback) must finish within the
+    route's latency_budget. When every model fails, the last good answer to the same
+    prompt is returned if one is remembered.
+
+    Args:
+        schema: Response schema - requests constrained JSON output when given
+        context: SharedContext placed before the prompt - referenced through the provider's
+                 context cache when large enough, otherwise sent inline within call_site's budget
+        generation_config: temperature, top_p, ... (max_output_tokens defaults to the route's)
+
+    Returns:
+        Vertex AI response (an iterator of chunks when stream=True)
+    """
+    route = get_route(call_site)
+    generation_config = {'max_output_tokens': route['max_output_tokens'], **generation_config}
+    config = json_config(schema, **generation_config) if schema and LLM_BACKEND != 'fake' else generation_config
+    models = [route['model']]
+    if route.get('fallback') and route['fallback'] != route['model']:
+        models.append(route['fallback'])
+
+    started = time.monotonic()
+    deadline = started + route['latency_budget']
+    key = _cache_key(call_site, prompt, schema, context)
+    last_error = None
+    for attempt, model_name in enumerate(models):
+        # Keep part of the budget for the fallback model
+        model_deadline = deadline if attempt == len(models) - 1 else started + route['latency_budget'] * PRIMARY_BUDGET_SHARE
+        try:
+            response = call_with_resilience(
+                _request(call_site, model_name, prompt, schema, config, generation_config, stream, context),
+                model_name, route['tier'], model_deadline, hedge=not stream
+            )
+            if not stream:
+                _remember(key, response.text)
+            return response
+        except Exception as e:
+            last_error = e
+            if attempt < len(models) - 1:
+                logger.warning(f"⚠️ {call_site} failed on {model_name}, falling back to {models[attempt + 1]}: {str(e)[:200]}")
+
+    with _recent_lock:
+        cached = _recent_responses.get(key)
+    if cached is not None and not stream:
+        logger.warning(f"⚠️ {call_site} unavailable ({str(last_error)[:200]}), serving the last good answer")
+        observe('llm_degraded', 1, {'call_site': call_site})
+        return SimpleNamespace(text=cached)
+    raise last_error
+
+
+def generate_text(call_site, prompt, degraded=None, **generation_config):
+    """
+    Plain-text completion for call_site
+
+    Args:
+        degraded: Text returned instead of raising when the model is unavailable
+    """
+    try:
+        return generate(call_site, prompt, **generation_config).text
+    except (CircuitOpen, LLMTimeout) as e:
+        if degraded is None:
+            raise
+        logger.warning(f"⚠️ {call_site} degraded: {str(e)}")
+        observe('llm_degraded', 1, {'call_site': call_site})
+        return degraded
+
+
+def load_json(text, context="response"):
+    """Parse model output - strict first, then the tolerant parser for truncated or fenced output"""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parse_json(text or '')
+    except ValueError as e:
+        logger.error(f"❌ JSON extraction failed for {context}: {str(e)}")
+        logger.error(f"📄 Malformed output:\n{(text or '')[:1000]}...")
+        raise LLMOutputError(f"Invalid JSON in {context}: {str(e)}")
+
+
+def _conform(value, schema, path, errors):
+    """Check value against schema, coercing harmless mismatches (e.g. "4" for an integer)"""
+    kind = schema.get('type')
+    if value is None:
+        if not schema.get('nullable'):
+            errors.append((path, 'missing'))
+        return value
+
+    if kind in ('integer', 'number') and isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            pass
+    if kind == 'integer' and isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if kind == 'string' and isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+
+    expected = _TYPES.get(kind)
+    if expected and (not isinstance(value, expected) or (kind in ('integer', 'number') and isinstance(value, bool))):
+        errors.append((path, f'expected {kind}'))
+        return value
+
+    if 'enum' in schema and value not in schema['enum']:
+        match = next((option for option in schema['enum'] if option.lower() == str(value).strip().lower()), None)
+        if match is None:
+            errors.append((path, f"not one of {schema['enum']}"))
+        return match if match is not None else value
+
+    if kind == 'object':
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append((path + (key,), 'missing'))
+        for key, sub_schema in schema.get('properties', {}).items():
+            if key in value:
+                value[key] = _conform(value[key], sub_schema, path + (key,), errors)
+    elif kind == 'array' and 'items' in schema:
+        value = [_conform(item, schema['items'], path + (i,), errors) for i, item in enumerate(value)]
+    return value
+
+
+def validate_json(value, schema):
+    """
+    Validate (and lightly coerce) a parsed value against a response schema
+
+    Returns:
+        tuple: (coerced value, list of (path, problem) errors)
+    """
+    errors = []
+    value = _conform(value, schema, (), errors)
+    return value, errors
+
+
+def _retry_fields(call_site, prompt, result, schema, keys, generation_config):
+    """Ask the model again for just the failing top-level fields"""
+    fragment_schema = {
+        'type': 'object',
+        'properties': {key: schema['properties'][key] for key in keys},
+        'required': keys
+    }
+    valid = json.dumps({k: v for k, v in result.items() if k not in keys}, default=str)[:FRAGMENT_CONTEXT_CHARS]
+    fragment_prompt = f"""{prompt}
+
+A previous answer to this request was valid except for these fields: {', '.join(keys)}.
+Fields already answered (keep consistent with them):
+{valid}
+
+Return a JSON object containing ONLY these fields: {', '.join(keys)}."""
+
+    logger.info(f"🔁 Retrying {len(keys)} field(s) of {call_site}: {keys}")
+    response = generate(call_site, fragment_prompt, schema=fragment_schema, **generation_config)
+    fragment = load_json(response.text, f"{call_site} (fields {', '.join(keys)})")
+    return fragment if isinstance(fragment, dict) else {}
+
+
+def complete_json(value, prompt, schema, call_site, generation_config=None):
+    """
+    Validate a parsed response, re-generating only the top-level fields that fail
+
+    Raises:
+        LLMOutputError: required fields are still missing or invalid after the retries
+    """
+    generation_config = generation_config or {}
+    if schema.get('type') == 'object' and not isinstance(value, dict):
+        value = {}
+
+    required = set(schema.get('required', []))
+    value, errors = validate_json(value, schema)
+    retries = 0
+    while errors and retries < FRAGMENT_RETRIES and schema.get('type') == 'object':
+        # Only required fields are worth another call - invalid optional ones are dropped below
+        keys = list(dict.fromkeys(path[0] for path, _ in errors if path and path[0] in required))
+        if not keys:
+            break
+        retries += 1
+        logger.warning(f"⚠️ {call_site}: {len(errors)} schema error(s), e.g. {errors[0]}")
+        try:
+            value.update(_retry_fields(call_site, prompt, value, schema, keys, generation_config))
+        except Exception as e:
+            logger.error(f"❌ Fragment retry failed for {call_site}: {str(e)}")
+            break
+        value, errors = validate_json(value, schema)
+    observe('llm_fragment_retries', retries, {'call_site': call_site})
+
+    if errors:
+        fatal = [(path, problem) for path, problem in errors if path and path[0] in required]
+        if fatal:
+            path, problem = fatal[0]
+            raise LLMOutputError(f"Invalid {call_site}: {'.'.join(map(str, path))} {problem}")
+        # Optional fields that are still invalid are dropped rather than failing the request
+        for path, _ in errors:
+            if path:
+                value.pop(path[0], None)
+    return value
+
+
+def generate_json(call_site, prompt, schema, **generation_config):
+    """
+    Call the routed model in JSON mode and return a response conforming to schema
+
+    Args:
+        call_site: Routing key (see model_routing.DEFAULT_ROUTES), also used in logs and errors
+        schema: OpenAPI-style response schema (type/properties/required/items/enum)
+        generation_config: temperature, top_p, ...
+
+    Raises:
+        LLMOutputError: the response could not be made to conform
+    """
+    text = generate(call_site, prompt, schema=schema, **generation_config).text
+    logger.info(f"📝 {call_site} response ({len(text)} chars): {text[:200]}...")
+    return complete_json(load_json(text, call_site), prompt, schema, call_site, generation_config)
@@ -0,0 +1,94 @@
+"""
+Fake LLM Backend
+Local stand-in for Gemini (LLM_BACKEND=fake) with injectable latency and faults
+"""
+import os
+import json
+import time
+import random
+import threading
+from types import SimpleNamespace
+
+# Defaults, overridable per model with configure()
+_faults = {
+    '*': {
+        'latency': os.getenv('LLM_FAKE_LATENCY', '0'),       # seconds, or "min-max"
+        'error_rate': float(os.getenv('LLM_FAKE_ERROR_RATE', '0')),
+        'error': os.getenv('LLM_FAKE_ERROR', '503 Service Unavailable (injected)'),
+    }
+}
+_rng = random.Random(os.getenv('LLM_FAKE_SEED'))
+_lock = threading.Lock()
+_calls = []
+_prompts = []
+
+
+def configure(model='*', **settings):
+    """Set latency / error_rate / error for one model (or '*' for all)"""
+    with _lock:
+        _faults[model] = {**_faults.get(model, _faults['*']), **settings}
+
+
+def reset():
+    with _lock:
+        for model in [m for m in _faults if m != '*']:
+            del _faults[model]
+        _calls.clear()
+        _prompts.clear()
+
+
+def calls():
+    """Models called so far, in order"""
+    with _lock:
+        return list(_calls)
+
+
+def prompts():
+    """(cached_content, prompt) of each request so far"""
+    with _lock:
+        return list(_prompts)
+
+
+def _latency(spec):
+    spec = str(spec)
+    if '-' in spec:
+        low, high = (float(v) for v in spec.split('-', 1))
+        return _rng.uniform(low, high)
+    return float(spec)
+
+
+def sample_from_schema(schema):
+    """Smallest value that satisfies a response schema"""
+    kind = schema.get('type')
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if kind == 'object':
+        return {key: sample_from_schema(sub) for key, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [sample_from_schema(schema['items'])] if 'items' in schema else []
+    return {'string': 'fake', 'integer': 1, 'number': 1.0, 'boolean': False}.get(kind)
+
+
+class FakeModel:
+    def __init__(self, model_name, cached_content=None):
+        self.model_name = model_name
+        # Name of a local context cache handle (see context_cache) - its text precedes the prompt
+        self.cached_content = cached_content
+
+    def generate_content(self, prompt, schema=None, stream=False, **generation_config):
+        with _lock:
+            faults = _faults.get(self.model_name, _faults['*'])
+            fail = _rng.random() < float(faults['error_rate'])
+            _calls.append(self.model_name)
+            _prompts.append((self.cached_content, prompt))
+        time.sleep(_latency(faults['latency']))
+        if fail:
+            raise Exception(faults['error'])
+
+        if schema:
+            text = json.dumps(sample_from_schema(schema))
+        else:
+            text = f"[{self.model_name}] {prompt[:200]}"
+        if stream:
+            return iter([SimpleNamespace(text=text[i:i + 32]) for i in range(0, len(text), 32)])
+        return SimpleNamespace(text=text)
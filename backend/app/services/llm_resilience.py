@@ -0,0 +1,190 @@
+"""
+LLM Resilience
+Per-call deadlines, jittered retries, hedged requests and per-model circuit breakers for LLM calls
+"""
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.utils.metrics import observe, get_histogram
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 4.0
+
+# A second request is sent once the first has run longer than the model's p95 latency
+HEDGING_ENABLED = os.getenv('LLM_HEDGING', 'true').lower() == 'true'
+HEDGE_MIN_SAMPLES = 20
+
+BREAKER_WINDOW = 20          # outcomes considered
+BREAKER_MIN_CALLS = 10       # before the error rate means anything
+BREAKER_ERROR_RATE = 0.5
+BREAKER_OPEN_SECONDS = 30    # then one probe call is let through
+
+# Timed-out calls keep running in the pool; the Flask worker is released at the deadline
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('LLM_MAX_WORKERS', '32')), thread_name_prefix='llm')
+
+_RETRYABLE_TYPES = {
+    'ServiceUnavailable', 'ResourceExhausted', 'DeadlineExceeded', 'InternalServerError',
+    'TooManyRequests', 'GatewayTimeout', 'BadGateway', 'Aborted', 'LLMTimeout', 'TimeoutError', 'ConnectionError'
+}
+_RETRYABLE_MARKERS = ('429', '500', '502', '503', '504', 'unavailable', 'resource exhausted', 'deadline', 'timed out')
+
+
+class LLMTimeout(Exception):
+    """The call did not finish before its deadline"""
+
+
+class CircuitOpen(Exception):
+    """The model's circuit breaker is open - failing fast"""
+
+
+def is_retryable(error):
+    if type(error).__name__ in _RETRYABLE_TYPES:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+
+class CircuitBreaker:
+    """Opens when the recent error rate of a model is too high; half-opens with a single probe"""
+
+    def __init__(self, name):
+        self.name = name
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.time() - self.opened_at >= BREAKER_OPEN_SECONDS else 'open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at >= BREAKER_OPEN_SECONDS and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record(self, ok):
+        with self.lock:
+            if self.probing:
+                self.probing = False
+                if ok:
+                    logger.info(f"✅ Circuit for {self.name} closed")
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = time.time()
+                return
+
+            self.outcomes.append(ok)
+            errors = self.outcomes.count(False)
+            if (self.opened_at is None and len(self.outcomes) >= BREAKER_MIN_CALLS
+                    and errors / len(self.outcomes) >= BREAKER_ERROR_RATE):
+                self.opened_at = time.time()
+                logger.error(f"🔌 Circuit for {self.name} opened ({errors}/{len(self.outcomes)} recent calls failed)")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_states():
+    with _breakers_lock:
+        return {name: breaker.state for name, breaker in _breakers.items()}
+
+
+def _hedge_delay(labels):
+    if not HEDGING_ENABLED:
+        return None
+    histogram = get_histogram('llm_latency_seconds', labels)
+    if histogram is None or histogram.count < HEDGE_MIN_SAMPLES:
+        return None
+    return histogram.percentile(0.95)
+
+
+def _run_hedged(fn, deadline, hedge_after, labels):
+    """Run fn in the pool; start one duplicate after hedge_after seconds; first success wins"""
+    futures = [_executor.submit(fn)]
+    started = time.monotonic()
+    hedged = False
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            raise LLMTimeout(f"LLM call exceeded its deadline after {now - started:.1f}s")
+        timeout = deadline - now
+        if hedge_after is not None and not hedged:
+            timeout = min(timeout, max(0, started + hedge_after - now))
+
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        futures = [f for f in futures if f not in done]
+        if not futures:
+            raise next(iter(done)).exception()
+
+        if hedge_after is not None and not hedged and time.monotonic() - started >= hedge_after:
+            hedged = True
+            observe('llm_hedged_requests', 1, labels)
+            logger.info(f"🏇 Hedging {labels['model']} request after {hedge_after:.1f}s")
+            futures.append(_executor.submit(fn))
+
+
+def call_with_resilience(fn, model_name, tier, deadline, hedge=True):
+    """
+    Run one model call with deadline, retries, hedging and circuit breaking
+
+    Args:
+        fn: Zero-argument callable making the request
+        deadline: time.monotonic() value the call must finish by
+        hedge: Allow a hedged duplicate request (not for streams)
+
+    Raises:
+        CircuitOpen, LLMTimeout, or the last error from fn
+    """
+    labels = {'tier': tier, 'model': model_name}
+    breaker = get_breaker(model_name)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpen(f"Circuit open for {model_name}")
+
+        started = time.time()
+        try:
+            result = _run_hedged(fn, deadline, _hedge_delay(labels) if hedge else None, labels)
+        except Exception as e:
+            breaker.record(False)
+            observe('llm_errors', 1, labels)
+            attempt += 1
+            if not is_retryable(e) or attempt > MAX_RETRIES:
+                raise
+            # Full jitter keeps retries from many workers from arriving together
+            backoff = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if time.monotonic() + backoff >= deadline:
+                raise
+            logger.warning(f"⚠️ {model_name} attempt {attempt} failed ({str(e)[:120]}), retrying in {backoff:.2f}s")
+            time.sleep(backoff)
+            continue
+
+        breaker.record(True)
+        observe('llm_latency_seconds', time.time() - started, labels)
+        return result
@@ -0,0 +1,84 @@
+"""
+Mention Polling State
+Per-(user, channel) watermark of the last scanned message and the set of mentions already surfaced
+"""
+import os
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SEEN_TTL_SECONDS = int(os.getenv('SEEN_MENTIONS_TTL_SECONDS', str(30 * 24 * 3600)))
+
+_watermarks_collection = None
+_seen_collection = None
+
+
+def _get_watermarks_collection():
+    """Get mention watermarks collection (lazy initialization)"""
+    global _watermarks_collection
+    if _watermarks_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _watermarks_collection = db['mention_watermarks']
+    return _watermarks_collection
+
+
+def _get_seen_collection():
+    """Get seen mentions collection (lazy initialization)"""
+    global _seen_collection
+    if _seen_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _seen_collection = db['seen_mentions']
+        _seen_collection.create_index("seen_at", expireAfterSeconds=SEEN_TTL_SECONDS)
+    return _seen_collection
+
+
+def get_watermark(user_id, channel):
+    """ts of the newest message already scanned for this user, or None before the first poll"""
+    collection = _get_watermarks_collection()
+    doc = collection.find_one({'_id': f"{user_id}:{channel}"}) if collection is not None else None
+    return doc.get('last_ts') if doc else None
+
+
+def advance_watermark(user_id, channel, ts):
+    """Move the watermark forward to ts (never backwards)"""
+    collection = _get_watermarks_collection()
+    if collection is None or not ts:
+        return
+    current = get_watermark(user_id, channel)
+    if current and float(current) >= float(ts):
+        return
+    collection.update_one(
+        {'_id': f"{user_id}:{channel}"},
+        {'$set': {'last_ts': ts, 'user_id': user_id, 'channel': channel, 'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def mark_seen(user_id, mention_ids):
+    """
+    Record mentions as surfaced to this user
+
+    Returns:
+        set: The ids that had not been seen before
+    """
+    collection = _get_seen_collection()
+    if collection is None or not mention_ids:
+        return set(mention_ids)
+    keys = {f"{user_id}:{mention_id}": mention_id for mention_id in mention_ids}
+    seen = {doc['_id'] for doc in collection.find({'_id': {'$in': list(keys)}}, {'_id': 1})}
+    new = [key for key in keys if key not in seen]
+    if new:
+        from pymongo.errors import BulkWriteError
+        try:
+            now = datetime.utcnow()
+            collection.insert_many([{'_id': key, 'user_id': user_id, 'seen_at': now} for key in new], ordered=False)
+        except BulkWriteError as e:
+            # A concurrent poll recorded some of them first - it surfaces those
+            duplicates = {new[error['index']] for error in e.details.get('writeErrors', [])}
+            new = [key for key in new if key not in duplicates]
+    return {keys[key] for key in new}
@@ -0,0 +1,150 @@
+"""
+Model Routing
+Maps each LLM call site to a model tier (model, max tokens, latency budget, fallback), overridable at runtime
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+FAST = 'fast'          # short classification / extraction
+STANDARD = 'standard'  # plans, answers, summaries
+DEEP = 'deep'          # long structured analysis
+
+DEFAULT_TIERS = {
+    FAST: {
+        'model': os.getenv('LLM_FAST_MODEL', 'gemini-2.0-flash-lite'),
+        'fallback': os.getenv('LLM_FAST_FALLBACK', 'gemini-2.0-flash'),
+        'max_output_tokens': 512,
+        'latency_budget': 8,
+    },
+    STANDARD: {
+        'model': os.getenv('LLM_STANDARD_MODEL', 'gemini-2.0-flash-exp'),
+        'fallback': os.getenv('LLM_STANDARD_FALLBACK', 'gemini-2.0-flash'),
+        'max_output_tokens': 2048,
+        'latency_budget': 45,
+    },
+    DEEP: {
+        'model': os.getenv('LLM_DEEP_MODEL', 'gemini-2.0-flash-exp'),
+        'fallback': os.getenv('LLM_DEEP_FALLBACK', 'gemini-2.0-flash'),
+        'max_output_tokens': 4096,
+        'latency_budget': 90,
+    },
+}
+
+# Call site -> tier, plus per-site overrides of the tier settings
+DEFAULT_ROUTES = {
+    'task_type': {'tier': FAST},
+    'clarity': {'tier': FAST},
+    'resume': {'tier': FAST, 'max_output_tokens': 2048},
+    'plan': {'tier': STANDARD},
+    'slack_summary': {'tier': STANDARD},
+    'slack_summary_reduce': {'tier': STANDARD},
+    'slack_mention': {'tier': STANDARD},
+    'resolve_issue': {'tier': STANDARD},
+    'ask_feeta': {'tier': STANDARD},
+    'playground': {'tier': STANDARD},
+    'repo_summary': {'tier': DEEP},
+}
+
+# Overrides stored in Mongo are re-read at most this often, so every worker converges
+RELOAD_SECONDS = 60
+
+_overrides = {'tiers': {}, 'routes': {}}
+_loaded_at = 0
+_lock = threading.Lock()
+_config_collection = None
+
+
+def _env_overrides():
+    overrides = {'tiers': {}, 'routes': {}}
+    for key, env in (('tiers', 'LLM_TIERS'), ('routes', 'LLM_ROUTES')):
+        raw = os.getenv(env)
+        if raw:
+            try:
+                overrides[key] = json.loads(raw)
+            except ValueError:
+                logger.error(f"❌ Ignoring invalid {env}: not JSON")
+    return overrides
+
+
+def _get_config_collection():
+    """Get LLM config collection (lazy initialization)"""
+    global _config_collection
+    if _config_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _config_collection = db['llm_config']
+    return _config_collection
+
+
+def _load_overrides():
+    global _overrides, _loaded_at
+    with _lock:
+        if time.time() - _loaded_at < RELOAD_SECONDS:
+            return _overrides
+        _loaded_at = time.time()
+
+    overrides = _env_overrides()
+    try:
+        collection = _get_config_collection()
+        doc = collection.find_one({"_id": "routing"}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load model routing overrides: {str(e)[:100]}")
+        doc = None
+    for key in ('tiers', 'routes'):
+        for name, settings in ((doc or {}).get(key) or {}).items():
+            overrides[key][name] = {**overrides[key].get(name, {}), **settings}
+
+    with _lock:
+        _overrides = overrides
+    return overrides
+
+
+def get_routing_table():
+    """Effective tiers and routes (defaults + env + Mongo overrides)"""
+    overrides = _load_overrides()
+    tiers = {name: {**settings, **overrides['tiers'].get(name, {})} for name, settings in DEFAULT_TIERS.items()}
+    for name, settings in overrides['tiers'].items():
+        tiers.setdefault(name, settings)
+    routes = {name: {**settings, **overrides['routes'].get(name, {})} for name, settings in DEFAULT_ROUTES.items()}
+    for name, settings in overrides['routes'].items():
+        routes.setdefault(name, settings)
+    return {'tiers': tiers, 'routes': routes}
+
+
+def get_route(call_site):
+    """
+    Resolve a call site to its settings
+
+    Returns:
+        dict: tier, model, fallback, max_output_tokens, latency_budget
+    """
+    table = get_routing_table()
+    route = table['routes'].get(call_site) or {'tier': STANDARD}
+    tier = route.get('tier') if route.get('tier') in table['tiers'] else STANDARD
+    return {**table['tiers'][tier], **route, 'tier': tier, 'call_site': call_site}
+
+
+def update_routing(tiers=None, routes=None):
+    """Persist routing overrides (merged into the stored ones) and apply them in this worker immediately"""
+    global _loaded_at
+    collection = _get_config_collection()
+    if collection is None:
+        raise Exception("Database not available")
+
+    update = {}
+    for key, values in (('tiers', tiers), ('routes', routes)):
+        for name, settings in (values or {}).items():
+            for field, value in settings.items():
+                update[f"{key}.{name}.{field}"] = value
+    if update:
+        collection.update_one({"_id": "routing"}, {"$set": update}, upsert=True)
+        with _lock:
+            _loaded_at = 0
+        logger.info(f"✅ Model routing updated: {sorted(update)}")
+    return get_routing_table()
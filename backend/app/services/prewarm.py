@@ -0,0 +1,146 @@
+"""
+Project Pre-warming
+Builds a project's repository context, symbol index and Slack directory in the background ahead of the first request
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from app.services.github_rate_limiter import github_priority, BACKGROUND
+from app.services.event_bus import publish
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.getenv('PROJECT_PREWARM', 'true').lower() == 'true'
+# Interactive callers only ever look at the first few repositories of a project
+MAX_REPOS = 3
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PREWARM_WORKERS', '2')), thread_name_prefix='prewarm')
+_jobs = {}  # project_id -> Future
+_jobs_lock = threading.Lock()
+
+
+def project_repos(project):
+    """(owner, repo) pairs linked to a project, 'repos' first, then the legacy 'repo' field"""
+    linked = list(project.get('repos') or [])
+    if isinstance(project.get('repo'), dict):
+        linked.append(project['repo'])
+    pairs = []
+    for repo in linked:
+        full_name = (repo.get('full_name') or repo.get('name', '')) if isinstance(repo, dict) else str(repo)
+        if '/' in full_name and tuple(full_name.split('/', 1)) not in pairs:
+            pairs.append(tuple(full_name.split('/', 1)))
+    return pairs[:MAX_REPOS]
+
+
+def _save_state(project_id, state, user_id=None):
+    """Write the warm-state indicator (without touching the project's updated_at) and push it to the owner"""
+    try:
+        from app.database.mongodb import db
+        if db is not None:
+            db['projects'].update_one({'_id': ObjectId(project_id)}, {'$set': {'warm_state': state}})
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save warm state of project {project_id}: {str(e)}")
+    publish(user_id, 'job_progress', {'job': 'project_prewarm', 'project_id': project_id, **state})
+
+
+def _warm_component(state, project_id, user_id, name, kind, fn):
+    started = time.time()
+    try:
+        status = fn()
+    except Exception as e:
+        logger.warning(f"⚠️ Pre-warm of {kind} {name} failed: {str(e)[:200]}")
+        status = 'failed'
+    observe('prewarm_seconds', time.time() - started, {'kind': kind, 'status': status})
+    state['components'].append({'kind': kind, 'name': name, 'status': status})
+    _save_state(project_id, state, user_id)
+
+
+def _warm_project(project_id):
+    from app.database.mongodb import db
+    from app.api.slack import get_token_for_user
+    from app.services.repo_intelligence import get_repo_intelligence, SUMMARY
+    from app.services.symbol_index import ensure_symbol_index
+    from app.services.slack_directory import directory_for_user
+
+    project = db['projects'].find_one({'_id': ObjectId(project_id)})
+    if not project:
+        return
+    user_id = project.get('user_id')
+    user = db['users'].find_one({'_id': ObjectId(user_id)}) if ObjectId.is_valid(user_id) else None
+    github_token = user.get('github_token') if user else None
+
+    started = time.time()
+    state = {'status': 'warming', 'components': [], 'started_at': datetime.utcnow()}
+    _save_state(project_id, state, user_id)
+    logger.info(f"🔥 Pre-warming project {project_id}")
+
+    def warm_context(owner, repo):
+        get_repo_intelligence(owner, repo, github_token, tier=SUMMARY)
+        return 'warm'
+
+    def warm_symbols(owner, repo):
+        index = ensure_symbol_index(owner, repo, github_token, wait=True)
+        # A large repo is indexed over several builds; what is there is already usable
+        return 'warm' if index and not index.get('pending') else 'partial'
+
+    def warm_directory(token_info):
+        return 'warm' if directory_for_user(token_info) is not None else 'failed'
+
+    with github_priority(BACKGROUND):
+        for owner, repo in project_repos(project):
+            _warm_component(state, project_id, user_id, f"{owner}/{repo}", 'repo_context', lambda: warm_context(owner, repo))
+            _warm_component(state, project_id, user_id, f"{owner}/{repo}", 'symbols', lambda: warm_symbols(owner, repo))
+
+    token_info = get_token_for_user(user_id)
+    if token_info:
+        _warm_component(state, project_id, user_id, token_info.get('team_id') or 'slack', 'slack_directory',
+                        lambda: warm_directory(token_info))
+
+    statuses = {c['status'] for c in state['components']}
+    state['status'] = 'warm' if statuses <= {'warm'} else ('failed' if statuses == {'failed'} else 'partial')
+    state['finished_at'] = datetime.utcnow()
+    _save_state(project_id, state, user_id)
+    logger.info(f"✅ Project {project_id} pre-warmed: {state['status']} ({time.time() - started:.1f}s)")
+
+
+def _run(project_id):
+    try:
+        _warm_project(project_id)
+    except Exception as e:
+        logger.error(f"❌ Pre-warm of project {project_id} failed: {str(e)}")
+        _save_state(project_id, {'status': 'failed', 'components': [], 'finished_at': datetime.utcnow()})
+
+
+def enqueue_project_warmup(project_id):
+    """
+    Queue a background warm-up of everything a project's first request would build
+
+    The job reads the project when it starts, so a queued job already covers repos linked
+    after it was enqueued; a running job is followed by another one.
+
+    Returns:
+        dict: The warm-state indicator as of now, or None if pre-warming is disabled
+    """
+    if not PREWARM_ENABLED:
+        return None
+    project_id = str(project_id)
+    with _jobs_lock:
+        future = _jobs.get(project_id)
+        if future is not None and not future.running() and not future.done():
+            return {'status': 'queued'}
+        state = {'status': 'queued', 'components': [], 'queued_at': datetime.utcnow()}
+        _save_state(project_id, state)
+        future = _jobs[project_id] = _executor.submit(_run, project_id)
+    future.add_done_callback(lambda f: _forget(project_id, f))
+    return state
+
+
+def _forget(project_id, future):
+    with _jobs_lock:
+        if _jobs.get(project_id) is future:
+            del _jobs[project_id]
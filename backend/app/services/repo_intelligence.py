@@ -0,0 +1,655 @@
+"""
+Repository Intelligence Engine
+Tiered repo analysis (static scan + LLM summary) with one output schema and one cache
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from app.database.mongodb import get_repo_context, save_repo_context_tier
+from app.services.repo_tree import RepoTree, load_repo_snapshot
+from app.services.github_service import analyze_dependencies, analyze_code_patterns
+from app.services.llm import generate_json
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+STATIC = 'static'    # tree, manifests, code patterns - GitHub only, no LLM
+SUMMARY = 'summary'  # LLM architecture summary built on top of the static tier
+TIERS = (STATIC, SUMMARY)
+
+# Short-lived in-process copy so repeated calls in one request flow skip Mongo
+LOCAL_CACHE_SECONDS = 60
+SAMPLE_FILES = 100
+
+# Full file listings kept in memory (the Mongo copy is bounded by the 16MB document limit)
+SNAPSHOT_CACHE_SIZE = 8
+SNAPSHOT_MAX_BYTES = 15 * 1024 * 1024
+
+CONFIG_FILE_PATTERNS = ['config', '.env', 'docker', 'package.json', 'requirements.txt', 'tsconfig', 'webpack']
+
+_local_cache = {}  # repo_full_name -> (cached_at, tiers dict)
+_local_cache_lock = threading.Lock()
+
+# Concurrent cold builds of the same repo (and tree, for summaries) share one build
+_static_builds = SingleFlight('repo_static')
+_summary_builds = SingleFlight('repo_summary')
+
+_snapshots = OrderedDict()  # repo_full_name -> RepoTree
+_snapshot_collection = None
+
+
+# ============== SCHEMA ==============
+
+def _as_list(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [v for v in value if v and str(v).lower() not in ('none', 'n/a', 'unknown')]
+    return [value] if str(value).lower() not in ('none', 'n/a', 'unknown') else []
+
+
+def normalize_tech_stack(tech_stack, detected=None):
+    """Map any tech_stack shape we have ever produced onto the unified fields"""
+    ts = tech_stack if isinstance(tech_stack, dict) else {}
+    detected = detected or {}
+
+    languages = _as_list(ts.get('languages')) or _as_list(detected.get('languages'))
+    primary = ts.get('primary_language') or ts.get('language') or (languages[0] if languages else 'Unknown')
+    secondary = _as_list(ts.get('secondary_languages')) or [l for l in languages if str(l).lower() != str(primary).lower()]
+
+    frameworks = _as_list(ts.get('frameworks')) or _as_list(detected.get('frameworks'))
+
+    return {
+        'primary_language': primary,
+        'secondary_languages': secondary,
+        'backend_framework': ts.get('backend_framework') or ts.get('framework_backend') or 'none',
+        'frontend_framework': ts.get('frontend_framework') or ts.get('framework_frontend') or 'none',
+        'database_systems': (
+            _as_list(ts.get('database_systems')) or _as_list(ts.get('database'))
+            or _as_list(ts.get('databases')) or _as_list(detected.get('databases'))
+        ),
+        'testing_frameworks': _as_list(ts.get('testing_frameworks')) or _as_list(ts.get('testing')),
+        'build_tools': _as_list(ts.get('build_tools')) or _as_list(detected.get('tools')),
+        'key_libraries': _as_list(ts.get('key_libraries')) or frameworks,
+    }
+
+
+def normalize_repo_context(context, static=None):
+    """Return a repo context in the unified schema (accepts legacy cached shapes)"""
+    context = context if isinstance(context, dict) else {}
+    static = static or {}
+
+    modules = []
+    for m in context.get('key_modules') or []:
+        if isinstance(m, dict):
+            modules.append({
+                'module_name': m.get('module_name', 'Unknown'),
+                'description': m.get('description', ''),
+                'files': m.get('files') or m.get('relevant_files') or [],
+            })
+
+    integration = context.get('integration_points') or {}
+    api = context.get('api_structure') or {}
+
+    return {
+        'project_summary': context.get('project_summary', 'Unknown'),
+        'project_type': context.get('project_type', 'other'),
+        'architecture_overview': context.get('architecture_overview', 'Unknown'),
+        'tech_stack': normalize_tech_stack(context.get('tech_stack'), static.get('detected_stack')),
+        'key_modules': modules,
+        'api_structure': {
+            'has_api': api.get('has_api', bool(api.get('endpoints'))),
+            'api_type': api.get('api_type', 'none'),
+            'endpoints': api.get('endpoints') or [],
+            'authentication': api.get('authentication', 'Unknown'),
+        },
+        'development_patterns': context.get('development_patterns') or {},
+        'integration_points': {
+            'external_apis': integration.get('external_apis') or [],
+            'database_connections': integration.get('database_connections') or integration.get('databases') or [],
+            'third_party_services': integration.get('third_party_services') or integration.get('third_party') or [],
+        },
+        'deployment_info': context.get('deployment_info') or {},
+        'tree_sha': context.get('tree_sha') or static.get('tree_sha'),
+    }
+
+
+# ============== STATIC TIER ==============
+
+def _folder_structure(tree):
+    folders = {}
+    for path in tree:
+        parts = path.split('/')
+        if len(parts) < 2:
+            continue
+        folder = folders.setdefault(parts[0], {'count': 0, 'types': set(), 'key_files': []})
+        folder['count'] += 1
+        folder['types'].add(parts[-1].split('.')[-1] if '.' in parts[-1] else 'no_ext')
+        filename = parts[-1].lower()
+        if len(folder['key_files']) < 10 and any(key in filename for key in ['index', 'main', 'app', 'server', 'config', 'route', 'model']):
+            folder['key_files'].append(parts[-1])
+    # Lists rather than dicts keyed by name: folder/file names may contain '.', which Mongo keys cannot
+    return [{'folder': name, **info, 'types': list(info['types'])} for name, info in folders.items()]
+
+
+def build_static_tier(owner, repo, headers):
+    """Tree, README, manifests and code patterns - everything that needs GitHub but no LLM"""
+    repo_info, tree, readme = load_repo_snapshot(owner, repo, headers, readme_chars=5000)
+
+    dependencies, detected_stack = analyze_dependencies(tree, owner, repo, headers)
+    code_patterns = analyze_code_patterns(tree, owner, repo, headers)
+    config_files = [p for p in tree if any(c in p.lower() for c in CONFIG_FILE_PATTERNS)]
+
+    static = {
+        'tree_sha': tree.tree_sha,
+        'default_branch': tree.branch,
+        'total_files': len(tree),
+        'files_truncated': tree.truncated,
+        'sample_files': list(tree.paths(limit=SAMPLE_FILES)),
+        'folder_structure': _folder_structure(tree),
+        'readme': readme,
+        'dependencies': [{'file': name, 'content': content} for name, content in dependencies.items()],
+        'detected_stack': detected_stack,
+        'code_patterns': code_patterns,
+        'config_files': config_files[:50],
+        'repo_info': {
+            'description': repo_info.get('description'),
+            'stars': repo_info.get('stargazers_count', 0),
+            'language': repo_info.get('language', 'Unknown'),
+            'size': repo_info.get('size', 0),
+            'created_at': repo_info.get('created_at', ''),
+            'updated_at': repo_info.get('updated_at', '')
+        },
+        'built_at': time.time(),
+    }
+    logger.info(f"🧱 Static tier built for {owner}/{repo}: {len(tree)} files, {len(dependencies)} manifests")
+    _store_snapshot(f"{owner}/{repo}", tree)
+    return static
+
+
+# ============== SNAPSHOTS ==============
+
+def _get_snapshot_collection():
+    """Get repo snapshot collection (lazy initialization)"""
+    global _snapshot_collection
+    if _snapshot_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _snapshot_collection = db['repo_snapshots']
+        _snapshot_collection.create_index("repo_full_name", unique=True)
+    return _snapshot_collection
+
+
+def _remember_snapshot(repo_full_name, tree):
+    with _local_cache_lock:
+        _snapshots[repo_full_name] = tree
+        _snapshots.move_to_end(repo_full_name)
+        while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+            _snapshots.popitem(last=False)
+
+
+def _store_snapshot(repo_full_name, tree):
+    _remember_snapshot(repo_full_name, tree)
+    try:
+        collection = _get_snapshot_collection()
+        if collection is None:
+            return
+        data = tree.to_bytes()
+        if len(data) > SNAPSHOT_MAX_BYTES:
+            logger.warning(f"⚠️ Snapshot of {repo_full_name} is {len(data)} bytes - kept in memory only")
+            return
+        collection.update_one(
+            {"repo_full_name": repo_full_name},
+            {"$set": {
+                "tree_sha": tree.tree_sha,
+                "default_branch": tree.branch,
+                "truncated": tree.truncated,
+                "file_count": len(tree),
+                "files": data,
+                "updated_at": time.time()
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not persist snapshot of {repo_full_name}: {str(e)}")
+
+
+def get_repo_snapshot(owner, repo, tree_sha=None):
+    """
+    Full file listing (RepoTree) from the last static build - never calls GitHub
+
+    Returns None when no snapshot exists (or it is not for tree_sha, if given).
+    """
+    repo_full_name = f"{owner}/{repo}"
+    with _local_cache_lock:
+        tree = _snapshots.get(repo_full_name)
+        if tree is not None:
+            _snapshots.move_to_end(repo_full_name)
+    if tree is not None and (tree_sha is None or tree.tree_sha == tree_sha):
+        return tree
+
+    try:
+        collection = _get_snapshot_collection()
+        doc = collection.find_one({"repo_full_name": repo_full_name}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load snapshot of {repo_full_name}: {str(e)}")
+        doc = None
+    if not doc or (tree_sha and doc.get('tree_sha') != tree_sha):
+        return None
+
+    tree = RepoTree.from_bytes(
+        owner, repo, doc['files'],
+        branch=doc.get('default_branch'), tree_sha=doc.get('tree_sha'), truncated=doc.get('truncated', False)
+    )
+    _remember_snapshot(repo_full_name, tree)
+    return tree
+
+
+# ============== SUMMARY TIER ==============
+
+_STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+
+SUMMARY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'project_summary': {'type': 'string'},
+        'project_type': {'type': 'string'},
+        'architecture_overview': {'type': 'string'},
+        'tech_stack': {
+            'type': 'object',
+            'properties': {
+                'primary_language': {'type': 'string'},
+                'secondary_languages': _STRING_LIST,
+                'backend_framework': {'type': 'string'},
+                'frontend_framework': {'type': 'string'},
+                'database_systems': _STRING_LIST,
+                'testing_frameworks': _STRING_LIST,
+                'build_tools': _STRING_LIST,
+                'key_libraries': _STRING_LIST
+            }
+        },
+        'key_modules': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'module_name': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'files': _STRING_LIST
+                },
+                'required': ['module_name']
+            }
+        },
+        'api_structure': {
+            'type': 'object',
+            'properties': {
+                'has_api': {'type': 'boolean'},
+                'api_type': {'type': 'string'},
+                'endpoints': _STRING_LIST,
+                'authentication': {'type': 'string'}
+            }
+        },
+        'development_patterns': {
+            'type': 'object',
+            'properties': {
+                'code_organization': {'type': 'string'},
+                'naming_conventions': {'type': 'string'},
+                'design_patterns': _STRING_LIST
+            }
+        },
+        'integration_points': {
+            'type': 'object',
+            'properties': {
+                'external_apis': _STRING_LIST,
+                'database_connections': _STRING_LIST,
+                'third_party_services': _STRING_LIST
+            }
+        },
+        'deployment_info': {
+            'type': 'object',
+            'properties': {
+                'containerization': {'type': 'string'},
+                'build_process': {'type': 'string'},
+                'environment_setup': {'type': 'string'}
+            }
+        }
+    },
+    'required': ['project_summary', 'tech_stack']
+}
+
+def _summary_prompt(owner, repo, static):
+    detected = static.get('detected_stack', {})
+    file_list = "\n".join([f"- {f}" for f in static.get('sample_files', [])])
+    code_patterns = static.get('code_patterns', {})
+    patterns_text = "\n".join(
+        [f"{k}: {', '.join(v[:10])}" for k, v in code_patterns.items() if v]
+    ) or "None detected"
+
+    return f"""You are a senior software architect. Analyze this repository to provide comprehensive, accurate context for any programming language or framework.
+
+REPOSITORY: {owner}/{repo}
+DESCRIPTION: {static.get('repo_info', {}).get('description') or 'No description'}
+GITHUB LANGUAGE: {static.get('repo_info', {}).get('language') or 'Not specified'}
+TOTAL FILES: {static.get('total_files', 0)}
+
+FILE STRUCTURE (first {len(static.get('sample_files', []))} files):
+{file_list}
+
+DETECTED TECHNOLOGIES:
+Languages: {', '.join(detected.get('languages') or ['Unknown'])}
+Frameworks: {', '.join(detected.get('frameworks') or ['None detected'])}
+Databases: {', '.join(detected.get('databases') or ['None detected'])}
+Tools: {', '.join(detected.get('tools') or ['None detected'])}
+
+DEPENDENCY FILES ANALYZED: {', '.join([d['file'] for d in static.get('dependencies', [])]) or 'None'}
+
+CODE PATTERNS FOUND:
+{patterns_text}
+
+README CONTENT:
+{(static.get('readme') or '')[:2000]}
+
+CRITICAL ANALYSIS RULES:
+1. Base ALL conclusions on ACTUAL files present - no assumptions
+2. If multiple languages detected, identify the primary one and supporting ones
+3. Only mention frameworks/tools that are actually found in dependencies or code
+4. Determine real architecture from file organization, not guesswork
+5. List actual API endpoints found, or an empty list if no API patterns found
+6. For each key module, list its 3-5 most important file paths
+
+Respond with JSON:
+{{
+  "project_summary": "What this project actually does",
+  "project_type": "web_application|cli_tool|library|microservice|desktop_app|mobile_app|data_pipeline|other",
+  "architecture_overview": "Actual architecture pattern observed",
+  "tech_stack": {{
+    "primary_language": "...",
+    "secondary_languages": ["..."],
+    "backend_framework": "... or 'none'",
+    "frontend_framework": "... or 'none'",
+    "database_systems": ["..."],
+    "testing_frameworks": ["..."],
+    "build_tools": ["..."],
+    "key_libraries": ["..."]
+  }},
+  "key_modules": [
+    {{
+      "module_name": "...",
+      "description": "...",
+      "files": ["..."]
+    }}
+  ],
+  "api_structure": {{
+    "has_api": true,
+    "api_type": "REST|GraphQL|gRPC|WebSocket|none",
+    "endpoints": ["METHOD /path"],
+    "authentication": "Auth method detected or 'none'"
+  }},
+  "development_patterns": {{
+    "code_organization": "...",
+    "naming_conventions": "...",
+    "design_patterns": ["..."]
+  }},
+  "integration_points": {{
+    "external_apis": ["..."],
+    "database_connections": ["..."],
+    "third_party_services": ["..."]
+  }},
+  "deployment_info": {{
+    "containerization": "...",
+    "build_process": "...",
+    "environment_setup": "..."
+  }}
+}}"""
+
+
+def build_summary_tier(owner, repo, static):
+    """LLM summary of a static tier, normalized to the unified schema"""
+    logger.info(f"🚀 Calling Gemini for repo summary of {owner}/{repo}...")
+    result = generate_json('repo_summary', _summary_prompt(owner, repo, static), SUMMARY_SCHEMA, temperature=0.1)
+    summary = normalize_repo_context(result, static)
+    summary['tree_sha'] = static.get('tree_sha')
+    logger.info(f"✅ Repo summary built: {len(summary['key_modules'])} key modules")
+    return summary
+
+
+# ============== CACHE ==============
+
+def _load_tiers(repo_full_name):
+    with _local_cache_lock:
+        entry = _local_cache.get(repo_full_name)
+        if entry and time.time() - entry[0] < LOCAL_CACHE_SECONDS:
+            return dict(entry[1])
+
+    tiers = {}
+    cached = get_repo_context(repo_full_name)
+    if cached:
+        tiers = dict(cached.get('tiers') or {})
+        # Contexts cached before tiers existed only hold the summary
+        if SUMMARY not in tiers and isinstance(cached.get('context_text'), dict):
+            tiers[SUMMARY] = normalize_repo_context(cached['context_text'])
+    _remember(repo_full_name, tiers)
+    return tiers
+
+
+def _remember(repo_full_name, tiers):
+    with _local_cache_lock:
+        _local_cache[repo_full_name] = (time.time(), dict(tiers))
+
+
+def get_cached_tree_sha(owner, repo):
+    """Tree sha of the cached static tier, or None (never calls GitHub)"""
+    static = _load_tiers(f"{owner}/{repo}").get(STATIC) or {}
+    return static.get('tree_sha')
+
+
+def get_cached_repo_intelligence(owner, repo):
+    """Cached summary-tier context (same shape as get_repo_intelligence), or None - never calls GitHub or the LLM"""
+    tiers = _load_tiers(f"{owner}/{repo}")
+    if SUMMARY not in tiers:
+        return None
+    result = dict(tiers[SUMMARY])
+    result['raw_data'] = tiers.get(STATIC) or {}
+    return result
+
+
+def invalidate_repo_intelligence(repo_full_name):
+    """Drop the in-process copy (the Mongo copy is replaced on the next refresh)"""
+    with _local_cache_lock:
+        _local_cache.pop(repo_full_name, None)
+        _snapshots.pop(repo_full_name, None)
+
+
+def _stored_tiers(repo_full_name, ready):
+    """Tiers from Mongo (bypassing the local copy) if ready(tiers), else None"""
+    with _local_cache_lock:
+        _local_cache.pop(repo_full_name, None)
+    tiers = _load_tiers(repo_full_name)
+    return tiers if ready(tiers) else None
+
+
+def _build_static(owner, repo, github_token):
+    """Build and store the static tier; returns the repo's tiers (summary dropped if the tree changed)"""
+    repo_full_name = f"{owner}/{repo}"
+    tiers = _load_tiers(repo_full_name)
+    summary = tiers.get(SUMMARY)
+    headers = {'Authorization': f'token {github_token}'} if github_token else {}
+    static = build_static_tier(owner, repo, headers)
+    previous_sha = (summary or {}).get('tree_sha')
+    stale = [SUMMARY] if summary and previous_sha and previous_sha != static['tree_sha'] else None
+    if stale:
+        logger.info(f"🔄 {repo_full_name} changed ({previous_sha[:7]} -> {static['tree_sha'][:7]}), summary invalidated")
+    save_repo_context_tier(repo_full_name, STATIC, static, {
+        'tree_sha': static['tree_sha'],
+        'default_branch': static['default_branch'],
+    }, unset_tiers=stale)
+    tiers = {**tiers, STATIC: static}
+    if stale:
+        tiers.pop(SUMMARY, None)
+    _remember(repo_full_name, tiers)
+    return tiers
+
+
+def _build_summary(owner, repo, static):
+    """Build and store the summary tier for a static tier; returns the repo's tiers"""
+    repo_full_name = f"{owner}/{repo}"
+    summary = build_summary_tier(owner, repo, static)
+    save_repo_context_tier(repo_full_name, SUMMARY, summary, {
+        'tree_sha': summary.get('tree_sha'),
+        # Legacy fields kept for older readers of repo_contexts
+        'context_text': summary,
+        'language': summary['tech_stack']['primary_language'],
+    })
+    tiers = {**_load_tiers(repo_full_name), STATIC: static, SUMMARY: summary}
+    _remember(repo_full_name, tiers)
+    return tiers
+
+
+def get_repo_intelligence(owner, repo, github_token=None, tier=SUMMARY, refresh=False):
+    """
+    Get repository intelligence up to the requested tier
+
+    Args:
+        owner: Repository owner
+        repo: Repository name
+        github_token: GitHub token (optional for public repos)
+        tier: 'static' (no LLM) or 'summary' (static + LLM summary)
+        refresh: Rebuild the static tier even if cached
+
+    Returns:
+        dict: Unified repo context; the static tier is under 'raw_data'
+    """
+    if tier not in TIERS:
+        raise ValueError(f"Unknown repo intelligence tier: {tier}")
+
+    repo_full_name = f"{owner}/{repo}"
+    requested_at = time.time()
+    tiers = {} if refresh else _load_tiers(repo_full_name)
+    static = tiers.get(STATIC)
+    summary = tiers.get(SUMMARY)
+
+    if static is None and (tier == STATIC or summary is None):
+        # A refresh must not be satisfied by a static tier built before it was requested
+        min_built_at = requested_at if refresh else 0
+        tiers = _static_builds.do(
+            repo_full_name,
+            lambda: _build_static(owner, repo, github_token),
+            recheck=lambda: _stored_tiers(repo_full_name, lambda t: (t.get(STATIC) or {}).get('built_at', 0) >= min_built_at)
+        )
+        static = tiers.get(STATIC)
+        summary = tiers.get(SUMMARY)
+
+    if tier == STATIC:
+        result = normalize_repo_context(summary or {}, static) if summary else {
+            **normalize_repo_context({}, static),
+            'project_summary': static.get('repo_info', {}).get('description') or 'Unknown',
+        }
+        result['raw_data'] = static
+        return result
+
+    if summary is None:
+        tree_sha = static.get('tree_sha')
+        tiers = _summary_builds.do(
+            f"{repo_full_name}@{tree_sha}",
+            lambda: _build_summary(owner, repo, static),
+            recheck=lambda: _stored_tiers(repo_full_name, lambda t: (t.get(SUMMARY) or {}).get('tree_sha') == tree_sha)
+        )
+        summary = tiers[SUMMARY]
+
+    result = dict(summary)
+    result['raw_data'] = static or {}
+    return result
+
+
+# ============== PROMPT FORMATTING ==============
+
+def _join(values, default='None', limit=None):
+    values = _as_list(values)
+    if limit:
+        values = values[:limit]
+    return ', '.join(str(v) for v in values) if values else default
+
+
+def format_repo_context(context, detail='full'):
+    """Render a unified repo context for prompts ('brief' or 'full')"""
+    ts = context.get('tech_stack') or {}
+    raw = context.get('raw_data') or {}
+    modules = context.get('key_modules') or []
+    api = context.get('api_structure') or {}
+
+    if detail == 'brief':
+        text = f"- Summary: {context.get('project_summary', 'N/A')}\n"
+        text += f"- Architecture: {context.get('architecture_overview', 'N/A')}\n"
+        text += f"- Primary Language: {ts.get('primary_language', 'N/A')}\n"
+        text += f"- Backend Framework: {ts.get('backend_framework', 'N/A')}\n"
+        text += f"- Frontend Framework: {ts.get('frontend_framework', 'N/A')}\n"
+        text += f"- Database: {_join(ts.get('database_systems'))}\n"
+        text += f"- Total Files: {raw.get('total_files', 0)}\n"
+        if modules:
+            text += f"- Key Modules: {', '.join([m.get('module_name', 'Unknown') for m in modules[:3]])}\n"
+        if api.get('endpoints'):
+            text += f"- API Endpoints: {len(api['endpoints'])} found\n"
+        return text
+
+    patterns = context.get('development_patterns') or {}
+    integration = context.get('integration_points') or {}
+    deployment = context.get('deployment_info') or {}
+    code_patterns = raw.get('code_patterns') or {}
+    modules_text = "\n".join(
+        [f"- {m.get('module_name', 'Unknown')}: {m.get('description', 'No description')}" for m in modules[:5]]
+    ) or "- None identified"
+
+    return f"""Project Summary: {context.get('project_summary', 'Unknown')}
+Architecture: {context.get('architecture_overview', 'Unknown')}
+
+Tech Stack:
+- Language: {ts.get('primary_language', 'Unknown')}{f" (also {_join(ts.get('secondary_languages'))})" if ts.get('secondary_languages') else ''}
+- Frontend: {ts.get('frontend_framework', 'none')}
+- Backend: {ts.get('backend_framework', 'none')}
+- Database: {_join(ts.get('database_systems'), 'Unknown')}
+- Testing: {_join(ts.get('testing_frameworks'), 'Unknown')}
+- Key Libraries: {_join(ts.get('key_libraries'), limit=8)}
+
+Key Modules ({len(modules)}):
+{modules_text}
+
+API Structure:
+- Endpoints: {_join(api.get('endpoints'), limit=5)}
+- Auth: {api.get('authentication', 'Unknown')}
+
+Development Patterns:
+- Code Organization: {patterns.get('code_organization', 'Unknown')}
+- Naming Conventions: {patterns.get('naming_conventions', 'Unknown')}
+
+Integrations:
+- External APIs: {_join(integration.get('external_apis'), limit=3)}
+- Databases: {_join(integration.get('database_connections'))}
+- Third Party: {_join(integration.get('third_party_services'), limit=3)}
+
+Deployment:
+- Build Process: {deployment.get('build_process', 'Unknown')}
+- Environment: {deployment.get('environment_setup', 'Unknown')}
+
+Raw Data:
+- Total Files: {raw.get('total_files', 0)}
+- Top-level Folders: {len(raw.get('folder_structure', []))}
+- Dependency Files: {len(raw.get('dependencies', []))}
+- Code Patterns: API endpoints ({len(code_patterns.get('api_endpoints', []))}), Models ({len(code_patterns.get('database_models', []))}), Components ({len(code_patterns.get('components', []))})
+"""
+
+
+def format_repo_reference(context):
+    """Render the static tier's file listing, README and manifests - stable per tree, so it suits a cached prefix"""
+    raw = context.get('raw_data') or {}
+    parts = []
+    if raw.get('sample_files'):
+        listing = "\n".join(f"- {path}" for path in raw['sample_files'])
+        parts.append(f"FILES (first {len(raw['sample_files'])} of {raw.get('total_files', 0)}):\n{listing}\n")
+    if raw.get('readme'):
+        parts.append(f"README:\n{raw['readme']}\n")
+    for manifest in raw.get('dependencies') or []:
+        if manifest.get('content'):
+            parts.append(f"MANIFEST {manifest.get('file')}:\n{manifest['content']}\n")
+    return "\n".join(parts)
@@ -0,0 +1,176 @@
+"""
+Repository Tree Ingestion
+Default-branch aware, truncation-safe loading of GitHub repository trees
+"""
+import os
+import zlib
+import base64
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from app.services.github_rate_limiter import github_get, with_current_priority, GitHubRateLimited
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API = "https://api.github.com"
+# Hard ceiling on files kept in memory; hitting it is logged and flagged, never silent
+MAX_TREE_FILES = int(os.getenv('MAX_TREE_FILES', '250000'))
+
+
+class RepoTree:
+    """Compact in-memory file listing: directory paths are interned once, files reference them by index"""
+
+    __slots__ = ('owner', 'repo', 'branch', 'tree_sha', 'truncated', '_dirs', '_dir_index', '_files')
+
+    def __init__(self, owner, repo, branch=None, tree_sha=None):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.tree_sha = tree_sha
+        self.truncated = False  # True only if MAX_TREE_FILES was reached
+        self._dirs = ['']
+        self._dir_index = {'': 0}
+        self._files = []  # (dir index, file name, blob sha bytes, size)
+
+    def add(self, path, sha=None, size=0):
+        directory, _, name = path.rpartition('/')
+        idx = self._dir_index.get(directory)
+        if idx is None:
+            idx = len(self._dirs)
+            self._dirs.append(directory)
+            self._dir_index[directory] = idx
+        self._files.append((idx, name, bytes.fromhex(sha) if sha else b'', size or 0))
+
+    def __len__(self):
+        return len(self._files)
+
+    def __iter__(self):
+        return self.paths()
+
+    def _path(self, idx, name):
+        directory = self._dirs[idx]
+        return f"{directory}/{name}" if directory else name
+
+    def paths(self, limit=None):
+        """Yield file paths in ingestion order"""
+        for count, (idx, name, _, _) in enumerate(self._files):
+            if limit is not None and count >= limit:
+                return
+            yield self._path(idx, name)
+
+    def entries(self):
+        """Yield (path, blob sha, size) for every file"""
+        for idx, name, sha, size in self._files:
+            yield self._path(idx, name), sha.hex(), size
+
+    def directories(self):
+        return [d for d in self._dirs if d]
+
+    def to_bytes(self):
+        """Compressed "path<TAB>sha<TAB>size" lines, for storage"""
+        lines = (f"{path}\t{sha}\t{size}" for path, sha, size in self.entries())
+        return zlib.compress("\n".join(lines).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, owner, repo, data, branch=None, tree_sha=None, truncated=False):
+        tree = cls(owner, repo, branch=branch, tree_sha=tree_sha)
+        tree.truncated = truncated
+        text = zlib.decompress(data).decode('utf-8')
+        for line in text.split('\n') if text else []:
+            path, sha, size = line.split('\t')
+            tree.add(path, sha, int(size))
+        return tree
+
+
+def fetch_repo_metadata(owner, repo, headers):
+    """Get repo metadata (description, language, default_branch, ...)"""
+    resp = github_get(f"{GITHUB_API}/repos/{owner}/{repo}", headers=headers, timeout=10)
+    return resp.json() if resp.status_code == 200 else {}
+
+
+def fetch_readme(owner, repo, headers, max_chars=3000):
+    """Get the repository README via the dedicated endpoint (any filename/case)"""
+    try:
+        resp = github_get(f"{GITHUB_API}/repos/{owner}/{repo}/readme", headers=headers, timeout=10)
+        if resp.status_code == 200:
+            content = base64.b64decode(resp.json()['content']).decode('utf-8', errors='replace')
+            return content[:max_chars]
+    except GitHubRateLimited as e:
+        logger.warning(f"⚠️ Skipping README: {str(e)}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not fetch README: {str(e)}")
+    return ""
+
+
+def _get_tree(owner, repo, ref, headers, recursive):
+    url = f"{GITHUB_API}/repos/{owner}/{repo}/git/trees/{ref}"
+    if recursive:
+        url += "?recursive=1"
+    resp = github_get(url, headers=headers, timeout=30)
+    if resp.status_code != 200:
+        raise Exception(f"Tree fetch failed for {owner}/{repo}@{ref}: {resp.status_code}")
+    return resp.json()
+
+
+def iter_tree_entries(owner, repo, data, headers):
+    """
+    Yield blob entries (path, sha, size) for the whole tree, lazily
+
+    `data` is the recursive listing of the root tree. When GitHub returned it
+    complete it is used as-is. When GitHub set `truncated` (roughly >100k
+    entries), sub-trees are walked one at a time instead, again preferring a
+    recursive listing per sub-tree when it fits.
+    """
+    if not data.get('truncated'):
+        for item in data.get('tree', []):
+            if item.get('type') == 'blob':
+                yield item['path'], item.get('sha'), item.get('size', 0)
+        return
+
+    logger.info(f"🌲 Tree for {owner}/{repo} is truncated - walking sub-trees")
+    pending = deque([('', data['sha'], False)])
+    while pending:
+        prefix, sha, try_recursive = pending.popleft()
+        listing = _get_tree(owner, repo, sha, headers, recursive=try_recursive)
+        if try_recursive and listing.get('truncated'):
+            listing = _get_tree(owner, repo, sha, headers, recursive=False)
+            try_recursive = False
+        for item in listing.get('tree', []):
+            path = f"{prefix}{item['path']}"
+            if item.get('type') == 'blob':
+                yield path, item.get('sha'), item.get('size', 0)
+            elif item.get('type') == 'tree' and not try_recursive:
+                pending.append((f"{path}/", item['sha'], True))
+
+
+def load_repo_tree(owner, repo, headers, repo_info=None):
+    """Load the full file tree of the repo's default branch into a RepoTree"""
+    repo_info = repo_info if repo_info is not None else fetch_repo_metadata(owner, repo, headers)
+    branch = repo_info.get('default_branch') or 'main'
+
+    root = _get_tree(owner, repo, branch, headers, recursive=True)
+    tree = RepoTree(owner, repo, branch=branch, tree_sha=root.get('sha'))
+    for path, sha, size in iter_tree_entries(owner, repo, root, headers):
+        if len(tree) >= MAX_TREE_FILES:
+            tree.truncated = True
+            logger.warning(f"⚠️ {owner}/{repo} exceeds {MAX_TREE_FILES} files - listing capped (flagged as truncated)")
+            break
+        tree.add(path, sha, size)
+
+    logger.info(f"📂 Loaded {len(tree)} files from {owner}/{repo}@{branch}")
+    return tree
+
+
+def load_repo_snapshot(owner, repo, headers, repo_info=None, readme_chars=3000):
+    """
+    Fetch the README in parallel with repo metadata and the file tree
+
+    Returns:
+        tuple: (repo_info dict, RepoTree, readme text)
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        readme_future = pool.submit(with_current_priority(fetch_readme, owner, repo, headers, readme_chars))
+        repo_info = repo_info if repo_info is not None else fetch_repo_metadata(owner, repo, headers)
+        tree = load_repo_tree(owner, repo, headers, repo_info)
+        readme = readme_future.result()
+    return repo_info, tree, readme
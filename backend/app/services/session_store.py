@@ -0,0 +1,115 @@
+"""
+Session Store
+Bounded LRU/TTL in-process cache in front of a Mongo collection, so sessions are shared across workers
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(24 * 3600)))
+LOCAL_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '512'))
+# Another worker may update a session - keep the local copy short-lived
+LOCAL_CACHE_SECONDS = 300
+
+
+class SessionStore:
+    """
+    Key/value store for small session documents
+
+    Sessions should hold references (e.g. repo owner/name), not copies of large
+    cached data - resolve those from their own cache when the session is read.
+    """
+
+    def __init__(self, collection_name, ttl_seconds=SESSION_TTL_SECONDS, local_size=LOCAL_CACHE_SIZE):
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self.local_size = local_size
+        self._local = OrderedDict()  # session_id -> (cached_at, data)
+        self._lock = threading.Lock()
+        self._collection = None
+
+    def _get_collection(self):
+        """Get sessions collection (lazy initialization)"""
+        if self._collection is None:
+            from app.database.mongodb import db
+            if db is None:
+                return None
+            self._collection = db[self.collection_name]
+            self._collection.create_index("expires_at", expireAfterSeconds=0)
+        return self._collection
+
+    def _remember(self, session_id, data):
+        with self._lock:
+            self._local[session_id] = (time.time(), data)
+            self._local.move_to_end(session_id)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, session_id):
+        """Session data, or None if unknown or expired"""
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._local.get(session_id)
+            if entry and time.time() - entry[0] < LOCAL_CACHE_SECONDS:
+                self._local.move_to_end(session_id)
+                return entry[1]
+
+        try:
+            collection = self._get_collection()
+            doc = collection.find_one({"_id": session_id}) if collection is not None else None
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read session {session_id}: {str(e)[:100]}")
+            return entry[1] if entry else None
+        if not doc or doc.get('expires_at', datetime.utcnow()) < datetime.utcnow():
+            return None
+        data = doc.get('data') or {}
+        self._remember(session_id, data)
+        return data
+
+    def save(self, session_id, data):
+        """Create or replace a session and reset its TTL"""
+        self._remember(session_id, data)
+        try:
+            collection = self._get_collection()
+            if collection is not None:
+                collection.update_one(
+                    {"_id": session_id},
+                    {"$set": {
+                        "data": data,
+                        "updated_at": datetime.utcnow(),
+                        "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                    }},
+                    upsert=True
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not persist session {session_id}: {str(e)[:100]}")
+
+    def update(self, session_id, **fields):
+        """Merge fields into an existing (or new) session"""
+        data = dict(self.get(session_id) or {})
+        data.update(fields)
+        self.save(session_id, data)
+        return data
+
+    def delete(self, session_id):
+        with self._lock:
+            self._local.pop(session_id, None)
+        try:
+            collection = self._get_collection()
+            if collection is not None:
+                collection.delete_one({"_id": session_id})
+        except Exception as e:
+            logger.warning(f"⚠️ Could not delete session {session_id}: {str(e)[:100]}")
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+
+# Task analysis sessions: /analyze writes them, /generate_plan reads them (possibly on another worker)
+task_sessions = SessionStore('task_sessions')
@@ -0,0 +1,146 @@
+"""
+Single Flight
+One build per key at a time - concurrent callers in this process wait on it, other workers on a Mongo lease
+"""
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '180'))
+POLL_SECONDS = 0.5
+# Identifies this worker as a lease holder
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_leases_collection = None
+
+
+def _get_leases_collection():
+    """Get single-flight leases collection (lazy initialization)"""
+    global _leases_collection
+    if _leases_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _leases_collection = db['single_flight_leases']
+        # Leases of crashed workers disappear on their own
+        _leases_collection.create_index("expires_at", expireAfterSeconds=0)
+    return _leases_collection
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent builds of the same key
+
+    The first caller in a process runs the build while later callers wait for its
+    result. Across workers the build is guarded by a Mongo lease; a worker that
+    cannot take the lease polls `recheck` (usually a cache read) until the holder
+    has stored its result, and only builds itself if the lease lapses.
+    """
+
+    def __init__(self, name, lease_seconds=LEASE_SECONDS):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, recheck=None):
+        """
+        Run fn() once for key among concurrent callers and return its result
+
+        Args:
+            fn: Builds (and stores) the value
+            recheck: Returns the value if another worker has stored it, else None
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            observe('single_flight', 1, {'name': self.name, 'role': 'waiter'})
+            logger.info(f"⏳ Waiting for in-flight {self.name} build of {key}")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_leased(key, fn, recheck)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _run_leased(self, key, fn, recheck):
+        lease_id = f"{self.name}:{key}"
+        started = time.time()
+        while True:
+            acquired = self._acquire(lease_id)
+            if acquired is not False:
+                observe('single_flight', 1, {'name': self.name, 'role': 'builder'})
+                try:
+                    return fn()
+                finally:
+                    if acquired:
+                        self._release(lease_id)
+
+            if recheck is not None:
+                result = recheck()
+                if result is not None:
+                    observe('single_flight', 1, {'name': self.name, 'role': 'remote_waiter'})
+                    observe('single_flight_wait_seconds', time.time() - started, {'name': self.name})
+                    return result
+
+            if time.time() - started > self.lease_seconds:
+                logger.warning(f"⚠️ Gave up waiting for the {self.name} lease on {key} - building anyway")
+                return fn()
+            time.sleep(POLL_SECONDS)
+
+    def _acquire(self, lease_id):
+        """True if the lease was taken, False if another worker holds it, None without Mongo"""
+        try:
+            collection = _get_leases_collection()
+            if collection is None:
+                return None
+            from pymongo.errors import DuplicateKeyError
+            now = datetime.utcnow()
+            try:
+                # Matches a free, expired or own lease; otherwise the upsert collides with the holder's _id
+                collection.update_one(
+                    {'_id': lease_id, '$or': [{'expires_at': {'$lt': now}}, {'owner': OWNER_ID}]},
+                    {'$set': {'owner': OWNER_ID, 'expires_at': now + timedelta(seconds=self.lease_seconds)}},
+                    upsert=True
+                )
+                return True
+            except DuplicateKeyError:
+                return False
+        except Exception as e:
+            logger.warning(f"⚠️ Could not take lease {lease_id}: {str(e)}")
+            return None
+
+    def _release(self, lease_id):
+        try:
+            collection = _get_leases_collection()
+            if collection is not None:
+                collection.delete_one({'_id': lease_id, 'owner': OWNER_ID})
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release lease {lease_id}: {str(e)}")
@@ -0,0 +1,176 @@
+"""
+Slack Directory
+Workspace member list (users.list) cached per team, shared across workers through Mongo
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+import requests
+from datetime import datetime, timedelta
+from app.services.single_flight import SingleFlight
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_TTL_SECONDS = int(os.getenv('SLACK_DIRECTORY_TTL_SECONDS', '900'))
+PAGE_SIZE = 200
+
+_directories = {}  # key -> (members, fetched_at)
+_names = {}  # (directory key, user id) -> (name, fetched_at), users.info lookups
+_lock = threading.Lock()
+_builds = SingleFlight('slack_directory', lease_seconds=60)
+_directories_collection = None
+
+
+def _get_directories_collection():
+    """Get Slack directories collection (lazy initialization)"""
+    global _directories_collection
+    if _directories_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _directories_collection = db['slack_directories']
+        _directories_collection.create_index("expires_at", expireAfterSeconds=0)
+    return _directories_collection
+
+
+def directory_key(slack_token, team_id=None):
+    """Cache key of a workspace - the team id, or a token hash when it is unknown"""
+    return team_id or f"token:{hashlib.sha256(slack_token.encode()).hexdigest()[:16]}"
+
+
+def _member_entry(member):
+    """The fields callers match on - the full profile is not worth caching"""
+    profile = member.get('profile', {})
+    return {
+        'id': member['id'],
+        'name': member.get('name', ''),
+        'real_name': member.get('real_name', ''),
+        'is_bot': member.get('is_bot', False),
+        'deleted': member.get('deleted', False),
+        'profile': {
+            'display_name': profile.get('display_name', ''),
+            'email': profile.get('email'),
+            'image_48': profile.get('image_48')
+        }
+    }
+
+
+def _fetch_members(slack_token):
+    """All workspace members via paginated users.list; None if Slack refuses"""
+    members, cursor = [], None
+    headers = {"Authorization": f"Bearer {slack_token}"}
+    while True:
+        params = {'limit': PAGE_SIZE, **({'cursor': cursor} if cursor else {})}
+        data = requests.get("https://slack.com/api/users.list", headers=headers, params=params, timeout=10).json()
+        if not data.get('ok'):
+            logger.error(f"❌ Slack users.list failed: {data.get('error')}")
+            return None
+        members.extend(_member_entry(m) for m in data.get('members', []))
+        cursor = data.get('response_metadata', {}).get('next_cursor')
+        if not cursor:
+            return members
+
+
+def _load_stored(key):
+    try:
+        collection = _get_directories_collection()
+        doc = collection.find_one({'_id': key}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read Slack directory {key}: {str(e)}")
+        return None
+    if not doc or doc['expires_at'] <= datetime.utcnow():
+        return None
+    with _lock:
+        _directories[key] = (doc['members'], time.time())
+    return doc['members']
+
+
+def _build(key, slack_token):
+    started = time.time()
+    members = _fetch_members(slack_token)
+    if members is None:
+        return None
+    with _lock:
+        _directories[key] = (members, time.time())
+    try:
+        collection = _get_directories_collection()
+        if collection is not None:
+            collection.update_one(
+                {'_id': key},
+                {'$set': {'members': members, 'expires_at': datetime.utcnow() + timedelta(seconds=DIRECTORY_TTL_SECONDS)}},
+                upsert=True
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not store Slack directory {key}: {str(e)}")
+    logger.info(f"💾 Slack directory {key}: {len(members)} members ({time.time() - started:.2f}s)")
+    return members
+
+
+def get_slack_directory(slack_token, team_id=None, refresh=False):
+    """
+    Members of the token's workspace (users.list), cached
+
+    Args:
+        slack_token: Bot or user token
+        team_id: Workspace id - shares the cache between users of one workspace
+        refresh: Ignore cached copies
+
+    Returns:
+        list: Member dicts (id, name, real_name, is_bot, deleted, profile), or None on a Slack error
+    """
+    key = directory_key(slack_token, team_id)
+    if not refresh:
+        with _lock:
+            cached = _directories.get(key)
+        if cached and time.time() - cached[1] < DIRECTORY_TTL_SECONDS:
+            observe('slack_directory', 1, {'result': 'hit'})
+            return cached[0]
+        stored = _load_stored(key)
+        if stored is not None:
+            observe('slack_directory', 1, {'result': 'hit'})
+            return stored
+
+    observe('slack_directory', 1, {'result': 'miss'})
+    return _builds.do(key, lambda: _build(key, slack_token), recheck=None if refresh else lambda: _load_stored(key))
+
+
+def directory_for_user(token_info, refresh=False):
+    """Directory for a slack_tokens document"""
+    slack_token = token_info.get("bot_token") or token_info.get("access_token")
+    return get_slack_directory(slack_token, token_info.get("team_id"), refresh=refresh)
+
+
+def user_names(slack_token, user_ids, team_id=None):
+    """
+    Display names for Slack user ids, from the cached directory
+
+    Users missing from it (e.g. from shared channels) are looked up with users.info once per TTL.
+
+    Returns:
+        dict: user id -> real name ("Unknown" if Slack does not know the user)
+    """
+    key = directory_key(slack_token, team_id)
+    members = get_slack_directory(slack_token, team_id) or []
+    by_id = {m['id']: m.get('real_name') or m.get('name') or 'Unknown' for m in members}
+    names, now = {}, time.time()
+    for user_id in dict.fromkeys(u for u in user_ids if u):
+        if user_id in by_id:
+            names[user_id] = by_id[user_id]
+            continue
+        cached = _names.get((key, user_id))
+        if cached and now - cached[1] < DIRECTORY_TTL_SECONDS:
+            names[user_id] = cached[0]
+            continue
+        try:
+            data = requests.get("https://slack.com/api/users.info", headers={"Authorization": f"Bearer {slack_token}"},
+                                params={"user": user_id}, timeout=5).json()
+            name = data.get("user", {}).get("real_name", "Unknown") if data.get("ok") else "Unknown"
+        except Exception as e:
+            logger.warning(f"⚠️ users.info failed for {user_id}: {str(e)}")
+            name = "Unknown"
+        _names[(key, user_id)] = (name, now)
+        names[user_id] = name
+    return names
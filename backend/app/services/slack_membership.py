@@ -0,0 +1,181 @@
+"""
+Slack Bot Identity and Channel Membership
+auth.test memoized per token and the bot's channel membership per (team, channel), so replies skip those round-trips
+"""
+import os
+import time
+import logging
+import threading
+import requests
+from datetime import datetime, timedelta
+from app.services.slack_directory import directory_key
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# A token's bot user only changes on reinstall, which issues a new token
+IDENTITY_TTL_SECONDS = int(os.getenv('SLACK_IDENTITY_TTL_SECONDS', str(6 * 3600)))
+# Membership is invalidated by not_in_channel and member_left_channel; the TTL only bounds missed events
+MEMBERSHIP_TTL_SECONDS = int(os.getenv('SLACK_MEMBERSHIP_TTL_SECONDS', str(24 * 3600)))
+# conversations.join errors for channels the bot can only be invited to - no point asking again
+UNJOINABLE_ERRORS = {'method_not_supported_for_channel_type', 'is_archived', 'channel_not_found'}
+JOIN_TIMEOUT_SECONDS = 15
+
+_identities = {}  # token key -> (auth.test response, fetched_at)
+_memberships = {}  # (team, channel) -> (state, expires_at)
+_lock = threading.Lock()
+_memberships_collection = None
+
+
+def _get_memberships_collection():
+    """Get Slack channel memberships collection (lazy initialization)"""
+    global _memberships_collection
+    if _memberships_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _memberships_collection = db['slack_channel_memberships']
+        _memberships_collection.create_index("expires_at", expireAfterSeconds=0)
+    return _memberships_collection
+
+
+def bot_identity(slack_token):
+    """
+    auth.test for a token, memoized
+
+    Returns:
+        dict: {user_id, team_id, bot_id}, or None if Slack rejected the token
+    """
+    key = directory_key(slack_token)
+    with _lock:
+        cached = _identities.get(key)
+    if cached and time.time() - cached[1] < IDENTITY_TTL_SECONDS:
+        observe('slack_identity_cache', 1, {'result': 'hit'})
+        return cached[0]
+
+    observe('slack_identity_cache', 1, {'result': 'miss'})
+    try:
+        data = requests.get("https://slack.com/api/auth.test",
+                            headers={"Authorization": f"Bearer {slack_token}"}, timeout=5).json()
+    except Exception as e:
+        logger.warning(f"⚠️ Slack auth.test failed: {str(e)}")
+        return None
+    if not data.get("ok"):
+        logger.warning(f"⚠️ Slack auth.test rejected the token: {data.get('error')}")
+        return None
+    identity = {'user_id': data.get('user_id'), 'team_id': data.get('team_id'), 'bot_id': data.get('bot_id')}
+    with _lock:
+        _identities[key] = (identity, time.time())
+    return identity
+
+
+def bot_user_id(slack_token):
+    """The bot's Slack user id for a token (None if the token is rejected)"""
+    identity = bot_identity(slack_token)
+    return identity.get('user_id') if identity else None
+
+
+def team_for(slack_token, team_id=None):
+    """Workspace of a call - team_id when the caller has it, else the token's team from auth.test"""
+    identity = None if team_id else bot_identity(slack_token)
+    return team_id or (identity and identity.get('team_id')) or directory_key(slack_token)
+
+
+def _membership(team, channel):
+    """'member', 'unjoinable' or None when unknown (memory first, then Mongo)"""
+    with _lock:
+        cached = _memberships.get((team, channel))
+    if cached and cached[1] > time.time():
+        return cached[0]
+    collection = _get_memberships_collection()
+    doc = collection.find_one({'_id': f"{team}:{channel}"}) if collection is not None else None
+    if not doc or doc['expires_at'] <= datetime.utcnow():
+        return None
+    with _lock:
+        _memberships[(team, channel)] = (doc['state'], time.time() + (doc['expires_at'] - datetime.utcnow()).total_seconds())
+    return doc['state']
+
+
+def _remember(team, channel, state):
+    with _lock:
+        _memberships[(team, channel)] = (state, time.time() + MEMBERSHIP_TTL_SECONDS)
+    try:
+        collection = _get_memberships_collection()
+        if collection is not None:
+            collection.update_one(
+                {'_id': f"{team}:{channel}"},
+                {'$set': {'state': state, 'team_id': team, 'channel': channel,
+                          'expires_at': datetime.utcnow() + timedelta(seconds=MEMBERSHIP_TTL_SECONDS)}},
+                upsert=True
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save membership of {channel}: {str(e)}")
+
+
+def forget_membership(channel, slack_token=None, team_id=None):
+    """Drop what is known about the bot's membership of a channel (it left, or a post said not_in_channel)"""
+    team = team_id or team_for(slack_token)
+    with _lock:
+        _memberships.pop((team, channel), None)
+    try:
+        collection = _get_memberships_collection()
+        if collection is not None:
+            collection.delete_one({'_id': f"{team}:{channel}"})
+    except Exception as e:
+        logger.warning(f"⚠️ Could not forget membership of {channel}: {str(e)}")
+    observe('slack_membership_invalidated', 1)
+    logger.info(f"🚪 Forgot bot membership of {channel} in {team}")
+
+
+def ensure_joined(slack_token, channel, team_id=None):
+    """
+    Join a channel unless the bot is already known to be in it
+
+    Returns:
+        bool: True if the bot is (now) a member; False when it could not join (posting may still work
+            in channels it was invited to)
+    """
+    team = team_for(slack_token, team_id)
+    state = _membership(team, channel)
+    if state:
+        observe('slack_membership_cache', 1, {'result': 'hit'})
+        return state == 'member'
+
+    observe('slack_membership_cache', 1, {'result': 'miss'})
+    from app.services.slack_outbound import call
+    try:
+        data = call(slack_token, 'conversations.join', {'channel': channel}, team_id).result(timeout=JOIN_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"⚠️ Error joining channel {channel}: {str(e)}")
+        return False
+    if data.get("ok"):
+        logger.info(f"✅ Joined channel: {channel}")
+        _remember(team, channel, 'member')
+        return True
+    logger.warning(f"⚠️ Could not join channel {channel}: {data.get('error')}")
+    if data.get("error") in UNJOINABLE_ERRORS:
+        _remember(team, channel, 'unjoinable')
+    return False
+
+
+def apply_membership_event(team_id, event):
+    """Keep membership current from member_joined_channel / member_left_channel / channel_left events"""
+    event_type = event.get('type')
+    channel = event.get('channel')
+    if not team_id or not channel:
+        return
+    if event_type == 'channel_left':
+        # Only ever sent about the bot itself
+        forget_membership(channel, team_id=team_id)
+        return
+    from app.database.mongodb import db
+    token_info = db['slack_tokens'].find_one({"team_id": team_id}) if db is not None else None
+    if not token_info:
+        return
+    slack_token = token_info.get("bot_token") or token_info.get("access_token")
+    if event.get('user') != bot_user_id(slack_token):
+        return
+    if event_type == 'member_left_channel':
+        forget_membership(channel, team_id=team_id)
+    elif event_type == 'member_joined_channel':
+        _remember(team_id, channel, 'member')
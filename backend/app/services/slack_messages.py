@@ -0,0 +1,229 @@
+"""
+Slack Message Store
+Channel messages ingested into Mongo (cursor-paged history plus Events API upserts) and read locally, per workspace
+"""
+import os
+import time
+import logging
+import requests
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from app.services.single_flight import SingleFlight
+from app.services.slack_directory import directory_key
+from app.services.slack_membership import team_for
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# A channel seen for the first time is backfilled with this many of its latest messages
+BACKFILL_MESSAGES = int(os.getenv('SLACK_BACKFILL_MESSAGES', '500'))
+# Reads older than this since the last sync catch up first; events keep the store current in between
+SYNC_INTERVAL_SECONDS = int(os.getenv('SLACK_SYNC_INTERVAL_SECONDS', '60'))
+PAGE_SIZE = 200
+# Pages per sync call - a longer catch-up resumes from the saved cursor on the next one
+MAX_PAGES_PER_SYNC = 10
+
+_syncs = SingleFlight('slack_sync', lease_seconds=60)
+_messages_collection = None
+_sync_collection = None
+
+
+def _get_messages_collection():
+    """Get Slack messages collection (lazy initialization)"""
+    global _messages_collection
+    if _messages_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _messages_collection = db['slack_messages']
+        # A channel id is only meaningful within its workspace - every lookup is scoped by team
+        _drop_index(_messages_collection, 'channel_1_ts_1')
+        _drop_index(_messages_collection, 'channel_1_ts_-1')
+        _messages_collection.create_index([("team_id", ASCENDING), ("channel", ASCENDING), ("ts", ASCENDING)], unique=True)
+        _messages_collection.create_index([("team_id", ASCENDING), ("channel", ASCENDING), ("ts", DESCENDING)])
+    return _messages_collection
+
+
+def _drop_index(collection, name):
+    """Remove an index from before the store was scoped by workspace"""
+    try:
+        collection.drop_index(name)
+    except Exception:
+        pass
+
+
+def _get_sync_collection():
+    """Get per-(team, channel) ingestion state collection (lazy initialization)"""
+    global _sync_collection
+    if _sync_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _sync_collection = db['slack_sync_state']
+    return _sync_collection
+
+
+def _document(channel, message, team_id=None):
+    return {
+        'channel': channel,
+        'ts': message['ts'],
+        'team_id': team_id,
+        'user': message.get('user'),
+        'bot_id': message.get('bot_id'),
+        'subtype': message.get('subtype'),
+        'text': message.get('text', ''),
+        'thread_ts': message.get('thread_ts'),
+        'stored_at': datetime.utcnow()
+    }
+
+
+def _store(channel, messages, team_id=None):
+    collection = _get_messages_collection()
+    if collection is None or not messages:
+        return
+    collection.bulk_write([
+        UpdateOne({'team_id': team_id, 'channel': channel, 'ts': m['ts']}, {'$set': _document(channel, m, team_id)}, upsert=True)
+        for m in messages if m.get('ts')
+    ], ordered=False)
+
+
+def _sync(slack_token, channel, team_id):
+    """
+    Page conversations.history into the store
+
+    The first sync backfills the latest BACKFILL_MESSAGES; later ones fetch oldest=<latest ts>.
+    The cursor of an unfinished catch-up is saved, and the watermark only moves once every page
+    is stored, so an interrupted sync resumes where it stopped without leaving a gap. A token
+    whose sync succeeded is recorded as having access to the channel.
+    """
+    sync_collection = _get_sync_collection()
+    sync_id = f"{team_id}:{channel}"
+    state = sync_collection.find_one({'_id': sync_id}) or {}
+    oldest = state.get('pending_oldest', state.get('latest_ts'))
+    cursor = state.get('cursor')
+    headers = {"Authorization": f"Bearer {slack_token}"}
+    stored, pages, newest = 0, 0, state.get('pending_newest')
+
+    while pages < MAX_PAGES_PER_SYNC:
+        params = {"channel": channel, "limit": PAGE_SIZE}
+        if oldest:
+            params["oldest"] = oldest
+        if cursor:
+            params["cursor"] = cursor
+        data = requests.get("https://slack.com/api/conversations.history", headers=headers, params=params, timeout=10).json()
+        if not data.get("ok"):
+            raise Exception(f"Slack conversations.history failed: {data.get('error')}")
+        messages = data.get("messages", [])
+        _store(channel, messages, team_id)
+        stored += len(messages)
+        pages += 1
+        if messages and (newest is None or float(messages[0]['ts']) > float(newest)):
+            newest = messages[0]['ts']
+        cursor = data.get("response_metadata", {}).get("next_cursor")
+        if not data.get("has_more") or not cursor or (not oldest and stored >= BACKFILL_MESSAGES):
+            cursor = None
+            break
+    if not oldest:
+        # A backfill never resumes - history older than what it got is not needed
+        cursor = None
+
+    update = {'synced_at': time.time(), 'team_id': team_id}
+    if cursor:
+        # Resume this catch-up next time; until then the old watermark stays in place
+        update.update({'cursor': cursor, 'pending_oldest': oldest, 'pending_newest': newest})
+    else:
+        update['latest_ts'] = max((t for t in (state.get('latest_ts'), newest) if t), key=float, default=None)
+    sync_collection.update_one(
+        {'_id': sync_id},
+        {'$set': update, '$addToSet': {'tokens': directory_key(slack_token)},
+         **({} if cursor else {'$unset': {'cursor': '', 'pending_oldest': '', 'pending_newest': ''}})},
+        upsert=True
+    )
+    observe('slack_sync_messages', stored, {'mode': 'catch_up' if state else 'backfill'})
+    logger.info(f"📥 Synced {stored} message(s) from {channel} in {pages} page(s){' (more pending)' if cursor else ''}")
+    return stored
+
+
+def sync_channel(slack_token, channel, team_id=None, force=False):
+    """
+    Bring the stored messages of a channel up to date unless it was synced recently
+
+    A token that has not synced the channel before always calls Slack itself, so it only
+    reads what conversations.history would have shown it (a failed sync raises).
+
+    Returns:
+        int: Messages fetched from Slack (0 when the store was fresh)
+    """
+    sync_collection = _get_sync_collection()
+    if sync_collection is None:
+        return 0
+    team_id = team_for(slack_token, team_id)
+    sync_id = f"{team_id}:{channel}"
+    token_key = directory_key(slack_token)
+    state = sync_collection.find_one({'_id': sync_id}) or {}
+    if token_key not in state.get('tokens', []):
+        observe('slack_sync', 1, {'result': 'first_read'})
+        return _syncs.do(f"{sync_id}:{token_key}", lambda: _sync(slack_token, channel, team_id))
+    if not force and not state.get('cursor') and time.time() - state.get('synced_at', 0) < SYNC_INTERVAL_SECONDS:
+        observe('slack_sync', 1, {'result': 'fresh'})
+        return 0
+    observe('slack_sync', 1, {'result': 'sync'})
+    return _syncs.do(sync_id, lambda: _sync(slack_token, channel, team_id))
+
+
+def read_messages(slack_token, channel, team_id=None, limit=100, oldest=None):
+    """
+    Messages of a channel in the caller's workspace from the local store
+
+    Without oldest: the latest `limit` messages, newest first (like conversations.history).
+    With oldest: the first `limit` messages after it, oldest first - so a caller reading forward
+    from a watermark never skips messages when more than `limit` arrived.
+
+    Args:
+        oldest: Only messages with a ts after this one
+
+    Returns:
+        list: Slack-shaped message dicts (ts, user, bot_id, subtype, text, thread_ts)
+    """
+    team_id = team_for(slack_token, team_id)
+    sync_channel(slack_token, channel, team_id)
+    collection = _get_messages_collection()
+    if collection is None:
+        return []
+    query = {'team_id': team_id, 'channel': channel, **({'ts': {'$gt': oldest}} if oldest else {})}
+    order = ASCENDING if oldest else DESCENDING
+    return list(collection.find(query, {'_id': 0, 'stored_at': 0}).sort('ts', order).limit(int(limit)))
+
+
+def latest_ts(slack_token, channel, team_id=None):
+    """ts of the newest stored message of a channel in the caller's workspace (after syncing if due), or None"""
+    team_id = team_for(slack_token, team_id)
+    sync_channel(slack_token, channel, team_id)
+    collection = _get_messages_collection()
+    if collection is None:
+        return None
+    doc = collection.find_one({'team_id': team_id, 'channel': channel}, {'ts': 1}, sort=[('ts', DESCENDING)])
+    return doc['ts'] if doc else None
+
+
+def ingest_event(team_id, event):
+    """Apply an Events API message event (new, edited or deleted message) to the store"""
+    collection = _get_messages_collection()
+    channel = event.get('channel')
+    if collection is None or not channel:
+        return
+    subtype = event.get('subtype')
+    try:
+        if subtype == 'message_changed':
+            message = event.get('message', {})
+            if message.get('ts'):
+                collection.update_one({'team_id': team_id, 'channel': channel, 'ts': message['ts']},
+                                      {'$set': {'text': message.get('text', ''), 'edited': True}})
+        elif subtype == 'message_deleted':
+            collection.delete_one({'team_id': team_id, 'channel': channel, 'ts': event.get('deleted_ts')})
+        elif event.get('ts'):
+            collection.update_one({'team_id': team_id, 'channel': channel, 'ts': event['ts']},
+                                  {'$set': _document(channel, event, team_id)}, upsert=True)
+        observe('slack_events_ingested', 1, {'subtype': subtype or 'message'})
+    except Exception as e:
+        logger.warning(f"⚠️ Could not store message event in {channel}: {str(e)}")
@@ -0,0 +1,241 @@
+"""
+Slack Outbound Queue
+Every Slack write goes through per-workspace, per-method token buckets (Slack's rate tiers), honours Retry-After and coalesces bursts
+"""
+import os
+import time
+import logging
+import threading
+import requests
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.services.slack_directory import directory_key
+from app.utils.admission import TokenBucket
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+# Slack's documented rate tiers, in requests per minute per workspace and method
+TIERS = {1: 1, 2: 20, 3: 50, 4: 100}
+METHOD_TIERS = {
+    'chat.postMessage': 4,
+    'chat.update': 3,
+    'conversations.open': 3,
+    'conversations.join': 3,
+}
+DEFAULT_TIER = 3
+# chat.postMessage is also limited to about one message per second per channel, with short bursts
+CHANNEL_METHODS = {'chat.postMessage', 'chat.update'}
+CHANNEL_RATE_PER_SECOND = 1
+CHANNEL_BURST = 3
+
+# 429s a call is retried on (after the Retry-After) before its response is handed back as is
+MAX_RATE_LIMIT_RETRIES = 5
+DEFAULT_RETRY_AFTER = 30
+# How long a request handler waits on a queued call before giving up on it
+RESULT_TIMEOUT_SECONDS = 60
+# Lanes (per workspace, method and channel) with nothing queued are dropped after this long
+LANE_IDLE_SECONDS = 60
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SLACK_OUTBOUND_WORKERS', '4')), thread_name_prefix='slack-outbound')
+_cond = threading.Condition()
+_lanes = {}           # (workspace, method, channel) -> _Lane
+_method_buckets = {}  # (workspace, method) -> TokenBucket
+_blocked_until = {}   # (workspace, method) -> epoch seconds, from Retry-After
+_coalesced = {}       # (workspace, method, channel, coalesce_key) -> queued _Job
+_workspaces = {}      # token key -> team id, learned from the callers that pass it
+_dispatcher = None
+
+
+class _Job:
+    def __init__(self, slack_token, method, payload, coalesce_key):
+        self.slack_token = slack_token
+        self.method = method
+        self.payload = payload
+        self.coalesce_key = coalesce_key
+        self.future = Future()
+        self.attempts = 0
+        self.queued_at = time.time()
+
+
+class _Lane:
+    """Calls of one method to one channel (or workspace-wide) - sent in order, one at a time"""
+    def __init__(self, workspace, method, channel):
+        self.workspace = workspace
+        self.method = method
+        self.channel = channel
+        self.jobs = deque()
+        self.busy = False
+        self.used = time.time()
+        self.bucket = TokenBucket(CHANNEL_RATE_PER_SECOND, CHANNEL_BURST) if channel else None
+
+
+def _method_bucket(key):
+    bucket = _method_buckets.get(key)
+    if bucket is None:
+        per_minute = TIERS[METHOD_TIERS.get(key[1], DEFAULT_TIER)]
+        bucket = _method_buckets[key] = TokenBucket(per_minute / 60, max(1, per_minute // 5))
+    return bucket
+
+
+def _workspace(slack_token, team_id):
+    """Bucket owner of a call - the team, even for callers that only have its token (caller holds _cond)"""
+    token_key = directory_key(slack_token)
+    if team_id:
+        _workspaces[token_key] = team_id
+    return _workspaces.get(token_key, token_key)
+
+
+def _start_ready_jobs():
+    """Hand every lane whose buckets allow it its next call (caller holds _cond); returns seconds until the next one"""
+    now = time.time()
+    next_wait = None
+    for key, lane in list(_lanes.items()):
+        if lane.busy:
+            continue
+        if not lane.jobs:
+            if now - lane.used > LANE_IDLE_SECONDS:
+                del _lanes[key]
+            continue
+        method_key = (lane.workspace, lane.method)
+        bucket = _method_bucket(method_key)
+        wait = max(_blocked_until.get(method_key, 0) - now, bucket.wait_time(now),
+                   lane.bucket.wait_time(now) if lane.bucket else 0)
+        if wait > 0:
+            next_wait = wait if next_wait is None else min(next_wait, wait)
+            continue
+        bucket.take()
+        if lane.bucket:
+            lane.bucket.take()
+        job = lane.jobs.popleft()
+        if job.coalesce_key:
+            _coalesced.pop(key + (job.coalesce_key,), None)
+        lane.busy = True
+        lane.used = now
+        _executor.submit(_send, key, lane, job)
+    return next_wait
+
+
+def _dispatch():
+    while True:
+        with _cond:
+            _cond.wait(_start_ready_jobs())
+
+
+def _start_dispatcher():
+    global _dispatcher
+    with _cond:
+        if _dispatcher is None:
+            _dispatcher = threading.Thread(target=_dispatch, daemon=True, name='slack-outbound')
+            _dispatcher.start()
+
+
+def _send(key, lane, job):
+    retry_after = None
+    # A retried call already owns its future; a first attempt skips calls cancelled while queued
+    if job.attempts or job.future.set_running_or_notify_cancel():
+        observe('slack_outbound_wait_seconds', time.time() - job.queued_at, {'method': job.method})
+        try:
+            response = requests.post(
+                f"https://slack.com/api/{job.method}",
+                headers={"Authorization": f"Bearer {job.slack_token}", "Content-Type": "application/json"},
+                json=job.payload,
+                timeout=10
+            )
+            if response.status_code == 429 and job.attempts < MAX_RATE_LIMIT_RETRIES:
+                retry_after = float(response.headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+            else:
+                data = response.json()
+                if job.method in CHANNEL_METHODS and data.get('error') == 'not_in_channel':
+                    # The bot was removed without us hearing about it; the next post joins again
+                    from app.services.slack_membership import forget_membership
+                    forget_membership(job.payload.get('channel'), job.slack_token)
+                job.future.set_result(data)
+        except Exception as e:
+            job.future.set_exception(e)
+
+    with _cond:
+        lane.busy = False
+        if retry_after is not None:
+            # The limit is per workspace and method, so every lane of the method waits it out
+            job.attempts += 1
+            method_key = (lane.workspace, lane.method)
+            _blocked_until[method_key] = max(_blocked_until.get(method_key, 0), time.time() + retry_after)
+            lane.jobs.appendleft(job)
+            if job.coalesce_key:
+                _coalesced.setdefault(key + (job.coalesce_key,), job)
+            observe('slack_outbound_rate_limited', 1, {'method': lane.method})
+            logger.warning(f"⏳ Slack {lane.method} rate limited for {lane.workspace}, retrying in {retry_after:.0f}s")
+        _cond.notify()
+
+
+def call(slack_token, method, payload, team_id=None, coalesce_key=None):
+    """
+    Queue a Slack Web API call
+
+    Args:
+        coalesce_key: Calls with the same key to the same method and channel that are still queued
+            collapse into one - the newest payload is sent and every caller gets its response
+
+    Returns:
+        Future: Resolves to Slack's JSON response (raises on network errors)
+    """
+    with _cond:
+        key = (_workspace(slack_token, team_id), method, payload.get('channel') if method in CHANNEL_METHODS else None)
+        if coalesce_key:
+            pending = _coalesced.get(key + (coalesce_key,))
+            if pending is not None:
+                pending.payload = payload
+                observe('slack_outbound_coalesced', 1, {'method': method})
+                return pending.future
+        job = _Job(slack_token, method, payload, coalesce_key)
+        lane = _lanes.get(key)
+        if lane is None:
+            lane = _lanes[key] = _Lane(*key)
+        lane.jobs.append(job)
+        if coalesce_key:
+            _coalesced[key + (coalesce_key,)] = job
+        observe('slack_outbound_queued', 1, {'method': method})
+        _cond.notify()
+    _start_dispatcher()
+    return job.future
+
+
+def post_message(slack_token, channel, text, team_id=None, coalesce_key=None, **fields):
+    """Queue a chat.postMessage (extra fields such as thread_ts, mrkdwn or parse are passed through)"""
+    return call(slack_token, 'chat.postMessage', {'channel': channel, 'text': text, **fields}, team_id, coalesce_key)
+
+
+def _chain(source, target):
+    """Resolve target with the outcome of source"""
+    def _copy(done):
+        if done.exception() is not None:
+            target.set_exception(done.exception())
+        else:
+            target.set_result(done.result())
+    source.add_done_callback(_copy)
+
+
+def send_dm(slack_token, slack_user_id, text, team_id=None, **fields):
+    """
+    Open the DM channel with a user and post to it
+
+    Returns:
+        Future: Resolves to the chat.postMessage response (or the failed conversations.open one)
+    """
+    result = Future()
+
+    def _post(opened):
+        try:
+            data = opened.result()
+            dm_channel = data.get('channel', {}).get('id')
+            if not data.get('ok') or not dm_channel:
+                result.set_result(data if not data.get('ok') else {'ok': False, 'error': 'no_dm_channel'})
+                return
+            _chain(post_message(slack_token, dm_channel, text, team_id, **fields), result)
+        except Exception as e:
+            result.set_exception(e)
+
+    call(slack_token, 'conversations.open', {'users': slack_user_id}, team_id,
+         coalesce_key=f"im:{slack_user_id}").add_done_callback(_post)
+    return result
@@ -0,0 +1,329 @@
+"""
+Slack Channel Summarization
+Map-reduce over token-budgeted message chunks (cached by content hash) and rolling per-channel summaries
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.services.context_builder import estimate_tokens
+from app.services.llm import generate_json
+from app.services.single_flight import SingleFlight
+from app.services.slack_directory import user_names, directory_key
+from app.services.slack_messages import read_messages
+from app.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+SLACK_SUMMARY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'key_updates': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {'user': {'type': 'string'}, 'update': {'type': 'string'}},
+                'required': ['user', 'update']
+            }
+        },
+        'active_users': {'type': 'array', 'items': {'type': 'string'}},
+        'blockers': {'type': 'array', 'items': {'type': 'string'}},
+        'progress_indicators': {'type': 'array', 'items': {'type': 'string'}},
+        'overall_status': {'type': 'string'},
+        'sentiment': {'type': 'string', 'enum': ['positive', 'neutral', 'negative']},
+        'action_items': {'type': 'array', 'items': {'type': 'string'}}
+    },
+    'required': ['key_updates', 'overall_status']
+}
+
+# Conversation tokens per map call
+CHUNK_TOKEN_BUDGET = int(os.getenv('SLACK_SUMMARY_CHUNK_TOKENS', '3000'))
+# Partial-summary tokens per reduce call - more partials than this are merged in several rounds
+REDUCE_TOKEN_BUDGET = int(os.getenv('SLACK_SUMMARY_REDUCE_TOKENS', '6000'))
+# Besides the budget, a chunk also ends after a message whose hash hits this modulus (once it is
+# half full), so boundaries depend on content and survive messages dropping off the window's start
+BOUNDARY_MODULUS = 8
+CACHE_TTL_SECONDS = int(os.getenv('SLACK_SUMMARY_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+MAX_CACHED = 512
+# A channel summarized for the first time starts from its most recent messages
+INITIAL_MESSAGES = int(os.getenv('SLACK_SUMMARY_INITIAL_MESSAGES', '200'))
+# New messages folded in per refresh - the oldest ones after the watermark, so a longer backlog
+# is caught up over several refreshes without skipping any
+MAX_NEW_MESSAGES = 1000
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SLACK_SUMMARY_WORKERS', '6')), thread_name_prefix='slack-summary')
+_cache = OrderedDict()  # key -> summary
+_lock = threading.Lock()
+_summaries_collection = None
+_channel_summaries_collection = None
+_channel_refreshes = SingleFlight('channel_summary', lease_seconds=120)
+
+
+def _get_summaries_collection():
+    """Get Slack summary chunk cache collection (lazy initialization)"""
+    global _summaries_collection
+    if _summaries_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _summaries_collection = db['slack_summary_chunks']
+        _summaries_collection.create_index("expires_at", expireAfterSeconds=0)
+    return _summaries_collection
+
+
+def _cached(key):
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    try:
+        collection = _get_summaries_collection()
+        doc = collection.find_one({'_id': key}) if collection is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read Slack summary cache: {str(e)}")
+        return None
+    if doc:
+        _remember(key, doc['summary'], persist=False)
+        return doc['summary']
+    return None
+
+
+def _remember(key, summary, persist=True):
+    with _lock:
+        _cache[key] = summary
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    if not persist:
+        return
+    try:
+        collection = _get_summaries_collection()
+        if collection is not None:
+            collection.update_one(
+                {'_id': key},
+                {'$set': {'summary': summary, 'expires_at': datetime.utcnow() + timedelta(seconds=CACHE_TTL_SECONDS)}},
+                upsert=True
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not store Slack summary {key}: {str(e)}")
+
+
+def _message_line(msg):
+    return f"{msg.get('user', 'Unknown')}: {msg.get('text', '')}"
+
+
+def _chronological(messages):
+    """Oldest first (Slack returns newest first), so new messages only ever touch the last chunk"""
+    try:
+        return sorted(messages, key=lambda m: float(m.get('timestamp') or m.get('ts')))
+    except (TypeError, ValueError):
+        return list(messages)
+
+
+def chunk_messages(messages, budget=CHUNK_TOKEN_BUDGET):
+    """
+    Split a conversation into chunks of at most ~budget tokens
+
+    Returns:
+        list: (key, text) per chunk, oldest first; key hashes the chunk's messages
+    """
+    chunks, lines, tokens, digest = [], [], 0, hashlib.sha1()
+
+    def close():
+        chunks.append((f"map:{digest.hexdigest()}", '\n'.join(lines)))
+
+    for msg in _chronological(messages):
+        line = _message_line(msg)
+        line_tokens = estimate_tokens(line) + 1
+        if lines and tokens + line_tokens > budget:
+            close()
+            lines, tokens, digest = [], 0, hashlib.sha1()
+        identity = f"{msg.get('timestamp') or msg.get('ts') or ''}|{line}".encode()
+        lines.append(line)
+        tokens += line_tokens
+        digest.update(identity + b'\n')
+        if tokens >= budget // 2 and int(hashlib.sha1(identity).hexdigest(), 16) % BOUNDARY_MODULUS == 0:
+            close()
+            lines, tokens, digest = [], 0, hashlib.sha1()
+    if lines:
+        close()
+    return chunks
+
+
+def _summarize_chunk(text):
+    prompt = f"""Analyze the following Slack channel conversation and provide a concise summary.
+
+SLACK MESSAGES:
+{text}
+
+Generate a JSON response with this structure:
+{{
+  "key_updates": [
+    {{"user": "User Name", "update": "Brief description of what they said/did"}},
+    ...
+  ],
+  "active_users": ["List of users who participated"],
+  "blockers": ["Any blockers or issues mentioned"],
+  "progress_indicators": ["Any progress updates or completed tasks"],
+  "overall_status": "A one-sentence summary of the channel activity",
+  "sentiment": "positive/neutral/negative",
+  "action_items": ["Any action items or next steps mentioned"]
+}}
+
+Keep updates brief (max 15 words each)."""
+    return generate_json('slack_summary', prompt, SLACK_SUMMARY_SCHEMA, temperature=0.3, top_k=40, top_p=0.95)
+
+
+def _merge_summaries(partials):
+    parts = '\n\n'.join(f"PART {i} (earlier parts first):\n{json.dumps(p, ensure_ascii=False)}"
+                        for i, p in enumerate(partials, 1))
+    prompt = f"""The following are summaries of consecutive parts of one Slack channel conversation.
+Merge them into a single summary of the whole conversation.
+
+{parts}
+
+Generate a JSON response with the same structure as the parts:
+- key_updates: the most important updates across all parts (max 15 words each, drop duplicates)
+- active_users: every participant, once
+- blockers and action_items: still open ones, without duplicates; drop those a later part resolves
+- progress_indicators: completed work across all parts
+- overall_status: one sentence for the whole conversation, weighted towards the latest part
+- sentiment: positive/neutral/negative for the conversation as a whole"""
+    return generate_json('slack_summary_reduce', prompt, SLACK_SUMMARY_SCHEMA, temperature=0.2)
+
+
+def _run(keyed_jobs, fn):
+    """Run fn(payload) for every (key, payload) that is not cached, in parallel; results in order"""
+    results = {key: _cached(key) for key, _ in keyed_jobs}
+    missing = [(key, payload) for key, payload in keyed_jobs if results[key] is None]
+    observe('slack_summary_chunks', len(keyed_jobs) - len(missing), {'result': 'hit'})
+    observe('slack_summary_chunks', len(missing), {'result': 'miss'})
+    futures = {key: _executor.submit(fn, payload) for key, payload in missing}
+    for key, future in futures.items():
+        results[key] = future.result()
+        _remember(key, results[key])
+    return [results[key] for key, _ in keyed_jobs]
+
+
+def _reduce_groups(keys, partials):
+    """Consecutive groups of partials that fit the reduce budget (at least two per group)"""
+    groups, current, tokens = [], [], 0
+    for key, partial in zip(keys, partials):
+        size = estimate_tokens(json.dumps(partial, ensure_ascii=False))
+        if len(current) >= 2 and tokens + size > REDUCE_TOKEN_BUDGET:
+            groups.append(current)
+            current, tokens = [], 0
+        current.append((key, partial))
+        tokens += size
+    if len(current) == 1 and groups:
+        groups[-1].append(current[0])
+    elif current:
+        groups.append(current)
+    return groups
+
+
+def summarize_messages(messages):
+    """
+    Summarize a Slack conversation of any length
+
+    Chunks are summarized in parallel (map) and the partial summaries merged (reduce), in
+    several rounds when there are many. Every map and merge result is cached by the hash of
+    its input, so re-summarizing a channel only calls the model for chunks that changed.
+
+    Args:
+        messages: List of message objects with 'user', 'text', 'timestamp'
+
+    Returns:
+        dict: Summary matching SLACK_SUMMARY_SCHEMA
+    """
+    started = time.time()
+    chunks = chunk_messages(messages)
+    if not chunks:
+        return None
+    keys = [key for key, _ in chunks]
+    partials = _run(chunks, _summarize_chunk)
+    rounds = 0
+    while len(partials) > 1:
+        groups = _reduce_groups(keys, partials)
+        jobs = [(f"reduce:{hashlib.sha1('|'.join(k for k, _ in group).encode()).hexdigest()}",
+                 [p for _, p in group]) for group in groups]
+        keys = [key for key, _ in jobs]
+        partials = _run(jobs, _merge_summaries)
+        rounds += 1
+    observe('slack_summary_seconds', time.time() - started)
+    logger.info(f"✨ Summarized {len(messages)} messages in {len(chunks)} chunk(s), "
+                f"{rounds} merge round(s) ({time.time() - started:.2f}s)")
+    return partials[0]
+
+
+def _get_channel_summaries_collection():
+    """Get per-channel rolling summaries collection (lazy initialization)"""
+    global _channel_summaries_collection
+    if _channel_summaries_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _channel_summaries_collection = db['slack_channel_summaries']
+    return _channel_summaries_collection
+
+
+def _fetch_history(slack_token, channel, team_id=None, oldest=None):
+    """Messages after the watermark (or the channel's latest INITIAL_MESSAGES), oldest first"""
+    wanted = MAX_NEW_MESSAGES if oldest else INITIAL_MESSAGES
+    messages = read_messages(slack_token, channel, team_id, limit=wanted, oldest=oldest)
+    if oldest and len(messages) >= wanted:
+        logger.warning(f"⚠️ Channel {channel}: more than {wanted} new messages, the rest are folded in on the next refresh")
+    return sorted(messages, key=lambda m: float(m["ts"]))
+
+
+def refresh_channel_summary(slack_token, channel, team_id=None):
+    """
+    Rolling summary of a channel, updated with the messages since its watermark
+
+    Only messages newer than the last summarized ts are read (from the local message store),
+    summarized and folded into the stored summary; with nothing new the stored summary is
+    returned without calling the model.
+
+    Returns:
+        dict: {'summary', 'last_ts', 'new_messages', 'message_count', 'updated_at'}
+    """
+    key = f"{directory_key(slack_token, team_id)}:{channel}"
+    return _channel_refreshes.do(key, lambda: _refresh(key, slack_token, channel, team_id))
+
+
+def _refresh(key, slack_token, channel, team_id):
+    collection = _get_channel_summaries_collection()
+    doc = (collection.find_one({'_id': key}) if collection is not None else None) or {}
+    started = time.time()
+
+    messages = _fetch_history(slack_token, channel, team_id, doc.get('last_ts'))
+    if not messages:
+        observe('channel_summary', 1, {'result': 'unchanged'})
+        return {**{k: doc.get(k) for k in ('summary', 'last_ts', 'message_count', 'updated_at')}, 'new_messages': 0}
+
+    names = user_names(slack_token, [m.get("user") for m in messages], team_id)
+    enriched = [{
+        "text": m.get("text", ""),
+        "user": names.get(m.get("user"), "Bot"),
+        "timestamp": m["ts"]
+    } for m in messages]
+    fresh = summarize_messages(enriched)
+    summary = _merge_summaries([doc['summary'], fresh]) if doc.get('summary') else fresh
+
+    state = {
+        'summary': summary,
+        'last_ts': messages[-1]['ts'],
+        'message_count': doc.get('message_count', 0) + len(messages),
+        'updated_at': datetime.utcnow()
+    }
+    if collection is not None:
+        collection.update_one({'_id': key}, {'$set': {**state, 'channel': channel}}, upsert=True)
+    observe('channel_summary', 1, {'result': 'updated'})
+    logger.info(f"✨ Channel {channel}: folded {len(messages)} new message(s) into the summary "
+                f"({time.time() - started:.2f}s)")
+    return {**state, 'new_messages': len(messages)}
@@ -0,0 +1,246 @@
+"""
+Repository Symbol Index
+Per-repo index of routes, classes, functions and components, rebuilt incrementally per blob SHA
+"""
+import re
+import time
+import base64
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ASCENDING, UpdateOne, DeleteMany
+from app.services.github_rate_limiter import github_get, github_priority, with_current_priority, GitHubRateLimited, BACKGROUND
+from app.services.github_service import scan_file_symbols, CODE_EXTENSIONS
+from app.services.repo_intelligence import get_repo_intelligence, get_repo_snapshot, STATIC
+from app.database.mongodb import get_repo_context, save_repo_context_tier
+
+logger = logging.getLogger(__name__)
+
+SYMBOLS = 'symbols'  # repo_contexts tier holding the index state
+MAX_FILES_PER_BUILD = 2000    # the rest is picked up by the next (incremental) build
+MAX_BLOB_BYTES = 200 * 1024   # generated/minified files are not worth scanning
+FETCH_WORKERS = 8
+
+# Words that carry no signal when a free-text question is used as the query
+QUERY_STOPWORDS = {
+    'the', 'and', 'for', 'how', 'what', 'where', 'why', 'does', 'is', 'in', 'of', 'to', 'it',
+    'do', 'we', 'our', 'my', 'can', 'you', 'this', 'that', 'with', 'file', 'code', 'function', 'class'
+}
+
+_symbols_collection = None
+_building = set()
+_building_lock = threading.Lock()
+
+
+def _get_symbols_collection():
+    """Get repo symbols collection (lazy initialization)"""
+    global _symbols_collection
+    if _symbols_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _symbols_collection = db['repo_symbols']
+        _symbols_collection.create_index([("repo_full_name", ASCENDING), ("path", ASCENDING)], unique=True)
+        _symbols_collection.create_index([("repo_full_name", ASCENDING), ("names", ASCENDING)])
+        _symbols_collection.create_index([("repo_full_name", ASCENDING), ("tokens", ASCENDING)])
+    return _symbols_collection
+
+
+def tokenize(text):
+    """Split identifiers and paths into lowercase tokens (camelCase, snake_case, /paths, dots)"""
+    return [t.lower() for t in re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', text or '') if len(t) > 1]
+
+
+def _file_document(repo_full_name, path, blob_sha, symbols):
+    names = {s['name'].lower() for s in symbols}
+    tokens = set(tokenize(path))
+    for s in symbols:
+        tokens.update(tokenize(s['name']))
+    return {
+        "repo_full_name": repo_full_name,
+        "path": path,
+        "blob_sha": blob_sha,
+        "symbols": symbols,
+        "names": sorted(names),
+        "tokens": sorted(tokens),
+        "indexed_at": time.time()
+    }
+
+
+def _fetch_blob(owner, repo, sha, headers):
+    resp = github_get(f"https://api.github.com/repos/{owner}/{repo}/git/blobs/{sha}", headers=headers, timeout=15)
+    if resp.status_code != 200:
+        return None
+    return base64.b64decode(resp.json().get('content', '')).decode('utf-8', errors='replace')
+
+
+def get_index_state(owner, repo):
+    """Index state ({'tree_sha', 'files', 'pending', 'built_at'}) or None if never built"""
+    cached = get_repo_context(f"{owner}/{repo}")
+    return ((cached or {}).get('tiers') or {}).get(SYMBOLS)
+
+
+def build_symbol_index(owner, repo, github_token=None):
+    """
+    Bring the symbol index of a repo up to date with its current snapshot
+
+    Only files whose blob SHA changed since the last build are fetched and scanned.
+
+    Returns:
+        dict: Index state
+    """
+    repo_full_name = f"{owner}/{repo}"
+    collection = _get_symbols_collection()
+    if collection is None:
+        raise Exception("Database not available")
+
+    static = get_repo_intelligence(owner, repo, github_token, tier=STATIC)['raw_data']
+    tree = get_repo_snapshot(owner, repo, static.get('tree_sha'))
+    if tree is None:
+        # Snapshot was evicted or too large to persist - rebuild the static tier to get it back
+        static = get_repo_intelligence(owner, repo, github_token, tier=STATIC, refresh=True)['raw_data']
+        tree = get_repo_snapshot(owner, repo)
+
+    current = {
+        path: (sha, size) for path, sha, size in tree.entries()
+        if sha and size <= MAX_BLOB_BYTES and any(path.endswith(ext) for ext in CODE_EXTENSIONS)
+    }
+    indexed = {
+        doc['path']: doc['blob_sha']
+        for doc in collection.find({"repo_full_name": repo_full_name}, {"path": 1, "blob_sha": 1})
+    }
+
+    changed = [path for path, (sha, _) in current.items() if indexed.get(path) != sha]
+    removed = [path for path in indexed if path not in current]
+    batch = changed[:MAX_FILES_PER_BUILD]
+    logger.info(f"🗂️ Symbol index {repo_full_name}: {len(batch)}/{len(changed)} changed, {len(removed)} removed, {len(current) - len(changed)} unchanged")
+
+    headers = {'Authorization': f'token {github_token}'} if github_token else {}
+    operations = [DeleteMany({"repo_full_name": repo_full_name, "path": {"$in": removed}})] if removed else []
+    fetched = 0
+    with github_priority(BACKGROUND), ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {
+            path: pool.submit(with_current_priority(_fetch_blob, owner, repo, current[path][0], headers))
+            for path in batch
+        }
+        for path, future in futures.items():
+            try:
+                content = future.result()
+            except GitHubRateLimited as e:
+                logger.warning(f"⚠️ Symbol index paused: {str(e)}")
+                break
+            except Exception as e:
+                logger.warning(f"⚠️ Could not fetch {path}: {str(e)}")
+                continue
+            # Unreadable blobs are recorded without symbols so they are not retried every build
+            symbols = scan_file_symbols(path, content) if content is not None else []
+            doc = _file_document(repo_full_name, path, current[path][0], symbols)
+            operations.append(UpdateOne({"repo_full_name": repo_full_name, "path": path}, {"$set": doc}, upsert=True))
+            fetched += 1
+        for future in futures.values():
+            future.cancel()
+
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+    state = {
+        'tree_sha': tree.tree_sha,
+        'files': len(current),
+        'pending': len(changed) - fetched,
+        'built_at': time.time()
+    }
+    save_repo_context_tier(repo_full_name, SYMBOLS, state)
+    logger.info(f"✅ Symbol index {repo_full_name}: {fetched} files scanned, {state['pending']} pending")
+    return state
+
+
+def ensure_symbol_index(owner, repo, github_token=None, wait=False):
+    """
+    Start a background (re)build unless the index is current or already building
+
+    Args:
+        wait: Build in the calling thread (for callers that already run in the background)
+    """
+    repo_full_name = f"{owner}/{repo}"
+    state = get_index_state(owner, repo)
+    snapshot = get_repo_snapshot(owner, repo)
+    if state and not state.get('pending') and (snapshot is None or snapshot.tree_sha == state.get('tree_sha')):
+        return state
+
+    with _building_lock:
+        if repo_full_name in _building:
+            return state
+        _building.add(repo_full_name)
+
+    def run():
+        try:
+            build_symbol_index(owner, repo, github_token)
+        except Exception as e:
+            logger.error(f"❌ Symbol index build failed for {repo_full_name}: {str(e)}")
+        finally:
+            with _building_lock:
+                _building.discard(repo_full_name)
+
+    if wait:
+        run()
+        return get_index_state(owner, repo)
+    threading.Thread(target=run, daemon=True).start()
+    return state
+
+
+def is_index_complete(owner, repo, tree_sha=None):
+    """True when every code file of the repo (at tree_sha, if given) is indexed"""
+    state = get_index_state(owner, repo)
+    return bool(state) and not state.get('pending') and (tree_sha is None or state.get('tree_sha') == tree_sha)
+
+
+def find_symbols(owner, repo, query, limit=20):
+    """
+    Look up symbols by name prefix or token
+
+    Args:
+        query: Identifier, prefix, route fragment or free text (tokenized)
+
+    Returns:
+        list: {'file', 'name', 'kind', 'label'} dicts, best matches first
+    """
+    collection = _get_symbols_collection()
+    terms = [t for t in dict.fromkeys(tokenize(query)) if t not in QUERY_STOPWORDS]
+    if collection is None or not terms:
+        return []
+
+    repo_full_name = f"{owner}/{repo}"
+    prefix = query.strip().lower()
+    clauses = [{"tokens": {"$in": terms}}]
+    if prefix and ' ' not in prefix:
+        clauses.append({"names": {"$regex": f"^{re.escape(prefix)}"}})
+
+    docs = collection.find(
+        {"repo_full_name": repo_full_name, "$or": clauses},
+        {"path": 1, "symbols": 1, "tokens": 1}
+    ).limit(limit * 5)
+
+    scored = []
+    for doc in docs:
+        path_tokens = set(tokenize(doc['path']))
+        for symbol in doc.get('symbols', []):
+            name_tokens = set(tokenize(symbol['name']))
+            score = len(name_tokens.intersection(terms)) * 2 + len(path_tokens.intersection(terms))
+            if prefix and symbol['name'].lower().startswith(prefix):
+                score += 3
+            if score:
+                scored.append((score, {'file': doc['path'], **symbol}))
+
+    scored.sort(key=lambda item: -item[0])
+    return [item for _, item in scored[:limit]]
+
+
+def find_files(owner, repo, query, limit=5):
+    """Files whose symbols or path match the query, best first"""
+    files = []
+    for symbol in find_symbols(owner, repo, query, limit=limit * 4):
+        if symbol['file'] not in files:
+            files.append(symbol['file'])
+            if len(files) >= limit:
+                break
+    return files
@@ -0,0 +1,304 @@
+"""
+Admission Control
+Per-user / per-workspace token buckets and concurrency limits (plus a global cap) for expensive endpoints
+"""
+import os
+import json
+import math
+import time
+import logging
+import threading
+import functools
+import jwt
+from flask import request, jsonify, Response
+from app.utils.metrics import observe, get_histogram
+
+logger = logging.getLogger(__name__)
+
+JWT_SECRET = os.getenv('FLASK_SECRET', 'change_this_secret')
+
+# Requests admitted at once across all endpoints in this process
+GLOBAL_MAX_CONCURRENT = int(os.getenv('ADMISSION_GLOBAL_CONCURRENCY', '16'))
+
+# rate: requests per minute, burst: bucket size, concurrent: in-flight requests per key.
+# Workspace limits apply to everyone sharing a Slack workspace.
+DEFAULT_LIMITS = {
+    'analyze': {'rate': 10, 'burst': 5, 'concurrent': 2, 'workspace_rate': 50, 'workspace_concurrent': 8},
+    'generate_plan': {'rate': 6, 'burst': 3, 'concurrent': 2, 'workspace_rate': 30, 'workspace_concurrent': 8},
+    'ask_feeta': {'rate': 10, 'burst': 5, 'concurrent': 2, 'workspace_rate': 50, 'workspace_concurrent': 8},
+    'resolve_issue': {'rate': 6, 'burst': 3, 'concurrent': 1, 'workspace_rate': 30, 'workspace_concurrent': 6},
+    'check_mentions': {'rate': 30, 'burst': 10, 'concurrent': 1, 'workspace_rate': 120, 'workspace_concurrent': 6},
+    'analyze_resume': {'rate': 5, 'burst': 3, 'concurrent': 1, 'workspace_rate': 20, 'workspace_concurrent': 4},
+}
+
+# Buckets are flushed to Mongo this often so a restart does not hand everyone a full bucket
+FLUSH_SECONDS = 10
+# Retry-After for concurrency rejections when the endpoint has no latency history yet
+DEFAULT_RETRY_AFTER = 5
+WORKSPACE_CACHE_SECONDS = 600
+
+
+def _load_limits():
+    limits = {name: dict(settings) for name, settings in DEFAULT_LIMITS.items()}
+    raw = os.getenv('ADMISSION_LIMITS')
+    if raw:
+        try:
+            for name, settings in json.loads(raw).items():
+                limits[name] = {**limits.get(name, DEFAULT_LIMITS['analyze']), **settings}
+        except ValueError:
+            logger.error("❌ Ignoring invalid ADMISSION_LIMITS: not JSON")
+    return limits
+
+
+LIMITS = _load_limits()
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, burst, tokens=None, updated=None):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = burst if tokens is None else min(burst, tokens)
+        self.updated = updated or time.time()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now=None):
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now or time.time())
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+_lock = threading.Lock()
+_buckets = {}        # key -> TokenBucket
+_dirty = set()
+_in_flight = {}      # key -> count
+_global_in_flight = 0
+_workspaces = {}     # user_id -> (team_id, cached_at)
+_buckets_collection = None
+_flusher = None
+
+
+def _get_buckets_collection():
+    """Get admission buckets collection (lazy initialization)"""
+    global _buckets_collection
+    if _buckets_collection is None:
+        from app.database.mongodb import db
+        if db is None:
+            return None
+        _buckets_collection = db['admission_buckets']
+        # Idle buckets are full again long before this, so they can simply expire
+        _buckets_collection.create_index("expires_at", expireAfterSeconds=0)
+    return _buckets_collection
+
+
+def _bucket(key, rate_per_second, burst):
+    """Bucket for key - restored from Mongo the first time this process sees it"""
+    with _lock:
+        bucket = _buckets.get(key)
+    if bucket is None:
+        saved = None
+        try:
+            collection = _get_buckets_collection()
+            if collection is not None:
+                saved = collection.find_one({'_id': key})
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load admission bucket {key}: {str(e)}")
+        with _lock:
+            bucket = _buckets.setdefault(key, TokenBucket(
+                rate_per_second, burst, saved.get('tokens') if saved else None, saved.get('updated') if saved else None))
+    bucket.rate, bucket.burst = rate_per_second, burst
+    return bucket
+
+
+def _flush():
+    """Write changed buckets to Mongo; forget buckets that are full again"""
+    from datetime import datetime, timedelta
+    from pymongo import UpdateOne
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        now = time.time()
+        with _lock:
+            pending = [
+                UpdateOne({'_id': key}, {'$set': {
+                    'tokens': _buckets[key].tokens,
+                    'updated': _buckets[key].updated,
+                    'expires_at': datetime.utcnow() + timedelta(seconds=_buckets[key].burst / _buckets[key].rate)
+                }}, upsert=True)
+                for key in _dirty if key in _buckets
+            ]
+            _dirty.clear()
+            for key in [k for k, bucket in _buckets.items() if bucket.wait_time(now) == 0 and bucket.tokens >= bucket.burst]:
+                del _buckets[key]
+        if not pending:
+            continue
+        try:
+            collection = _get_buckets_collection()
+            if collection is not None:
+                collection.bulk_write(pending, ordered=False)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not persist {len(pending)} admission bucket(s): {str(e)}")
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush, daemon=True, name='admission-flush')
+        _flusher.start()
+
+
+def _request_user():
+    """User id from the bearer token, or the client address when there is none"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header:
+        try:
+            payload = jwt.decode(auth_header.replace('Bearer ', ''), JWT_SECRET, algorithms=["HS256"])
+            user_id = payload.get('user_id') or payload.get('sub')
+            if user_id:
+                return str(user_id)
+        except jwt.InvalidTokenError:
+            pass
+    return f"ip:{request.headers.get('X-Forwarded-For', request.remote_addr or 'unknown').split(',')[0].strip()}"
+
+
+def workspace_for(user_id):
+    """Slack workspace (team id) of a user, cached; None if not connected"""
+    if user_id.startswith('ip:'):
+        return None
+    now = time.time()
+    cached = _workspaces.get(user_id)
+    if cached and now - cached[1] < WORKSPACE_CACHE_SECONDS:
+        return cached[0]
+    team_id = None
+    try:
+        from app.database.mongodb import db
+        if db is not None:
+            token_info = db['slack_tokens'].find_one({'user_id': user_id}, {'team_id': 1})
+            team_id = token_info.get('team_id') if token_info else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not resolve workspace for {user_id}: {str(e)}")
+    _workspaces[user_id] = (team_id, now)
+    return team_id
+
+
+def _concurrency_retry_after(endpoint):
+    histogram = get_histogram('admission_hold_seconds', {'endpoint': endpoint})
+    p50 = histogram.percentile(0.5) if histogram else None
+    return max(1, math.ceil(p50)) if p50 else DEFAULT_RETRY_AFTER
+
+
+def try_acquire(endpoint, user_id, workspace=None):
+    """
+    Admit one request, or say how long to wait
+
+    Returns:
+        tuple: (admitted, retry_after_seconds, reason)
+    """
+    global _global_in_flight
+    limits = LIMITS[endpoint]
+    user_key = f"{endpoint}:user:{user_id}"
+    workspace_key = f"{endpoint}:workspace:{workspace}" if workspace else None
+    _start_flusher()
+    buckets = [(user_key, _bucket(user_key, limits['rate'] / 60, limits['burst']))]
+    if workspace_key:
+        buckets.append((workspace_key, _bucket(
+            workspace_key, limits['workspace_rate'] / 60, limits.get('workspace_burst', limits['burst'] * 4))))
+
+    with _lock:
+        if _global_in_flight >= GLOBAL_MAX_CONCURRENT:
+            return False, _concurrency_retry_after(endpoint), 'server busy'
+        if _in_flight.get(user_key, 0) >= limits['concurrent']:
+            return False, _concurrency_retry_after(endpoint), 'too many requests in progress'
+        if workspace_key and _in_flight.get(workspace_key, 0) >= limits['workspace_concurrent']:
+            return False, _concurrency_retry_after(endpoint), 'too many requests in progress for this workspace'
+
+        now = time.time()
+        wait = max(bucket.wait_time(now) for _, bucket in buckets)
+        if wait > 0:
+            return False, max(1, math.ceil(wait)), 'rate limit exceeded'
+
+        for key, bucket in buckets:
+            bucket.take()
+            _dirty.add(key)
+            _in_flight[key] = _in_flight.get(key, 0) + 1
+        _global_in_flight += 1
+    return True, 0, None
+
+
+def release(endpoint, user_id, workspace=None):
+    global _global_in_flight
+    keys = [f"{endpoint}:user:{user_id}"] + ([f"{endpoint}:workspace:{workspace}"] if workspace else [])
+    with _lock:
+        for key in keys:
+            remaining = _in_flight.get(key, 0) - 1
+            if remaining > 0:
+                _in_flight[key] = remaining
+            else:
+                _in_flight.pop(key, None)
+        _global_in_flight = max(0, _global_in_flight - 1)
+
+
+def take_token(key, per_hour):
+    """
+    Rate-only check (no concurrency): consume a token from a per-hour bucket
+
+    Returns:
+        float: 0 if allowed, else seconds until the next token
+    """
+    _start_flusher()
+    bucket = _bucket(key, per_hour / 3600, per_hour)
+    with _lock:
+        wait = bucket.wait_time()
+        if wait == 0:
+            bucket.take()
+            _dirty.add(key)
+        return wait
+
+
+def admit(endpoint):
+    """
+    Shed load with 429 + Retry-After before the view does any expensive work
+
+    Usage:
+        @task_bp.route("/analyze", methods=["POST"])
+        @admit('analyze')
+        def analyze(): ...
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return view(*args, **kwargs)
+
+            user_id = _request_user()
+            workspace = workspace_for(user_id)
+            admitted, retry_after, reason = try_acquire(endpoint, user_id, workspace)
+            if not admitted:
+                observe('admission_rejected', 1, {'endpoint': endpoint})
+                logger.warning(f"🚦 {endpoint}: rejected {user_id} ({reason}), retry after {retry_after}s")
+                response = jsonify({'error': f"Too many requests: {reason}", 'retry_after': retry_after})
+                return response, 429, {'Retry-After': str(retry_after)}
+
+            started = time.time()
+
+            def _release():
+                release(endpoint, user_id, workspace)
+                observe('admission_hold_seconds', time.time() - started, {'endpoint': endpoint})
+
+            streamed = False
+            try:
+                result = view(*args, **kwargs)
+                if isinstance(result, Response) and result.is_streamed:
+                    # A streamed response keeps working after the view returns - hold the slot until it closes
+                    result.call_on_close(_release)
+                    streamed = True
+                return result
+            finally:
+                if not streamed:
+                    _release()
+        return wrapper
+    return decorator
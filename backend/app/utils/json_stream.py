@@ -0,0 +1,358 @@
+"""
+Streaming JSON Extraction
+Linear-time, tolerant JSON parser for LLM output that can emit completed sub-objects while text is still arriving
+"""
+import re
+import json
+
+# Runs of ordinary string characters are copied in one step
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]+')
+_WHITESPACE = re.compile(r'\s*')
+_PARTIAL_UNICODE = re.compile(r'\\u[0-9a-fA-F]{0,3}$')
+_NUMBER =re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$')
+_LITERALS = {'true': 'true', 'false': 'false', 'null': 'null', 'True': 'true', 'False': 'false', 'None': 'null'}
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CLOSERS = {'{': '}', '[': ']'}
+# After a genuine closing quote the next significant character is one of these
+_AFTER_STRING = set(',:}]')
+# A string literal and a colon - the next key of an object, so the quote before it closed a value
+_KEY_AHEAD = re.compile(r'"(?:[^"\\\n]|\\.)*"\s*:')
+# A string literal (and the whitespace after it) still arriving - too early to tell whether it is a key
+_KEY_PENDING = re.compile(r'"(?:[^"\\\n]|\\.)*(?:\\|"\s*)?\Z')
+
+
+class _Frame:
+    __slots__ = ('kind', 'key', 'expect', 'emit_start')
+
+    def __init__(self, kind, key, emit_start):
+        self.kind = kind              # '{' or '['
+        self.key = key                # key this container is stored under in its parent object
+        self.expect = 'key' if kind == '{' else 'value'   # key | colon | value | comma
+        self.emit_start = emit_start  # output index if this object is emitted on close
+
+
+class JSONStreamParser:
+    """
+    Incremental, repairing JSON parser
+
+    Feed text in chunks; every object that closes inside an array stored under
+    one of `array_keys` (e.g. the "subtasks" array of a plan) is returned by
+    feed() as soon as it is complete. finish() returns the whole document.
+
+    Repairs applied on the fly, in a single pass:
+    - text before the first '{' / '[' and after the top-level value (prose, code fences) is ignored
+    - trailing commas are dropped, missing commas between items are inserted
+    - raw control characters and stray quotes inside strings are escaped
+    - Python literals (True/False/None) and unquoted words are converted
+    - on truncation, the incomplete tail is cut back to the last complete
+      value and all open containers are closed
+    """
+
+    def __init__(self, array_keys=()):
+        self.array_keys = set(array_keys)
+        self._buf = ''
+        self._pos = 0
+        self._out = []
+        self._stack = []
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._string_is_key = False
+        self._string_start = 0
+        self._scalar = []
+        self._pending_comma = False
+        self._pending_key = None
+        self._safe = (0, 0)           # (output length, stack depth) after the last complete value
+        self._completed = []
+
+    # ---------- public API ----------
+
+    def feed(self, chunk):
+        """
+        Add a chunk of text
+
+        Returns:
+            list: (array key, parsed object) for every watched object completed by this chunk
+        """
+        if chunk:
+            # Drop consumed input so the buffer stays proportional to one chunk
+            self._buf = self._buf[self._pos:] + chunk
+            self._pos = 0
+            self._run(final=False)
+        completed, self._completed = self._completed, []
+        return completed
+
+    def finish(self):
+        """
+        Close the document and return the parsed value
+
+        Raises:
+            ValueError: no JSON object/array found in the input
+        """
+        self._run(final=True)
+        if not self._started:
+            raise ValueError("No JSON object found")
+
+        if self._in_string:
+            if self._string_is_key:
+                self._cut_to_safe()
+            else:
+                # Drop a \u escape cut off mid-way before closing the string
+                tail = _PARTIAL_UNICODE.sub('', ''.join(self._out[self._string_start:]))
+                del self._out[self._string_start:]
+                self._out.append(tail + '"')
+                self._in_string = False
+                self._value_done()
+        if self._scalar:
+            self._finish_scalar()
+
+        if not self._done:
+            self._cut_to_safe()
+            while self._stack:
+                self._out.append(_CLOSERS[self._stack.pop().kind])
+        return json.loads(''.join(self._out))
+
+    # ---------- scanner ----------
+
+    def _run(self, final):
+        buf = self._buf
+        length = len(buf)
+        pos = self._pos
+
+        if not self._started:
+            starts = [i for i in (buf.find('{', pos), buf.find('[', pos)) if i >= 0]
+            if not starts:
+                self._pos = length
+                return
+            self._started = True
+            pos = min(starts)
+
+        out = self._out
+        while pos < length and not self._done:
+            if self._in_string:
+                run = _STRING_RUN.match(buf, pos)
+                if run:
+                    out.append(run.group())
+                    pos = run.end()
+                    continue
+                char = buf[pos]
+                if char == '\\':
+                    if pos + 1 >= length:
+                        if not final:
+                            break
+                        pos += 1
+                        continue
+                    nxt = buf[pos + 1]
+                    if nxt in _VALID_ESCAPES:
+                        out.append(buf[pos:pos + 2])
+                    elif nxt == "'":
+                        out.append("'")
+                    else:
+                        out.append('\\\\' + nxt if nxt not in _CONTROL_ESCAPES else '\\\\' + _CONTROL_ESCAPES[nxt])
+                    pos += 2
+                elif char == '"':
+                    after = _WHITESPACE.match(buf, pos + 1).end()
+                    if after >= length and not final:
+                        break  # Need the next significant character to judge this quote
+                    closing = after >= length or buf[after] in _AFTER_STRING or self._missing_comma(buf, pos + 1, after, final)
+                    if closing is None:
+                        break  # Need the rest of the next string to tell whether it is a key
+                    if closing:
+                        out.append('"')
+                        self._in_string = False
+                        self._close_string()
+                    else:
+                        out.append('\\"')  # Unescaped quote inside the string
+                    pos += 1
+                else:
+                    out.append(_CONTROL_ESCAPES.get(char, f'\\u{ord(char):04x}'))
+                    pos += 1
+                continue
+
+            char = buf[pos]
+            if char in ' \t\r\n':
+                if self._scalar:
+                    self._finish_scalar()
+                pos += 1
+            elif char == '"':
+                if self._scalar:
+                    self._finish_scalar()
+                self._begin_item()
+                frame = self._stack[-1]
+                self._string_is_key = frame.kind == '{' and frame.expect == 'key'
+                self._string_start = len(out)
+                self._in_string = True
+                out.append('"')
+                pos += 1
+            elif char in '{[':
+                if self._scalar:
+                    self._finish_scalar()
+                self._open(char)
+                pos += 1
+            elif char in '}]':
+                if self._scalar:
+                    self._finish_scalar()
+                self._close()
+                pos += 1
+            elif char == ',':
+                if self._scalar:
+                    self._finish_scalar()
+                frame = self._stack[-1]
+                if frame.expect == 'comma':
+                    frame.expect = 'key' if frame.kind == '{' else 'value'
+                    self._pending_comma = True
+                pos += 1
+            elif char == ':':
+                if self._scalar:
+                    self._finish_scalar()
+                frame = self._stack[-1]
+                if frame.kind == '{' and frame.expect == 'colon':
+                    out.append(':')
+                    frame.expect = 'value'
+                pos += 1
+            elif char == '`':
+                pos += 1  # Stray code-fence characters
+            elif char == '/' and pos + 1 >= length and not final and not self._scalar:
+                break  # Could be the start of a comment
+            elif char == '/' and buf.startswith(('//', '/*'), pos) and not self._scalar:
+                end = buf.find('\n' if buf[pos + 1] == '/' else '*/', pos + 2)
+                if end < 0:
+                    if not final:
+                        break  # Comment continues in the next chunk
+                    end = length
+                pos = end + (1 if buf[pos + 1] == '/' else 2)
+            else:
+                if not self._scalar:
+                    self._begin_item()
+                self._scalar.append(char)
+                pos += 1
+
+        if self._done:
+            pos = length
+        self._pos = pos
+
+    @staticmethod
+    def _missing_comma(buf, quote_end, after, final):
+        """
+        A quote followed by a line break and a new value, or by whitespace and a `"key":`, is a closing
+        quote with a missing comma (None while the next string is still arriving and could be a key)
+        """
+        if buf[after] in '"{[' and '\n' in buf[quote_end:after]:
+            return True
+        if buf[after] != '"' or after == quote_end:
+            return False
+        if _KEY_AHEAD.match(buf, after):
+            return True
+        return None if not final and _KEY_PENDING.match(buf, after) else False
+
+    # ---------- structure ----------
+
+    def _begin_item(self):
+        """Emit the comma (or colon) preceding this item, inserting it if it was missing"""
+        frame = self._stack[-1]
+        if frame.expect == 'colon':
+            self._out.append(':')
+            frame.expect = 'value'
+            return
+        if frame.expect == 'comma':
+            frame.expect = 'key' if frame.kind == '{' else 'value'
+            self._pending_comma = True
+        if self._pending_comma:
+            self._out.append(',')
+            self._pending_comma = False
+
+    def _open(self, char):
+        parent = self._stack[-1] if self._stack else None
+        key = None
+        emit_start = None
+        if parent:
+            self._begin_item()
+            if parent.kind == '{' and parent.expect == 'key':
+                # Container in key position (missing key) - give it a placeholder key
+                self._out.append('"_":')
+                self._pending_key = '_'
+            parent.expect = 'value'
+            key = self._pending_key if parent.kind == '{' else None
+            if char == '{' and parent.kind == '[' and parent.key in self.array_keys:
+                emit_start = len(self._out)
+        self._pending_key = None
+        self._stack.append(_Frame(char, key, emit_start))
+        self._out.append(char)
+        self._safe = (len(self._out), len(self._stack))
+
+    def _close(self):
+        if not self._stack:
+            return
+        frame = self._stack[-1]
+        if frame.kind == '{' and frame.expect in ('colon', 'value'):
+            # Key without a value - drop it
+            self._cut_to_safe()
+            frame = self._stack[-1]
+        self._pending_comma = False
+        self._stack.pop()
+        self._out.append(_CLOSERS[frame.kind])
+
+        if frame.emit_start is not None:
+            try:
+                self._completed.append((self._stack[-1].key if self._stack else None,
+                                        json.loads(''.join(self._out[frame.emit_start:]))))
+            except ValueError:
+                pass
+
+        if self._stack:
+            self._value_done()
+        else:
+            self._done = True
+            self._safe = (len(self._out), 0)
+
+    def _close_string(self):
+        frame = self._stack[-1]
+        if self._string_is_key:
+            self._pending_key = ''.join(self._out[self._string_start + 1:-1])
+            frame.expect = 'colon'
+        else:
+            self._value_done()
+
+    def _finish_scalar(self):
+        token = ''.join(self._scalar)
+        self._scalar = []
+        frame = self._stack[-1]
+        if frame.kind == '{' and frame.expect == 'key':
+            # Unquoted key
+            self._pending_key = token
+            self._out.append(json.dumps(token))
+            frame.expect = 'colon'
+            return
+        if token in _LITERALS:
+            self._out.append(_LITERALS[token])
+        elif _NUMBER.match(token):
+            self._out.append(token)
+        else:
+            self._out.append(json.dumps(token))
+        self._value_done()
+
+    def _value_done(self):
+        frame = self._stack[-1]
+        frame.expect = 'comma'
+        self._safe = (len(self._out), len(self._stack))
+
+    def _cut_to_safe(self):
+        out_len, depth = self._safe
+        del self._out[out_len:]
+        del self._stack[depth:]
+        self._pending_comma = False
+        self._in_string = False
+        self._scalar = []
+
+
+def parse_json(text, array_keys=()):
+    """
+    Parse (and repair) the JSON document contained in LLM output
+
+    Raises:
+        ValueError: no JSON found, or the text could not be repaired
+    """
+    parser = JSONStreamParser(array_keys)
+    parser.feed(text)
+    return parser.finish()
@@ -0,0 +1,91 @@
+"""
+In-Process Metrics
+Lightweight histogram registry (per worker) exposed on /metrics
+"""
+import time
+import threading
+import contextlib
+from collections import deque
+
+# Samples kept per histogram for percentile estimates
+RESERVOIR_SIZE = 1024
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Count/sum/min/max over all observations plus percentiles over the most recent samples"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        def pct(q):
+            value = self.percentile(q)
+            return round(value, 4) if value is not None else None
+
+        return {
+            'count': self.count,
+            'sum': round(self.total, 4),
+            'avg': round(self.total / self.count, 4) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': pct(0.5),
+            'p95': pct(0.95),
+            'p99': pct(0.99),
+        }
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())) + '}'
+
+
+def observe(name, value, labels=None):
+    """Record one observation (e.g. a latency in seconds)"""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def get_histogram(name, labels=None):
+    with _lock:
+        return _histograms.get(_key(name, labels))
+
+
+@contextlib.contextmanager
+def timer(name, labels=None):
+    """Observe the duration of the enclosed block in seconds"""
+    started = time.time()
+    try:
+        yield
+    finally:
+        observe(name, time.time() - started, labels)
+
+
+def snapshot():
+    """All histograms as {key: summary}"""
+    with _lock:
+        return {key: histogram.summary() for key, histogram in sorted(_histograms.items())}
@@ -3,20 +3,15 @@ Slack Safety Utilities
 Rate limiting and safety checks for Slack auto-responses
 """
 import logging
-from datetime import datetime, timedelta
+from app.utils.admission import take_token
 
 logger = logging.getLogger(__name__)
 
-def check_rate_limit(processed_mentions, slack_user_id, user_name, max_per_hour=10):
-    """Check if user exceeded rate limit (default: 10 mentions/hour)"""
-    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-    recent_count = processed_mentions.count_documents({
-        "user_id": slack_user_id,
-        "processed_at": {"$gte": one_hour_ago}
-    })
-    
-    if recent_count >= max_per_hour:
-        logger.warning(f"⚠️ Rate limit: {user_name} exceeded {max_per_hour}/hour")
+def check_rate_limit(slack_user_id, user_name, max_per_hour=10):
+    """Check if user exceeded rate limit (default: 10 mentions/hour, token bucket)"""
+    wait = take_token(f"slack_mention:user:{slack_user_id}", max_per_hour)
+    if wait:
+        logger.warning(f"⚠️ Rate limit: {user_name} exceeded {max_per_hour}/hour (next in {wait:.0f}s)")
         return True
     return False
 
@@ -0,0 +1,166 @@
+import sys
+import os
+import json
+import time
+import random
+
+# Ensure we are in the backend directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.json_stream import JSONStreamParser, parse_json
+
+FUZZ_ROUNDS = int(os.getenv('FUZZ_ROUNDS', '2000'))
+SEED = int(os.getenv('FUZZ_SEED', '1234'))
+rng = random.Random(SEED)
+
+WORDS = ['auth', 'login', 'He said "ok"', 'path\\to\\file', 'line\nbreak', 'tab\there', 'unicode ✅', '{braces}', '[x]', 'a, b: c']
+
+
+def random_value(depth=0):
+    kind = rng.randint(0, 7 if depth < 4 else 4)
+    if kind == 0:
+        return rng.choice([True, False, None])
+    if kind == 1:
+        return rng.randint(-1000, 1000)
+    if kind == 2:
+        return round(rng.uniform(-100, 100), 3)
+    if kind in (3, 4):
+        return rng.choice(WORDS)
+    if kind == 5:
+        return [random_value(depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}": random_value(depth + 1) for i in range(rng.randint(0, 4))}
+
+
+def random_plan():
+    return {
+        'main_task': rng.choice(WORDS),
+        'subtasks': [
+            {'id': i, 'title': rng.choice(WORDS), 'details': random_value(1)}
+            for i in range(rng.randint(0, 6))
+        ],
+        'extra': random_value(1)
+    }
+
+
+def chunked(text):
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 40)
+        yield text[pos:pos + size]
+        pos += size
+
+
+def damage(text):
+    """Apply the kinds of damage seen in real model output"""
+    if rng.random() < 0.5:
+        text = "```json\n" + text + "\n```"
+    if rng.random() < 0.3:
+        text = "Here is the plan:\n" + text + "\nLet me know if you need changes."
+    if rng.random() < 0.3 and '\n' in text:
+        # Closers on their own line are structural (newlines inside strings are escaped)
+        text = text.replace('\n}', ',\n}').replace('\n]', ',\n]')
+    if rng.random() < 0.2:
+        text = text.replace('true', 'True').replace('false', 'False').replace('null', 'None')
+    return text
+
+
+def fuzz():
+    print("\n--- Fuzzing JSON parser ---")
+    failures = 0
+    for round_no in range(FUZZ_ROUNDS):
+        plan = random_plan()
+        text = json.dumps(plan, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+        damaged = damage(text)
+
+        # 1. Intact (or repairable) documents parse exactly, whatever the chunking
+        parser = JSONStreamParser(array_keys=('subtasks',))
+        streamed = []
+        for chunk in chunked(damaged):
+            streamed.extend(obj for _, obj in parser.feed(chunk))
+        try:
+            result = parser.finish()
+        except Exception as e:
+            result = e
+        if result != plan or streamed != plan['subtasks']:
+            failures += 1
+            print(f"MISMATCH (round {round_no}): {damaged[:200]!r}")
+
+        # 2. Truncated documents still yield an object holding only complete subtasks
+        cut = damaged[:rng.randint(0, len(damaged))]
+        if '{' not in cut:
+            continue
+        try:
+            partial = parse_json(cut)
+        except Exception as e:
+            failures += 1
+            print(f"TRUNCATION CRASHED (round {round_no}): {e} on {cut[-200:]!r}")
+            continue
+        if not isinstance(partial, dict):
+            failures += 1
+            print(f"TRUNCATION RETURNED {type(partial).__name__} (round {round_no})")
+
+    print(f"Rounds: {FUZZ_ROUNDS}, failures: {failures}")
+    return failures
+
+
+# Damaged documents seen in model output, and what they should parse to
+REPAIRS = [
+    ('{"a": "x",}', {'a': 'x'}),
+    ('{"a": "x"\n"b": "y"}', {'a': 'x', 'b': 'y'}),
+    ('{"a": "x" "b": "y"}', {'a': 'x', 'b': 'y'}),
+    ('{"a": "x"  "b" : "y", "c": [1, 2]}', {'a': 'x', 'b': 'y', 'c': [1, 2]}),
+    ('{"a": "He said "hi" to me", "b": 1}', {'a': 'He said "hi" to me', 'b': 1}),
+    ('{"a": "say "hi" "there"", "b": 1}', {'a': 'say "hi" "there"', 'b': 1}),
+]
+
+
+def repairs():
+    print("\n--- Known repairs ---")
+    failures = 0
+    for text, expected in REPAIRS:
+        # Whole, and a character at a time so every lookahead runs out of input at least once
+        results = [parse_json(text)]
+        parser = JSONStreamParser()
+        for char in text:
+            parser.feed(char)
+        results.append(parser.finish())
+        for result in results:
+            if result != expected:
+                failures += 1
+                print(f"WRONG REPAIR: {text!r} -> {result!r}")
+    print(f"Cases: {len(REPAIRS)}, failures: {failures}")
+    return failures
+
+
+def throughput():
+    print("\n--- Throughput ---")
+    for subtasks in (100, 1000, 10000):
+        plan = {'subtasks': [
+            {'id': i, 'title': f"Subtask {i}", 'description': 'Implement the "thing"\nwith care ' * 5, 'done': False}
+            for i in range(subtasks)
+        ]}
+        text = "```json\n" + json.dumps(plan, indent=2) + "\n```"
+        megabytes = len(text) / 1e6
+
+        started = time.perf_counter()
+        parse_json(text)
+        whole = time.perf_counter() - started
+
+        started = time.perf_counter()
+        parser = JSONStreamParser(array_keys=('subtasks',))
+        for pos in range(0, len(text), 64):
+            parser.feed(text[pos:pos + 64])
+        parser.finish()
+        streamed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        json.loads(text[8:-4])
+        baseline = time.perf_counter() - started
+
+        print(f"{megabytes:7.2f} MB | parse_json {megabytes / whole:6.2f} MB/s | "
+              f"64-byte chunks {megabytes / streamed:6.2f} MB/s | json.loads {megabytes / baseline:7.2f} MB/s")
+
+
+failures = fuzz() + repairs()
+throughput()
+sys.exit(1 if failures else 0)
@@ -0,0 +1,111 @@
+import sys
+import os
+import time
+
+# Ensure we are in the backend directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Fake backend with short budgets so every scenario runs in seconds
+os.environ['LLM_BACKEND'] = 'fake'
+os.environ.setdefault('LLM_FAKE_SEED', '42')
+os.environ['LLM_TIERS'] = '{"fast": {"model": "fake-primary", "fallback": "fake-fallback", "latency_budget": 1.5}}'
+os.environ['LLM_ROUTES'] = '{"bench": {"tier": "fast"}}'
+
+from app.services import llm_fake, llm_resilience
+from app.services.llm import generate_text
+from app.services.llm_resilience import call_with_resilience, get_breaker
+from app.utils.metrics import observe
+
+failures = []
+
+
+def check(name, condition, detail=''):
+    print(f"{'✅' if condition else '❌'} {name} {detail}")
+    if not condition:
+        failures.append(name)
+
+
+def timed(fn):
+    started = time.time()
+    try:
+        return fn(), time.time() - started
+    except Exception as e:
+        return e, time.time() - started
+
+
+def scenario_deadline():
+    llm_fake.reset()
+    llm_fake.configure('fake-primary', latency=5)
+    result, elapsed = timed(lambda: generate_text('bench', 'slow primary'))
+    check("slow primary falls back within the deadline", isinstance(result, str) and elapsed < 1.6,
+          f"({elapsed:.2f}s, models: {llm_fake.calls()})")
+
+
+def scenario_retries():
+    llm_fake.reset()
+    llm_resilience._breakers.clear()
+    llm_fake.configure('fake-primary', error_rate=0.5)
+    results = [timed(lambda: generate_text('bench', f'flaky {i}'))[0] for i in range(20)]
+    ok = sum(isinstance(r, str) for r in results)
+    check("transient 503s are retried", ok == 20, f"({ok}/20 answered, {len(llm_fake.calls())} requests)")
+    llm_fake.reset()
+    llm_resilience._breakers.clear()
+    llm_fake.configure('fake-primary', error_rate=1, error='400 Invalid argument')
+    timed(lambda: generate_text('bench', 'bad request'))
+    check("non-retryable errors are not retried", llm_fake.calls().count('fake-primary') == 1, f"({llm_fake.calls()})")
+
+
+def scenario_hedging():
+    labels = {'tier': 'fast', 'model': 'fake-hedge'}
+    for _ in range(llm_resilience.HEDGE_MIN_SAMPLES):
+        observe('llm_latency_seconds', 0.05, labels)
+    delays = iter([2.0, 0.05])
+
+    def request():
+        time.sleep(next(delays))
+        return 'answer'
+
+    result, elapsed = timed(lambda: call_with_resilience(request, 'fake-hedge', 'fast', time.monotonic() + 3))
+    check("slow request is hedged after p95", result == 'answer' and elapsed < 0.5, f"({elapsed:.2f}s)")
+
+
+def scenario_breaker():
+    llm_fake.reset()
+    llm_resilience._breakers.clear()
+    answer = generate_text('bench', 'cached question')
+    llm_fake.configure('fake-primary', error_rate=1)
+    llm_fake.configure('fake-fallback', error_rate=1)
+    for i in range(llm_resilience.BREAKER_MIN_CALLS):
+        timed(lambda: generate_text('bench', f'failing {i}'))
+    check("circuits open on an error spike", llm_resilience.breaker_states().get('fake-primary') == 'open',
+          f"({llm_resilience.breaker_states()})")
+
+    requests_before = len(llm_fake.calls())
+    result, elapsed = timed(lambda: generate_text('bench', 'new question', degraded='degraded answer'))
+    check("open circuit fails fast with the degraded answer", result == 'degraded answer' and elapsed < 0.05,
+          f"({elapsed * 1000:.1f}ms, {len(llm_fake.calls()) - requests_before} requests)")
+    result, _ = timed(lambda: generate_text('bench', 'cached question'))
+    check("open circuit serves the last good answer", result == answer)
+    result, _ = timed(lambda: generate_text('bench', 'no fallback answer'))
+    check("open circuit raises without a fallback answer", isinstance(result, Exception), f"({type(result).__name__})")
+
+    llm_fake.reset()
+    llm_fake.configure('fake-primary', error_rate=0)
+    for name in ('fake-primary', 'fake-fallback'):
+        get_breaker(name).opened_at = time.time() - llm_resilience.BREAKER_OPEN_SECONDS
+    result, _ = timed(lambda: generate_text('bench', 'probe'))
+    check("a successful probe closes the circuit",
+          isinstance(result, str) and llm_resilience.breaker_states()['fake-primary'] == 'closed')
+
+
+if __name__ == '__main__':
+    print("🔍 LLM resilience scenarios (fake backend)")
+    scenario_deadline()
+    scenario_retries()
+    scenario_hedging()
+    scenario_breaker()
+    if failures:
+        print(f"❌ {len(failures)} scenario(s) failed: {failures}")
+        sys.exit(1)
+    print("✅ All scenarios passed")
+    os._exit(0)  # don't wait for abandoned slow requests in the pool
@@ -11,6 +11,7 @@ import ClarifyingQuestionsCenter from '@/components/ClarifyingQuestionsCenter';
 import AutoAssignmentIntelligence from '@/components/AutoAssignmentIntelligence';
 import AutopilotPanel from '@/components/AutopilotPanel';
 import FeetaSummaries from '@/components/FeetaSummaries';
+import { useEventStream } from '@/hooks/useEventStream';
 
 // Tasks Page Component
 function TasksPage({ user }) {
@@ -167,6 +168,9 @@ function TasksPage({ user }) {
     }
   }, [user]);
 
+  // Task changes (including ones completed from Slack) are pushed by the server
+  useEventStream({ task_updated: () => loadTasks() }, !!user);
+
   const loadProjects = async () => {
     const token = localStorage.getItem('token');
     if (!token) return;
@@ -1764,7 +1768,26 @@ export default function DemoDash() {
     }
   }, [activePage, slackConnected]);
 
-  // Auto-fetch mentions from all channels: once immediately, then every minute
+  // Mentions handled by the server (Events API or a poll) are pushed as they are processed
+  const mentionStreamConnected = useEventStream({
+    mention: (mention) => {
+      // A fallback poll while the stream is down must not log this mention again
+      processedMentionIdsRef.current.add(mention.mention_id);
+      if (activePage !== 'issue-resolution') return;
+      setRefreshLogs(prev => [...prev, {
+        type: mention.status === 'failed' ? 'error' : mention.status === 'answered' ? 'success' : 'info',
+        message: mention.status === 'processing'
+          ? `🔔 ${mention.user_name || 'User'}: "${mention.question}"`
+          : mention.status === 'answered'
+            ? `✅ Sent solution to ${mention.user_name || 'user'}`
+            : `❌ Failed to process mention from ${mention.user_name || 'user'}`,
+        timestamp: new Date().toLocaleTimeString()
+      }]);
+    }
+  }, slackConnected);
+
+  // Auto-fetch mentions from all channels every minute - only a fallback for when the
+  // event stream is down; while it is connected, mentions are pushed instead.
   useEffect(() => {
     if (!autoFetchEnabled || !slackConnected || activePage !== 'issue-resolution') {
       setIsFirstFetch(true);
@@ -1775,6 +1798,10 @@ export default function DemoDash() {
       }
       return;
     }
+    if (mentionStreamConnected) {
+      setAutoFetchStatus('idle');
+      return;
+    }
 
     const token = localStorage.getItem('token');
     if (!token) return;
@@ -1829,8 +1856,7 @@ export default function DemoDash() {
               body: JSON.stringify({
                 channel: channel.id,
                 project_id: selectedProject ? (selectedProject._id || selectedProject.id) : null,
-                auto_fetch: true,
-                processed_mention_ids: Array.from(processedMentionIdsRef.current) // Send already processed IDs
+                auto_fetch: true
               })
             });
 
@@ -1885,6 +1911,14 @@ export default function DemoDash() {
                   timestamp: new Date().toLocaleTimeString()
                 }]);
               }
+              const pendingCount = data.pending_count || 0;
+              if (pendingCount > 0 && newMentions.length > 0) {
+                setRefreshLogs(prev => [...prev, {
+                  type: 'info',
+                  message: `⏳ ${pendingCount} mention(s) in #${channel.name} still being answered - replies will appear in Slack shortly`,
+                  timestamp: new Date().toLocaleTimeString()
+                }]);
+              }
             }
           } catch (error) {
             // Silently skip errors for individual channels
@@ -1911,13 +1945,11 @@ export default function DemoDash() {
       }
     };
 
-    // Run immediately on first fetch
-    autoFetchMentions();
-    
-    // Then set interval to 1 minute (60000ms) after first fetch
+    // Give the event stream a few seconds to connect before falling back to polling
     timeoutId = setTimeout(() => {
+      autoFetchMentions();
       intervalId = setInterval(autoFetchMentions, 60000); // Every minute
-    }, 1000); // Wait 1 second after first fetch before setting interval
+    }, 5000);
 
     return () => {
       if (intervalId) {
@@ -1927,7 +1959,7 @@ export default function DemoDash() {
         clearTimeout(timeoutId);
       }
     };
-  }, [autoFetchEnabled, slackConnected, activePage, selectedProject]);
+  }, [autoFetchEnabled, slackConnected, activePage, selectedProject, mentionStreamConnected]);
 
   const handleIssueResolution = async () => {
     if (!issueQuestion.trim()) {
@@ -2061,10 +2093,11 @@ export default function DemoDash() {
         // Add summary log
         const processedCount = data.processed_count || 0;
         const mentionsFound = data.mentions_found || 0;
+        const pendingCount = data.pending_count || 0;
         
         setRefreshLogs(prev => [...prev, {
           type: 'success',
-          message: `Scan complete! Found ${mentionsFound} mention(s), processed ${processedCount} successfully.`,
+          message: `Scan complete! Found ${mentionsFound} mention(s), processed ${processedCount} successfully${pendingCount ? `, ${pendingCount} still in progress` : ''}.`,
           timestamp: new Date().toLocaleTimeString()
         }]);
         
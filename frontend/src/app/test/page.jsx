@@ -560,35 +560,14 @@ export default function TestPage() {
     setLoadingSummary(true);
 
     try {
-      const historyRes = await fetch(`${API_BASE_URL}/slack/api/channel_history?channel=${channelId}&limit=50`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (!historyRes.ok) throw new Error('Failed to fetch channel history');
-
-      const historyData = await historyRes.json();
-      const messages = historyData.messages || [];
-
-      if (messages.length === 0) {
-        setChannelSummary({
-          overall_status: "No recent messages in this channel",
-          key_updates: [],
-          active_users: [],
-          blockers: [],
-          progress_indicators: [],
-          action_items: [],
-          sentiment: "neutral"
-        });
-        return;
-      }
-
+      // The backend keeps a rolling summary per channel and only fetches messages since the last one
       const summaryRes = await fetch(`${API_BASE_URL}/slack/api/summarize_channel`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify({ messages })
+        body: JSON.stringify({ channel: channelId })
       });
 
       if (!summaryRes.ok) throw new Error('Failed to generate summary');
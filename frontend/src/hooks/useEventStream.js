@@ -0,0 +1,55 @@
+import { useEffect, useRef, useState } from 'react';
+import { API_BASE_URL } from '@/config/api';
+
+// The server ends streams now and then and the browser reconnects - a drop only counts after this long
+const DISCONNECT_GRACE_MS = 10000;
+
+// Subscribe to server-pushed events (task_updated, mention, job_progress).
+// handlers: { [eventType]: (data) => void } - the latest handlers are always used.
+// Returns whether the stream is connected.
+export function useEventStream(handlers, enabled = true) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+  const [connected, setConnected] = useState(false);
+
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!enabled || !token || typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(`${API_BASE_URL}/api/events/stream?token=${encodeURIComponent(token)}`);
+    let dropTimer;
+    source.onopen = () => {
+      clearTimeout(dropTimer);
+      setConnected(true);
+    };
+    source.onerror = () => {
+      clearTimeout(dropTimer);
+      dropTimer = setTimeout(() => {
+        if (source.readyState !== EventSource.OPEN) setConnected(false);
+      }, DISCONNECT_GRACE_MS);
+    };
+    const listeners = ['task_updated', 'mention', 'job_progress'].map((type) => {
+      const listener = (event) => {
+        const handler = handlersRef.current[type];
+        if (handler) {
+          try {
+            handler(JSON.parse(event.data));
+          } catch (error) {
+            console.error(`Error handling ${type} event:`, error);
+          }
+        }
+      };
+      source.addEventListener(type, listener);
+      return [type, listener];
+    });
+
+    return () => {
+      listeners.forEach(([type, listener]) => source.removeEventListener(type, listener));
+      clearTimeout(dropTimer);
+      source.close();
+      setConnected(false);
+    };
+  }, [enabled]);
+
+  return connected;
+}